@@ -0,0 +1,18 @@
+# Generated by Django 4.2.28 on 2026-10-19 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='profile_image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized WebP/JPEG versions of the profile image', verbose_name='profile image derivatives'),
+        ),
+    ]
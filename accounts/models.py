@@ -102,6 +102,13 @@ class UserProfile(models.Model):
         null=True,
         blank=True
     )
+    profile_image_derivatives = models.JSONField(
+        _('profile image derivatives'),
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text=_('Resized WebP/JPEG versions of the profile image')
+    )
     bio = models.TextField(_('bio'), max_length=500, blank=True)
     favorite_artists = models.ManyToManyField(
         'music.Artist',
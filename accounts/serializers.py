@@ -2,6 +2,7 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from api.fields import DerivativeImageField
 from .models import UserProfile, Broadcaster
 
 User = get_user_model()
@@ -20,10 +21,15 @@ class UserSerializer(serializers.ModelSerializer):
 class UserProfileSerializer(serializers.ModelSerializer):
     """Serializer for UserProfile model"""
     user = UserSerializer(read_only=True)
+    profile_image_thumbnail = DerivativeImageField(
+        size='small',
+        image_field='profile_image',
+        read_only=True
+    )
     
     class Meta:
         model = UserProfile
-        fields = ['id', 'user', 'language', 'profile_image', 'bio',
+        fields = ['id', 'user', 'language', 'profile_image', 'profile_image_thumbnail', 'bio',
                   'favorite_artists', 'listening_preferences', 'created_at', 'updated_at']
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
 
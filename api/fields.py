@@ -0,0 +1,54 @@
+from django.conf import settings
+from rest_framework import serializers
+
+
+class DerivativeImageField(serializers.ImageField):
+    """
+    Image field that renders the URL of a resized derivative.
+
+    Derivatives are read from the model's ``<image field>_derivatives`` JSON
+    field. The format defaults to IMAGE_DERIVATIVE_DEFAULT_FORMAT and can be
+    switched with the ``image_format`` query parameter. Until derivatives have
+    been generated the original image URL is returned. Writes behave like a
+    regular ImageField.
+    """
+
+    def __init__(self, size, image_field=None, **kwargs):
+        self.size = size
+        self.image_field = image_field
+        super().__init__(**kwargs)
+
+    def bind(self, field_name, parent):
+        super().bind(field_name, parent)
+        if self.image_field is None:
+            self.image_field = self.source
+
+    def get_attribute(self, instance):
+        # The derivatives live next to the image, so hand over the whole instance
+        return instance
+
+    def _requested_format(self):
+        request = self.context.get('request')
+        image_format = request.query_params.get('image_format') if request else None
+        if image_format in settings.IMAGE_DERIVATIVE_FORMATS:
+            return image_format
+        return settings.IMAGE_DERIVATIVE_DEFAULT_FORMAT
+
+    def to_representation(self, instance):
+        image = getattr(instance, self.image_field)
+        if not image:
+            return None
+
+        derivatives = getattr(instance, f'{self.image_field}_derivatives', None) or {}
+        if derivatives.get('source') != image.name:
+            return super().to_representation(image)
+
+        name = derivatives.get(self.size, {}).get(self._requested_format())
+        if not name:
+            return super().to_representation(image)
+
+        url = image.storage.url(name)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
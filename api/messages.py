@@ -28,12 +28,15 @@ NOT_FOUND_ARTIST = _("Artist not found")
 NOT_FOUND_ALBUM = _("Album not found")
 NOT_FOUND_PLAYLIST = _("Playlist not found")
 NOT_FOUND_USER = _("User not found")
+NOT_FOUND_TAG = _("Tag not found")
 
 # Business logic messages
 BUSINESS_PLAYLIST_DELETE_ERROR = _("Cannot delete playlist with tracks")
 BUSINESS_UPLOAD_LIMIT_EXCEEDED = _("Upload limit exceeded")
 BUSINESS_ALREADY_FAVORITED = _("Music already in favorites")
 BUSINESS_NOT_FAVORITED = _("Music not in favorites")
+BUSINESS_TRACK_NOT_IN_PLAYLIST = _("Track is not in this playlist")
+BUSINESS_ANCHOR_NOT_IN_PLAYLIST = _("The track to place it next to is not in this playlist")
 
 # Success messages
 SUCCESS_CREATED = _("Created successfully")
@@ -43,3 +46,19 @@ SUCCESS_ADDED = _("Added successfully")
 SUCCESS_REMOVED = _("Removed successfully")
 SUCCESS_MUSIC_UPLOADED = _("Music uploaded successfully")
 
+
+# Upload messages
+UPLOAD_SESSION_CLOSED = _("Upload session is no longer active")
+UPLOAD_OFFSET_MISMATCH = _("Chunk offset does not match the received bytes")
+UPLOAD_INVALID_CONTENT_RANGE = _("A valid Content-Range header is required")
+UPLOAD_CHUNK_TOO_LARGE = _("Chunk size too large")
+UPLOAD_INCOMPLETE = _("Upload is not complete")
+UPLOAD_CHECKSUM_MISMATCH = _("Checksum does not match the uploaded file")
+UPLOAD_PROOF_MISMATCH = _("Proof does not match the requested byte range of the file")
+
+# Streaming messages
+PREVIEW_NOT_AVAILABLE = _("Preview is not available for this track")
+RANGE_NOT_SATISFIABLE = _("Requested range not satisfiable")
+
+# Radio messages
+RADIO_SESSION_NOT_FOUND = _("Radio session not found or expired")
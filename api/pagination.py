@@ -1,4 +1,4 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 from rest_framework.response import Response
 
 
@@ -23,3 +23,24 @@ class StandardResultsSetPagination(PageNumberPagination):
                 'current_page': self.page.number,
             }
         })
+
+
+class PositionCursorPagination(CursorPagination):
+    """Cursor pagination over position-ordered rows (stable while rows are inserted or moved)"""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('position', 'id')
+
+    def get_paginated_response(self, data):
+        """Custom paginated response format"""
+        return Response({
+            'success': True,
+            'message': 'Data retrieved successfully',
+            'data': {
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link(),
+                'results': data,
+                'page_size': self.page_size,
+            }
+        })
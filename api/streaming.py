@@ -0,0 +1,79 @@
+"""
+HTTP Range support for serving stored media files
+"""
+
+import mimetypes
+import re
+from django.conf import settings
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from api.messages import RANGE_NOT_SATISFIABLE
+from api.response import error_response
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, size):
+    """
+    Parse a single ``bytes=`` range into inclusive (start, end) offsets.
+
+    Returns None when the header is missing or not a single byte range (the
+    whole file is served) and raises ValueError when it cannot be satisfied.
+    """
+    match = RANGE_PATTERN.match((header or '').strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError(header)
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end
+
+
+def _read_range(handle, length):
+    try:
+        remaining = length
+        while remaining > 0:
+            block = handle.read(min(settings.STREAMING_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+    finally:
+        handle.close()
+
+
+def ranged_file_response(request, field_file, content_type=None):
+    """
+    Serve a stored file, honouring a single-range ``Range`` request header.
+
+    Returns 206 with the requested slice, 200 with the whole file when no
+    usable range was sent, or 416 when the range starts past the end.
+    """
+    size = field_file.size
+    content_type = content_type or mimetypes.guess_type(field_file.name)[0] or 'application/octet-stream'
+
+    try:
+        byte_range = parse_range(request.headers.get('Range'), size)
+    except ValueError:
+        response = JsonResponse(error_response(message=str(RANGE_NOT_SATISFIABLE)), status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    handle = field_file.storage.open(field_file.name, 'rb')
+    if byte_range is None:
+        response = FileResponse(handle, content_type=content_type)
+    else:
+        start, end = byte_range
+        handle.seek(start)
+        response = StreamingHttpResponse(_read_range(handle, end - start + 1), status=206, content_type=content_type)
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -1,24 +1,26 @@
 from django.contrib import admin
+from django.utils import timezone
 from modeltranslation.admin import TranslationAdmin
-from .models import Artist, Album, Tag, Music, Playlist, RecentlyPlayed, Favorite
+from .models import Artist, Album, Tag, Music, Playlist, PlaylistTrack, RecentlyPlayed, Favorite, DuplicateCandidate
+from .playlist_ops import apply_playlist_changes
 
 
 @admin.register(Artist)
 class ArtistAdmin(TranslationAdmin):
     """Admin configuration for Artist model"""
-    list_display = ('name', 'image', 'image_url', 'created_at')
+    list_display = ('name', 'image', 'image_url', 'followers_count', 'created_at')
     search_fields = ('name', 'bio')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('followers_count', 'created_at', 'updated_at')
 
 
 @admin.register(Album)
 class AlbumAdmin(TranslationAdmin):
     """Admin configuration for Album model"""
-    list_display = ('title', 'release_date', 'cover_image', 'cover_image_url', 'created_at')
+    list_display = ('title', 'release_date', 'track_count', 'total_plays', 'cover_image', 'cover_image_url', 'created_at')
     list_filter = ('release_date',)
     search_fields = ('title', 'artist__name')
     filter_horizontal = ('artist',)
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('track_count', 'total_duration', 'total_plays', 'created_at', 'updated_at')
 
 
 @admin.register(Tag)
@@ -30,14 +32,39 @@ class TagAdmin(TranslationAdmin):
     readonly_fields = ('created_at',)
 
 
+class DuplicateCandidateInline(admin.TabularInline):
+    """Likely duplicates of a track found by acoustic fingerprinting"""
+    model = DuplicateCandidate
+    fk_name = 'music'
+    extra = 0
+    fields = ('duplicate_of', 'score', 'matched_hashes', 'status', 'created_at')
+    readonly_fields = ('duplicate_of', 'score', 'matched_hashes', 'created_at')
+    can_delete = False
+
+
+class PendingDuplicateFilter(admin.SimpleListFilter):
+    """Filter tracks flagged as likely duplicates awaiting review"""
+    title = 'duplicate review'
+    parameter_name = 'duplicate_review'
+    
+    def lookups(self, request, model_admin):
+        return (('pending', 'Pending review'),)
+    
+    def queryset(self, request, queryset):
+        if self.value() == 'pending':
+            return queryset.filter(duplicate_flags__status=DuplicateCandidate.Status.PENDING).distinct()
+        return queryset
+
+
 @admin.register(Music)
 class MusicAdmin(TranslationAdmin):
     """Admin configuration for Music model"""
     list_display = ('title', 'album', 'audio_file', 'audio_url', 'language', 'play_count', 'uploaded_by', 'created_at')
-    list_filter = ('language', 'album', 'created_at')
+    list_filter = (PendingDuplicateFilter, 'language', 'album', 'created_at')
     search_fields = ('title', 'artist__name', 'album__title')
     filter_horizontal = ('artist', 'tags',)
-    readonly_fields = ('play_count', 'created_at', 'updated_at')
+    readonly_fields = ('play_count', 'audio_blob', 'created_at', 'updated_at')
+    inlines = [DuplicateCandidateInline]
     
     def save_model(self, request, obj, form, change):
         if not change:  # If creating new object
@@ -45,14 +72,58 @@ class MusicAdmin(TranslationAdmin):
         super().save_model(request, obj, form, change)
 
 
+class PlaylistTrackInline(admin.TabularInline):
+    """Tracks of a playlist in play order; new rows are appended"""
+    model = PlaylistTrack
+    fields = ('music', 'position', 'added_at')
+    readonly_fields = ('position', 'added_at')
+    raw_id_fields = ('music',)
+    extra = 0
+
+
 @admin.register(Playlist)
 class PlaylistAdmin(TranslationAdmin):
     """Admin configuration for Playlist model"""
-    list_display = ('name', 'user', 'is_public', 'track_count', 'created_at')
+    list_display = ('name', 'user', 'is_public', 'track_count', 'total_duration', 'created_at')
     list_filter = ('is_public', 'created_at')
     search_fields = ('name', 'user__email')
-    filter_horizontal = ('music_tracks',)
-    readonly_fields = ('created_at', 'updated_at')
+    inlines = [PlaylistTrackInline]
+    readonly_fields = ('track_count', 'total_duration', 'revision', 'created_at', 'updated_at')
+
+    def save_formset(self, request, form, formset, change):
+        """
+        Write track changes through the batch path, which keeps counters, change log and play queue in step.
+
+        A row pointed at another track replaces the old track in its place.
+        """
+        if formset.model is not PlaylistTrack:
+            return super().save_formset(request, form, formset, change)
+        formset.save(commit=False)
+        deleted = set(formset.deleted_forms)
+        removed = {entry.initial['music'] for entry in formset.initial_forms if entry in deleted}
+        replaced = {
+            entry.initial['music']: entry.cleaned_data['music'].pk for entry in formset.initial_forms
+            if entry not in deleted and 'music' in entry.changed_data
+        }
+        order = [entry.initial['music'] for entry in formset.initial_forms]
+        kept = [music_id for music_id in order if music_id not in removed and music_id not in replaced]
+
+        add, previous = [], None
+        for music_id in order:
+            if music_id in removed:
+                continue
+            if music_id in replaced:
+                if previous is not None:
+                    anchor = {'after_id': previous}
+                else:
+                    anchor = {'before_id': kept[0]} if kept else {}
+                add.append({'music_id': replaced[music_id], **anchor})
+                previous = replaced[music_id]
+            else:
+                previous = music_id
+        add += [{'music_id': entry.music_id} for entry in formset.new_objects]
+        if removed or replaced or add:
+            apply_playlist_changes(form.instance, add=add, remove=[*removed, *replaced])
 
 
 @admin.register(RecentlyPlayed)
@@ -128,3 +199,45 @@ class AdClickAdmin(admin.ModelAdmin):
     list_filter = ('created_at',)
     search_fields = ('advertisement__title', 'user__email', 'session_id')
     readonly_fields = ('created_at',)
+
+
+# Import and register chunked upload and audio storage models
+from .upload_models import UploadSession
+from .blob_models import AudioBlob
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    """Admin configuration for UploadSession model"""
+    list_display = ('filename', 'user', 'status', 'received_bytes', 'total_size', 'expires_at', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('filename', 'user__email')
+    readonly_fields = ('id', 'received_bytes', 'music', 'created_at', 'updated_at')
+
+
+@admin.register(AudioBlob)
+class AudioBlobAdmin(admin.ModelAdmin):
+    """Admin configuration for AudioBlob model"""
+    list_display = ('sha256', 'size', 'ref_count', 'created_at')
+    search_fields = ('sha256',)
+    readonly_fields = ('sha256', 'file', 'preview_file', 'size', 'ref_count', 'created_at')
+
+
+@admin.register(DuplicateCandidate)
+class DuplicateCandidateAdmin(admin.ModelAdmin):
+    """Admin configuration for DuplicateCandidate model"""
+    list_display = ('music', 'duplicate_of', 'score', 'matched_hashes', 'status', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('music__title', 'duplicate_of__title')
+    readonly_fields = ('music', 'duplicate_of', 'score', 'matched_hashes', 'created_at', 'reviewed_at')
+    actions = ['confirm_duplicates', 'dismiss_duplicates']
+    
+    def confirm_duplicates(self, request, queryset):
+        updated = queryset.update(status=DuplicateCandidate.Status.CONFIRMED, reviewed_at=timezone.now())
+        self.message_user(request, f'{updated} duplicate(s) confirmed.')
+    confirm_duplicates.short_description = "Confirm selected duplicates"
+    
+    def dismiss_duplicates(self, request, queryset):
+        updated = queryset.update(status=DuplicateCandidate.Status.DISMISSED, reviewed_at=timezone.now())
+        self.message_user(request, f'{updated} duplicate(s) dismissed.')
+    dismiss_duplicates.short_description = "Dismiss selected duplicates"
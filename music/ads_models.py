@@ -40,6 +40,13 @@ class Advertisement(models.Model):
         blank=True,
         help_text=_('For banner and interstitial ads')
     )
+    image_derivatives = models.JSONField(
+        _('image derivatives'),
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text=_('Resized WebP/JPEG versions of the image')
+    )
     video_file = models.FileField(
         _('video file'),
         upload_to='ads/videos/',
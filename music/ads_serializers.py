@@ -1,10 +1,12 @@
 from rest_framework import serializers
+from api.fields import DerivativeImageField
 from .ads_models import Advertisement, AdImpression, AdClick
 
 
 class AdvertisementSerializer(serializers.ModelSerializer):
     """Serializer for Advertisement model"""
     click_through_rate = serializers.FloatField(read_only=True)
+    image = DerivativeImageField(size='large', required=False, allow_null=True)
     
     class Meta:
         model = Advertisement
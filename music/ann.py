@@ -0,0 +1,225 @@
+"""
+Approximate nearest-neighbour index over track feature vectors.
+
+A track's vector joins three families, each scaled to unit length and then
+by its ANN_*_WEIGHT: its IDF-weighted tags and its co-listened neighbours
+(``TrackNeighbours``), both folded into a few dimensions by fixed random
+projections, and its language as a one-hot. The whole vector is unit
+length too, so similarity is a dot product.
+
+The index is an inverted file (IVF): spherical k-means splits the catalog
+into lists around centroids and a query scans only the ANN_PROBES lists
+whose centroids are closest, ranking their tracks exactly.
+
+``build_index`` writes the arrays as .npy files into a fresh directory under
+ANN_INDEX_DIR and then atomically repoints ``CURRENT`` at it. Workers
+memory-map the current build and reopen it once ``CURRENT`` changes, so the
+pages are shared through the OS page cache instead of copied per process.
+"""
+
+import os
+import shutil
+import threading
+import time
+import numpy as np
+from django.conf import settings
+from .models import Music, TrackNeighbours
+
+ARRAYS = ('ids', 'vectors', 'centroids', 'offsets', 'sorted_ids', 'sorted_rows')
+# Rows scored at a time when assigning tracks to lists
+ROW_CHUNK = 65536
+# Builds kept on disk: the current one and the one workers may still have open
+KEEP_BUILDS = 2
+
+_lock = threading.Lock()
+_loaded = {'build': None, 'index': None}
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def _projection(rows, dimensions, seed):
+    """Fixed Gaussian projection, so a build is reproducible from the same data"""
+    return np.random.default_rng(seed).standard_normal((rows, dimensions)).astype(np.float32) / np.sqrt(dimensions)
+
+
+def track_vectors():
+    """(sorted track IDs, unit-length float32 vectors in the same order)"""
+    ids = np.array(sorted(Music.objects.values_list('id', flat=True)), dtype=np.int64)
+    families = []
+
+    # Tags, weighted by inverse frequency
+    pairs = np.array(list(Music.tags.through.objects.values_list('music_id', 'tag_id')), dtype=np.int64).reshape(-1, 2)
+    pairs = pairs[np.isin(pairs[:, 0], ids)]
+    tags = np.zeros((len(ids), settings.ANN_TAG_DIMENSIONS), dtype=np.float32)
+    if len(pairs):
+        counts = np.bincount(pairs[:, 1])
+        idf = np.log1p(len(ids) / np.maximum(counts, 1)).astype(np.float32)
+        projection = _projection(len(counts), settings.ANN_TAG_DIMENSIONS, seed=1)
+        np.add.at(tags, np.searchsorted(ids, pairs[:, 0]), projection[pairs[:, 1]] * idf[pairs[:, 1], None])
+    families.append((tags, settings.ANN_TAG_WEIGHT))
+
+    # Co-listening: a track's own random signature plus its neighbours', by score
+    signatures = _projection(len(ids), settings.ANN_COOCCURRENCE_DIMENSIONS, seed=2)
+    cooccurrence = np.zeros_like(signatures)
+    for music_id, neighbour_ids, scores in TrackNeighbours.objects.values_list('music_id', 'neighbour_ids', 'scores') \
+            .iterator(chunk_size=2000):
+        row = np.searchsorted(ids, music_id)
+        if row == len(ids) or ids[row] != music_id:
+            continue
+        neighbour_ids = np.frombuffer(neighbour_ids, dtype=np.int64)
+        scores = np.frombuffer(scores, dtype=np.float32)
+        present = np.isin(neighbour_ids, ids)
+        cooccurrence[row] = signatures[row] + scores[present] @ signatures[np.searchsorted(ids, neighbour_ids[present])]
+    families.append((cooccurrence, settings.ANN_COOCCURRENCE_WEIGHT))
+
+    column_of = {language: column for column, language in enumerate(Music.Language.values)}
+    pairs = np.array([
+        (music_id, column_of[language]) for music_id, language in Music.objects.values_list('id', 'language')
+        if language in column_of
+    ], dtype=np.int64).reshape(-1, 2)
+    pairs = pairs[np.isin(pairs[:, 0], ids)]
+    languages = np.zeros((len(ids), len(column_of)), dtype=np.float32)
+    languages[np.searchsorted(ids, pairs[:, 0]), pairs[:, 1]] = 1
+    families.append((languages, settings.ANN_LANGUAGE_WEIGHT))
+
+    return ids, _normalize(np.hstack([_normalize(family) * weight for family, weight in families]))
+
+
+def _assign(vectors, centroids):
+    """Index of the closest centroid for every vector"""
+    return np.concatenate([
+        np.argmax(vectors[start:start + ROW_CHUNK] @ centroids.T, axis=1)
+        for start in range(0, len(vectors), ROW_CHUNK)
+    ] or [np.empty(0, dtype=np.int64)])
+
+
+def _kmeans(vectors, lists):
+    """Spherical k-means centroids trained on a sample of the vectors"""
+    rng = np.random.default_rng(0)
+    sample = vectors[rng.choice(len(vectors), min(len(vectors), settings.ANN_TRAINING_SAMPLE), replace=False)]
+    centroids = sample[rng.choice(len(sample), lists, replace=False)].copy()
+    for _iteration in range(settings.ANN_KMEANS_ITERATIONS):
+        assignment = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        # Lists that lost every member restart from a random sample vector
+        empty = np.flatnonzero(np.bincount(assignment, minlength=lists) == 0)
+        sums[empty] = sample[rng.choice(len(sample), len(empty))]
+        centroids = _normalize(sums)
+    return centroids
+
+
+def build_index(directory=None):
+    """Build a new index from the current catalog and make it current; returns the track count"""
+    directory = directory or settings.ANN_INDEX_DIR
+    ids, vectors = track_vectors()
+    lists = min(settings.ANN_LISTS or max(int(np.sqrt(len(ids))), 1), settings.ANN_TRAINING_SAMPLE, len(ids))
+    centroids = _kmeans(vectors, lists) if lists else np.zeros((0, vectors.shape[1]), dtype=np.float32)
+
+    # Rows are grouped by list, so each list is one contiguous slice
+    assignment = _assign(vectors, centroids)
+    order = np.argsort(assignment, kind='stable')
+    arrays = {
+        'ids': ids[order],
+        'vectors': vectors[order],
+        'centroids': centroids,
+        'offsets': np.searchsorted(assignment[order], np.arange(lists + 1)),
+        # Track IDs were sorted before grouping, so this maps them back to rows
+        'sorted_ids': ids,
+        'sorted_rows': np.argsort(order),
+    }
+
+    build = f'build-{time.time_ns()}'
+    os.makedirs(os.path.join(directory, build))
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, build, f'{name}.npy'), array)
+    pointer = os.path.join(directory, 'CURRENT')
+    with open(f'{pointer}.tmp', 'w') as handle:
+        handle.write(build)
+    os.replace(f'{pointer}.tmp', pointer)
+
+    for old in sorted(name for name in os.listdir(directory) if name.startswith('build-'))[:-KEEP_BUILDS]:
+        shutil.rmtree(os.path.join(directory, old), ignore_errors=True)
+    return len(ids)
+
+
+class AnnIndex:
+    """A memory-mapped build"""
+
+    def __init__(self, path):
+        for name in ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r'))
+
+    def vector_of(self, music_id):
+        at = np.searchsorted(self.sorted_ids, music_id)
+        if at == len(self.sorted_ids) or self.sorted_ids[at] != music_id:
+            return None
+        return self.vectors[self.sorted_rows[at]]
+
+    def _top(self, rows, scores, limit, exclude_ids, with_scores):
+        keep = ~np.isin(self.ids[rows], np.asarray(list(exclude_ids), dtype=np.int64))
+        rows, scores = rows[keep], scores[keep]
+        best = np.lexsort((self.ids[rows], -scores))[:limit]
+        if with_scores:
+            return list(zip(self.ids[rows[best]].tolist(), scores[best].tolist()))
+        return self.ids[rows[best]].tolist()
+
+    def search(self, vector, limit, probes=None, exclude_ids=(), with_scores=False):
+        """IDs (or ``(id, similarity)`` pairs) of about the ``limit`` tracks closest to a vector, best first"""
+        if not len(self.centroids):
+            return []
+        probes = min(probes or settings.ANN_PROBES, len(self.centroids))
+        lists = np.argpartition(-(self.centroids @ vector), probes - 1)[:probes]
+        rows = np.concatenate([np.arange(self.offsets[cluster], self.offsets[cluster + 1]) for cluster in lists])
+        return self._top(rows, self.vectors[rows] @ vector, limit, exclude_ids, with_scores)
+
+    def exact_search(self, vector, limit, exclude_ids=()):
+        """Brute-force reference for ``search``"""
+        return self._top(np.arange(len(self.ids)), self.vectors @ vector, limit, exclude_ids, False)
+
+    def similar(self, music_id, limit, probes=None, with_scores=False):
+        """Tracks most like a track, which is left out; empty if it is not indexed"""
+        vector = self.vector_of(music_id)
+        if vector is None:
+            return []
+        return self.search(vector, limit, probes, exclude_ids=[music_id], with_scores=with_scores)
+
+
+def current_index(directory=None):
+    """The current build, memory-mapped once per process; None before the first build"""
+    directory = directory or settings.ANN_INDEX_DIR
+    try:
+        with open(os.path.join(directory, 'CURRENT')) as handle:
+            build = os.path.join(directory, handle.read().strip())
+    except FileNotFoundError:
+        return None
+    with _lock:
+        if _loaded['build'] != build:
+            _loaded['index'], _loaded['build'] = AnnIndex(build), build
+        return _loaded['index']
+
+
+def measure_recall(index, queries, limit, probes=None):
+    """
+    Compare ``search`` with brute force on a sample of indexed tracks.
+
+    Returns ``(mean recall@limit, mean ANN seconds, mean brute-force seconds)``.
+    """
+    rng = np.random.default_rng(0)
+    rows = rng.choice(len(index.ids), min(queries, len(index.ids)), replace=False)
+    recalls, ann_time, exact_time = [], 0.0, 0.0
+    for row in rows:
+        vector, music_id = index.vectors[row], int(index.ids[row])
+        started = time.perf_counter()
+        found = index.search(vector, limit, probes, exclude_ids=[music_id])
+        ann_time += time.perf_counter() - started
+        started = time.perf_counter()
+        expected = index.exact_search(vector, limit, exclude_ids=[music_id])
+        exact_time += time.perf_counter() - started
+        if expected:
+            recalls.append(len(set(found) & set(expected)) / len(expected))
+    count = max(len(rows), 1)
+    return (float(np.mean(recalls)) if recalls else 1.0), ann_time / count, exact_time / count
@@ -7,4 +7,5 @@ class MusicConfig(AppConfig):
     verbose_name = 'Music Management'
 
     def ready(self):
+        import music.checks
         import music.signals
@@ -0,0 +1,104 @@
+"""
+Per-artist summaries: top tracks by recent plays, albums with their track
+counts, and total plays.
+
+Summaries are rebuilt for a batch of artists at once with two queries (album
+track counts come from ``Album.track_count``) and one upsert. Anything that
+can change them (flushed plays, tracks gaining or losing artists or moving
+between albums, albums edited or deleted) only flags the affected rows stale with one UPDATE;
+``refresh_stale_summaries`` rebuilds those every ARTIST_SUMMARY_REFRESH_INTERVAL
+through Celery beat, and an artist without a row gets one on first read.
+
+Each mark also bumps the row's ``marks`` counter. A rebuild reads the counter
+before anything else and stores it as ``marks_built``; a row whose counter
+moved on meanwhile is flagged stale again, so a mark made during a rebuild
+is never lost.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from .models import Album, Artist, ArtistSummary, Music
+
+
+def build_summaries(artist_ids):
+    """Rebuild the summaries of these artists; returns them"""
+    # Read first: marks committed after this are picked up by the next rebuild
+    marks = dict(Artist.objects.filter(pk__in=list(artist_ids)).values_list('id', 'summary__marks'))
+    artist_ids = list(marks)
+    if not artist_ids:
+        return []
+    since = timezone.now() - timedelta(days=settings.ARTIST_SUMMARY_WINDOW_DAYS)
+
+    tracks = defaultdict(list)
+    rows = Music.artist.through.objects.filter(artist_id__in=artist_ids).annotate(
+        recent=Count('music__recent_plays', filter=Q(music__recent_plays__played_at__gte=since))
+    ).values_list('artist_id', 'music_id', 'music__play_count', 'recent')
+    for artist_id, music_id, play_count, recent in rows:
+        tracks[artist_id].append((-recent, -play_count, music_id))
+
+    albums = defaultdict(list)
+    rows = Album.artist.through.objects.filter(artist_id__in=artist_ids) \
+        .order_by(F('album__release_date').desc(nulls_last=True), 'album_id') \
+        .values_list('artist_id', 'album_id', 'album__track_count')
+    for artist_id, album_id, track_count in rows:
+        albums[artist_id].append([album_id, track_count])
+
+    summaries = []
+    for artist_id in artist_ids:
+        ranked = sorted(tracks[artist_id])
+        summaries.append(ArtistSummary(
+            artist_id=artist_id,
+            top_track_ids=[music_id for _recent, _plays, music_id in ranked[:settings.ARTIST_SUMMARY_TOP_TRACKS]],
+            albums=albums[artist_id],
+            track_count=len(ranked),
+            total_plays=-sum(plays for _recent, plays, _music_id in ranked),
+            stale=False,
+            marks_built=marks[artist_id] or 0,
+        ))
+    summaries = ArtistSummary.objects.bulk_create(
+        summaries,
+        update_conflicts=True,
+        unique_fields=['artist'],
+        update_fields=['top_track_ids', 'albums', 'track_count', 'total_plays', 'stale', 'marks_built', 'refreshed_at']
+    )
+    ArtistSummary.objects.filter(pk__in=artist_ids, marks__gt=F('marks_built')).update(stale=True)
+    return summaries
+
+
+def artist_summary(artist_id):
+    """The artist's summary, built on first use; a stale one is served until it is refreshed"""
+    summary = ArtistSummary.objects.filter(artist_id=artist_id).first()
+    if summary is None:
+        built = build_summaries([artist_id])
+        summary = built[0] if built else None
+    return summary
+
+
+def mark_stale(artist_ids=(), music_ids=(), album_ids=()):
+    """Flag the summaries of these artists, and of the artists of these tracks and albums"""
+    query = Q()
+    if artist_ids:
+        query |= Q(artist_id__in=list(artist_ids))
+    if music_ids:
+        query |= Q(artist__music_tracks__in=list(music_ids))
+    if album_ids:
+        query |= Q(artist__albums__in=list(album_ids))
+    if query:
+        ArtistSummary.objects.filter(query).update(stale=True, marks=F('marks') + 1)
+
+
+def refresh_stale_summaries(batch_size=None):
+    """Rebuild every stale summary, a batch at a time; returns how many were rebuilt"""
+    batch_size = batch_size or settings.ARTIST_SUMMARY_BATCH_SIZE
+    refreshed, last_id = 0, 0
+    while True:
+        artist_ids = list(ArtistSummary.objects.filter(stale=True, pk__gt=last_id)
+                          .order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not artist_ids:
+            return refreshed
+        build_summaries(artist_ids)
+        refreshed += len(artist_ids)
+        last_id = artist_ids[-1]
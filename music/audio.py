@@ -0,0 +1,97 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import wave
+from contextlib import contextmanager
+import numpy as np
+
+
+class UnsupportedAudioError(Exception):
+    """Raised when an audio file cannot be decoded in this environment"""
+
+
+@contextmanager
+def local_file_path(field_file):
+    """
+    Yield a filesystem path for a stored file.
+
+    Files on local storage are used in place; remote files (e.g. S3) are copied
+    to a temporary file chunk by chunk.
+    """
+    try:
+        yield field_file.path
+        return
+    except NotImplementedError:
+        pass
+
+    extension = os.path.splitext(field_file.name)[1]
+    with tempfile.NamedTemporaryFile(suffix=extension) as local_copy:
+        with field_file.open('rb') as source:
+            for chunk in source.chunks():
+                local_copy.write(chunk)
+        local_copy.flush()
+        yield local_copy.name
+
+
+def _read_wav(path, block_frames=1 << 16):
+    """Read a PCM WAV file as mono float32 samples, one block at a time"""
+    dtypes = {1: np.uint8, 2: np.int16, 4: np.int32}
+    with wave.open(path, 'rb') as wav:
+        sample_width = wav.getsampwidth()
+        if sample_width not in dtypes:
+            raise UnsupportedAudioError(f'Unsupported WAV sample width: {sample_width * 8} bits')
+        channels = wav.getnchannels()
+        rate = wav.getframerate()
+        scale = float(1 << (sample_width * 8 - 1))
+        blocks = []
+        while True:
+            raw = wav.readframes(block_frames)
+            if not raw:
+                break
+            block = np.frombuffer(raw, dtype=dtypes[sample_width]).astype(np.float32)
+            if sample_width == 1:
+                block -= 128.0
+            blocks.append(block.reshape(-1, channels).mean(axis=1) / scale)
+    samples = np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+    return samples, rate
+
+
+def _resample(samples, rate, target_rate):
+    """Low-pass with a box filter and linearly resample to ``target_rate``"""
+    if rate == target_rate or not len(samples):
+        return samples.astype(np.float32)
+    width = int(np.ceil(rate / target_rate))
+    if width > 1:
+        samples = np.convolve(samples, np.ones(width, dtype=np.float32) / width, mode='same')
+    duration = len(samples) / rate
+    target_times = np.arange(int(duration * target_rate)) / target_rate
+    return np.interp(target_times, np.arange(len(samples)) / rate, samples).astype(np.float32)
+
+
+def decode_pcm(path, sample_rate):
+    """
+    Decode an audio file to mono float32 PCM at ``sample_rate``.
+
+    WAV is decoded natively; other formats need ``ffmpeg`` on the PATH.
+    """
+    if path.lower().endswith('.wav'):
+        try:
+            samples, rate = _read_wav(path)
+        except wave.Error as exc:
+            raise UnsupportedAudioError(str(exc)) from exc
+        return _resample(samples, rate, sample_rate)
+
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        raise UnsupportedAudioError(f'ffmpeg is required to decode {os.path.basename(path)}')
+    result = subprocess.run(
+        [ffmpeg, '-nostdin', '-v', 'error', '-i', path,
+         '-ac', '1', '-ar', str(sample_rate), '-f', 'f32le', '-'],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=False
+    )
+    if result.returncode != 0:
+        raise UnsupportedAudioError(result.stderr.decode(errors='replace').strip())
+    return np.frombuffer(result.stdout, dtype=np.float32)
@@ -0,0 +1,93 @@
+import hashlib
+import os
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
+from django.utils.translation import gettext_lazy as _
+
+
+def blob_upload_path(instance, filename):
+    """Store audio blobs under their SHA-256, keeping the original extension"""
+    extension = os.path.splitext(filename)[1].lower()
+    return f'music/blobs/{instance.sha256[:2]}/{instance.sha256}{extension}'
+
+
+def content_sha256(content):
+    """Return the SHA-256 of a file, reusing the digest computed while it was uploaded"""
+    digest = getattr(content, 'sha256', None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    for chunk in content.chunks():
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class AudioBlobManager(models.Manager):
+    """Reference-counted access to content-addressed audio blobs"""
+
+    def store(self, content, name=''):
+        """
+        Return the blob holding ``content`` and take a reference to it.
+
+        Bytes are only written to storage the first time a given hash is seen;
+        identical uploads just bump the reference count.
+        """
+        sha256 = content_sha256(content)
+        if self.filter(sha256=sha256).update(ref_count=F('ref_count') + 1):
+            return self.get(sha256=sha256)
+
+        blob = self.model(sha256=sha256, size=content.size, ref_count=1)
+        blob.file.save(os.path.basename(name or content.name), content, save=False)
+        try:
+            with transaction.atomic():
+                blob.save()
+        except IntegrityError:
+            # Another request stored the same audio first; keep theirs
+            blob.file.delete(save=False)
+            self.filter(sha256=sha256).update(ref_count=F('ref_count') + 1)
+            return self.get(sha256=sha256)
+        return blob
+
+    def release(self, blob_id):
+        """Drop a reference, deleting the blob and its file once nothing uses it"""
+        with transaction.atomic():
+            blob = self.select_for_update().filter(pk=blob_id).first()
+            if blob is None:
+                return
+            if blob.ref_count > 1:
+                self.filter(pk=blob_id).update(ref_count=F('ref_count') - 1)
+                return
+            storage = blob.file.storage
+            names = [blob.file.name] + ([blob.preview_file.name] if blob.preview_file else [])
+            blob.delete()
+            transaction.on_commit(lambda: [storage.delete(name) for name in names])
+
+
+class AudioBlob(models.Model):
+    """Deduplicated audio file addressed by the SHA-256 of its content"""
+    sha256 = models.CharField(_('SHA-256'), max_length=64, unique=True)
+    file = models.FileField(_('file'), upload_to=blob_upload_path, max_length=255)
+    preview_file = models.FileField(
+        _('preview file'),
+        max_length=255,
+        null=True,
+        blank=True,
+        help_text=_('Short clip cut from the original for previews')
+    )
+    size = models.PositiveBigIntegerField(_('size'), help_text=_('Size in bytes'))
+    ref_count = models.PositiveIntegerField(
+        _('reference count'),
+        default=0,
+        help_text=_('Number of tracks using this file')
+    )
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+
+    objects = AudioBlobManager()
+
+    class Meta:
+        verbose_name = _('audio blob')
+        verbose_name_plural = _('audio blobs')
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
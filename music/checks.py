@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Backends whose entries other processes never see
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Favorite arrays, play queues, the tag index and listening history are
+    invalidated by bumping versions in the cache, and radio stations live in
+    it; with a per-process cache other web and Celery workers never see those
+    writes and keep serving stale data.
+    """
+    if settings.CACHES.get('default', {}).get('BACKEND') in PROCESS_LOCAL_CACHES:
+        return [Warning(
+            'The default cache is local to each process.',
+            hint='Point CACHES at a cache shared by every web and Celery worker, e.g. Redis via CACHE_REDIS_URL.',
+            id='music.W001',
+        )]
+    return []
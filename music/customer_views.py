@@ -3,16 +3,30 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.db.models import Q, Count
+from django.conf import settings
+from django.db.models import Case, Q, When
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from datetime import timedelta
 from accounts.permissions import IsOwnerOrAdmin
 from api.response import success_response, error_response
 from api.messages import *
-from .models import Playlist, RecentlyPlayed, Favorite, Music, Tag
+from api.pagination import PositionCursorPagination
+from .models import Playlist, PlaylistTrack, RecentlyPlayed, Favorite, Music, Artist, Tag
+from .favorites import apply_favorite_operations, favorite_changes, favorite_ids, sync_token
+from .listening_history import recent_music_ids, recent_plays
+from .playlist_ops import apply_playlist_changes, PlaylistOperationError
+from .radio import next_batch, start_session
+from .recommender import recommend_for_user
+from .tag_index import similar_by_tags
+from .taste import rank_by_taste
+from .tasks import update_taste_profile
+from .signals import clear_user_home_cache
 from .serializers import (
-    PlaylistSerializer, PlaylistCreateSerializer, PlaylistAddTrackSerializer,
+    PlaylistSerializer, PlaylistCreateSerializer, PlaylistAddTrackSerializer, PlaylistTrackPositionSerializer,
+    PlaylistTrackSerializer, PlaylistBulkUpdateSerializer, PlaylistChangeSerializer, PlaylistSyncQuerySerializer,
+    PublicPlaylistSerializer, PublicPlaylistQuerySerializer,
+    FavoriteSyncSerializer, FavoriteChangesQuerySerializer, RadioStartSerializer, RadioBatchQuerySerializer,
     RecentlyPlayedSerializer, FavoriteSerializer, MusicListSerializer,
     NormalizedMusicSerializer, HomeSectionSerializer, HomeFeedSerializer
 )
@@ -30,12 +44,8 @@ class PlaylistViewSet(viewsets.ModelViewSet):
         if self.request.user.is_authenticated:
             return Playlist.objects.filter(
                 Q(user=self.request.user) | Q(is_public=True)
-            ).prefetch_related('music_tracks').annotate(
-                track_count=Count('music_tracks')
-            )
-        return Playlist.objects.filter(is_public=True).annotate(
-            track_count=Count('music_tracks')
-        )
+            ).select_related('user')
+        return Playlist.objects.filter(is_public=True)
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -58,7 +68,7 @@ class PlaylistViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['post'])
     def add_track(self, request, pk=None):
-        """Add a track to playlist"""
+        """Add a track to playlist, at the end or next to `after_id`/`before_id`"""
         playlist = self.get_object()
         
         # Check ownership
@@ -68,15 +78,63 @@ class PlaylistViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        serializer = PlaylistAddTrackSerializer(data=request.data)
+        serializer = PlaylistTrackPositionSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
         music = serializer.validated_data['music_id']
-        playlist.music_tracks.add(music)
+        try:
+            entry, _created = PlaylistTrack.objects.insert(
+                playlist, music,
+                after=serializer.validated_data.get('after_id'),
+                before=serializer.validated_data.get('before_id')
+            )
+        except PlaylistTrack.DoesNotExist:
+            return Response(
+                error_response(message=BUSINESS_ANCHOR_NOT_IN_PLAYLIST),
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         return Response(success_response(
             message=SUCCESS_ADDED,
-            data=PlaylistSerializer(playlist).data
+            data=self._track_delta(playlist, 'added', music.id, entry.position)
+        ))
+    
+    @action(detail=True, methods=['post'])
+    def move_track(self, request, pk=None):
+        """Move a track after `after_id` or before `before_id` (default: to the end)"""
+        playlist = self.get_object()
+        
+        # Check ownership
+        if playlist.user != request.user:
+            return Response(
+                error_response(message=PERMISSION_DENIED),
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        serializer = PlaylistTrackPositionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        music = serializer.validated_data['music_id']
+        if not PlaylistTrack.objects.filter(playlist=playlist, music=music).exists():
+            return Response(
+                error_response(message=BUSINESS_TRACK_NOT_IN_PLAYLIST),
+                status=status.HTTP_404_NOT_FOUND
+            )
+        try:
+            entry = PlaylistTrack.objects.move(
+                playlist, music,
+                after=serializer.validated_data.get('after_id'),
+                before=serializer.validated_data.get('before_id')
+            )
+        except PlaylistTrack.DoesNotExist:
+            return Response(
+                error_response(message=BUSINESS_ANCHOR_NOT_IN_PLAYLIST),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(success_response(
+            message=SUCCESS_UPDATED,
+            data=self._track_delta(playlist, 'moved', music.id, entry.position)
         ))
     
     @action(detail=True, methods=['post'])
@@ -99,15 +157,125 @@ class PlaylistViewSet(viewsets.ModelViewSet):
         
         return Response(success_response(
             message=SUCCESS_REMOVED,
-            data=PlaylistSerializer(playlist).data
+            data=self._track_delta(playlist, 'removed', music.id)
         ))
     
+    @action(detail=True, methods=['post'], url_path='tracks/bulk')
+    def bulk_tracks(self, request, pk=None):
+        """Apply lists of remove, move and add operations in one transaction"""
+        playlist = self.get_object()
+        
+        # Check ownership
+        if playlist.user != request.user:
+            return Response(
+                error_response(message=PERMISSION_DENIED),
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        serializer = PlaylistBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        try:
+            changes = apply_playlist_changes(playlist, **serializer.validated_data)
+        except PlaylistOperationError as exc:
+            return Response(
+                error_response(message=str(exc), errors={'operation': exc.operation}),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        playlist.refresh_from_db(fields=['track_count', 'total_duration'])
+        return Response(success_response(
+            message=SUCCESS_UPDATED,
+            data={
+                'playlist_id': playlist.id,
+                'added': [{'music_id': m, 'position': p} for m, p in changes['added'].items()],
+                'removed': changes['removed'],
+                'moved': [{'music_id': m, 'position': p} for m, p in changes['moved'].items()],
+                'track_count': playlist.track_count,
+                'total_duration': playlist.total_duration,
+            }
+        ))
+    
+    @action(detail=True, methods=['get'])
+    def sync(self, request, pk=None):
+        """
+        Track operations after revision `since`, in order. When some of them
+        are no longer in the change log (or `since` is missing or unknown),
+        the current track order is returned as a snapshot instead.
+        Operations are idempotent, so replaying one already applied is harmless.
+        """
+        playlist = self.get_object()
+        query = PlaylistSyncQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        since = query.validated_data.get('since')
+        
+        data = {
+            'playlist_id': playlist.id,
+            'track_count': playlist.track_count,
+            'total_duration': playlist.total_duration,
+        }
+        if since is not None and playlist.compacted_revision <= since <= playlist.revision:
+            changes = list(playlist.changes.filter(revision__gt=since))
+            # A compaction running meanwhile may have removed the first entries
+            if not changes or changes[0].revision == since + 1:
+                data.update(
+                    mode='changes',
+                    revision=changes[-1].revision if changes else since,
+                    changes=PlaylistChangeSerializer(changes, many=True).data
+                )
+                return Response(success_response(data=data))
+        
+        data.update(
+            mode='snapshot',
+            revision=playlist.revision,
+            tracks=list(PlaylistTrack.objects.filter(playlist=playlist).values('music_id', 'position'))
+        )
+        return Response(success_response(data=data))
+    
+    @action(detail=True, methods=['get'])
+    def tracks(self, request, pk=None):
+        """List the playlist's tracks in order, one cursor page at a time"""
+        playlist = self.get_object()
+        entries = PlaylistTrack.objects.filter(playlist=playlist).select_related(
+            'music__album'
+        ).prefetch_related('music__artist', 'music__tags')
+        
+        paginator = PositionCursorPagination()
+        page = paginator.paginate_queryset(entries, request, view=self)
+        serializer = PlaylistTrackSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+    
+    def _track_delta(self, playlist, change, music_id, position=None):
+        """Small response describing a single-track change"""
+        playlist.refresh_from_db(fields=['track_count', 'total_duration'])
+        return {
+            'playlist_id': playlist.id,
+            'change': change,
+            'music_id': music_id,
+            'position': position,
+            'track_count': playlist.track_count,
+            'total_duration': playlist.total_duration,
+        }
+    
+    @action(detail=False, methods=['get'])
+    def public(self, request):
+        """Browse public playlists by popularity (default) or `?ordering=recent`"""
+        query = PublicPlaylistQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        
+        # Both orderings are served by partial indexes on public rows
+        ordering = ('-popularity', '-id') if query.validated_data['ordering'] == 'popular' else ('-updated_at', '-id')
+        playlists = Playlist.objects.filter(is_public=True).order_by(*ordering).select_related('user').only(
+            'id', 'name', 'track_count', 'total_duration', 'updated_at', 'user__first_name', 'user__last_name'
+        )
+        page = self.paginate_queryset(playlists)
+        serializer = PublicPlaylistSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
     @action(detail=False, methods=['get'])
     def my_playlists(self, request):
         """Get current user's playlists"""
-        playlists = Playlist.objects.filter(user=request.user).annotate(
-            track_count=Count('music_tracks')
-        )
+        playlists = Playlist.objects.filter(user=request.user).select_related('user')
         serializer = PlaylistSerializer(playlists, many=True)
         return Response(success_response(data=serializer.data))
 
@@ -140,14 +308,13 @@ class FavoriteViewSet(viewsets.ViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Check if already favorited
-        if Favorite.objects.filter(user=request.user, music=music).exists():
+        favorite = Favorite.objects.add(request.user, music)
+        if favorite is None:
             return Response(
                 error_response(message=BUSINESS_ALREADY_FAVORITED),
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        favorite = Favorite.objects.create(user=request.user, music=music)
         serializer = FavoriteSerializer(favorite, context={'request': request})
         
         return Response(
@@ -166,15 +333,49 @@ class FavoriteViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        try:
-            favorite = Favorite.objects.get(user=request.user, music_id=music_id)
-            favorite.delete()
-            return Response(success_response(message=SUCCESS_REMOVED))
-        except Favorite.DoesNotExist:
+        if not Favorite.objects.remove(request.user, music_id):
             return Response(
                 error_response(message=BUSINESS_NOT_FAVORITED),
                 status=status.HTTP_404_NOT_FOUND
             )
+        return Response(success_response(message=SUCCESS_REMOVED))
+    
+    @action(detail=False, methods=['post'])
+    def sync(self, request):
+        """Apply queued offline toggles (last writer wins) and return the resulting favorites"""
+        serializer = FavoriteSyncSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        # Taken first, so changes made while this runs show up in the next delta
+        version = sync_token()
+        added, removed = apply_favorite_operations(request.user, serializer.validated_data['operations'])
+        if added or removed:
+            clear_user_home_cache(request.user.id)
+        if added:
+            # Bulk-created favorites send no post_save to feed the taste profile;
+            # they are dated at the client's timestamps like the favorites themselves
+            update_taste_profile.delay(request.user.id, [
+                (music_id, settings.TASTE_FAVORITE_WEIGHT, created_at.isoformat())
+                for music_id, created_at in Favorite.objects.filter(user=request.user, music_id__in=added)
+                .values_list('music_id', 'created_at')
+            ])
+        
+        return Response(success_response(message=SUCCESS_UPDATED, data={
+            'favorite_ids': list(favorite_ids(request.user.id)),
+            'added': sorted(added),
+            'removed': sorted(removed),
+            'version': version,
+        }))
+    
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """Favorites added and removed since the `since` version token"""
+        query = FavoriteChangesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        
+        version = sync_token()
+        added, removed = favorite_changes(request.user, query.validated_data['since'])
+        return Response(success_response(data={'added': added, 'removed': removed, 'version': version}))
 
 
 class RecentlyPlayedViewSet(viewsets.ViewSet):
@@ -182,15 +383,73 @@ class RecentlyPlayedViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
     
     def list(self, request):
-        """Get user's recently played music"""
-        recently_played = RecentlyPlayed.objects.filter(
-            user=request.user
-        ).select_related('music').order_by('-played_at')[:50]
+        """Get user's recently played music (one cache lookup, then one query for the tracks)"""
+        plays = recent_plays(request.user.id)
+        tracks = Music.objects.select_related('album').prefetch_related('artist', 'tags').in_bulk(
+            [music_id for music_id, _played_at in plays]
+        )
+        recently_played = [
+            RecentlyPlayed(user=request.user, music=tracks[music_id], played_at=played_at)
+            for music_id, played_at in plays if music_id in tracks
+        ]
         
         serializer = RecentlyPlayedSerializer(recently_played, many=True, context={'request': request})
         return Response(success_response(data=serializer.data))
 
 
+class RadioViewSet(viewsets.ViewSet):
+    """Endless radio: batches of upcoming track IDs for a station seeded by a track, artist or tag"""
+    permission_classes = [IsAuthenticated]
+    # (request field, seed kind, model, lookup, message when missing)
+    seed_types = (
+        ('track_id', 'track', Music, 'id', NOT_FOUND_MUSIC),
+        ('artist_id', 'artist', Artist, 'id', NOT_FOUND_ARTIST),
+        ('tag', 'tag', Tag, 'name', NOT_FOUND_TAG),
+    )
+
+    def create(self, request):
+        """Start a station and return its session token with the first batch"""
+        serializer = RadioStartSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        field, kind, model, lookup, message = next(seed for seed in self.seed_types if seed[0] in data)
+        if not model.objects.filter(**{lookup: data[field]}).exists():
+            return Response(
+                error_response(message=message),
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        token = start_session(request.user.id, kind, data[field])
+        track_ids = next_batch(request.user.id, token, data['size'])
+        return Response(
+            success_response(message=SUCCESS_CREATED, data={'session': token, 'track_ids': track_ids}),
+            status=status.HTTP_201_CREATED
+        )
+
+    def retrieve(self, request, pk=None):
+        """The next batch of a station; each call continues where the last one stopped"""
+        query = RadioBatchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        track_ids = next_batch(request.user.id, pk, query.validated_data['size'])
+        if track_ids is None:
+            return Response(
+                error_response(message=RADIO_SESSION_NOT_FOUND),
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(success_response(data={'session': pk, 'track_ids': track_ids}))
+
+
+def music_in_order(music_ids):
+    """Queryset of the given tracks that keeps the order of the ID list"""
+    if not music_ids:
+        return Music.objects.none()
+    return Music.objects.filter(id__in=music_ids).order_by(
+        Case(*[When(id=music_id, then=rank) for rank, music_id in enumerate(music_ids)])
+    )
+
+
 class HomeViewSet(viewsets.ViewSet):
     """ViewSet for personalized home feed with normalization and pagination"""
     permission_classes = [IsAuthenticated]
@@ -201,7 +460,7 @@ class HomeViewSet(viewsets.ViewSet):
         music_ids = set()
         
         # 1. Recently Played (Preserve order)
-        recently_played_ids = list(RecentlyPlayed.objects.filter(user=user).order_by('-played_at').values_list('music_id', flat=True)[:10])
+        recently_played_ids = recent_music_ids(user.id, 10)
         if recently_played_ids:
             sections.append({
                 'title': _("Recently Played"),
@@ -220,35 +479,27 @@ class HomeViewSet(viewsets.ViewSet):
             })
             music_ids.update(favorite_ids)
         
-        # 3. Recommended by Artists
-        favorite_artists = user.profile.favorite_artists.all()
-        if favorite_artists.exists():
-            recommended_by_artists = Music.objects.filter(
-                artist__in=favorite_artists
-            ).exclude(id__in=recently_played_ids).distinct().order_by('-play_count')[:15]
-            
-            rec_ids = list(recommended_by_artists.values_list('id', flat=True))
-            if rec_ids:
-                sections.append({
-                    'title': _("Recommended for You"),
-                    'slug': "recommended_for_you",
-                    'items': rec_ids
-                })
-                music_ids.update(rec_ids)
+        # 3. Recommended from co-listened tracks (Preserve order)
+        rec_ids = recommend_for_user(user.id, 15)
+        rec_position = len(sections)
+        if rec_ids:
+            sections.append({
+                'title': _("Recommended for You"),
+                'slug': "recommended_for_you",
+                'items': rec_ids
+            })
+            music_ids.update(rec_ids)
 
-        # 4. Recommended by Mood/Tags
+        # 4. Tracks whose tags match the recent plays' (Preserve order)
         if recently_played_ids:
-            recent_tags = Tag.objects.filter(music_tracks__id__in=recently_played_ids[:5]).distinct()
-            if recent_tags.exists():
-                recommended_by_tags = Music.objects.filter(tags__in=recent_tags).exclude(id__in=recently_played_ids).distinct().order_by('-play_count')[:15]
-                tag_ids = list(recommended_by_tags.values_list('id', flat=True))
-                if tag_ids:
-                    sections.append({
-                        'title': _("Based on your mood"),
-                        'slug': "recommended_mood",
-                        'items': tag_ids
-                    })
-                    music_ids.update(tag_ids)
+            tag_ids = similar_by_tags(recently_played_ids[:5], 15, exclude_ids=recently_played_ids)
+            if tag_ids:
+                sections.append({
+                    'title': _("Based on your mood"),
+                    'slug': "recommended_mood",
+                    'items': tag_ids
+                })
+                music_ids.update(tag_ids)
 
         # 5. Trending
         trending = Music.objects.order_by('-play_count')[:15]
@@ -272,6 +523,16 @@ class HomeViewSet(viewsets.ViewSet):
             })
             music_ids.update(new_ids)
 
+        # Without co-listened tracks, recommend from the lists above by taste
+        if not rec_ids:
+            rec_ids = rank_by_taste(user.id, list(dict.fromkeys(trending_ids + new_ids)))[:15]
+            if rec_ids:
+                sections.insert(rec_position, {
+                    'title': _("Recommended for You"),
+                    'slug': "recommended_for_you",
+                    'items': rec_ids
+                })
+
         # 7. Popular in Language
         user_lang = user.profile.language
         lang_enum = Music.Language.ARABIC if user_lang == 'ar' else Music.Language.ENGLISH
@@ -335,7 +596,7 @@ class HomeViewSet(viewsets.ViewSet):
         queryset = Music.objects.none()
 
         if slug == 'recently_played':
-            recently_played_ids = RecentlyPlayed.objects.filter(user=user).order_by('-played_at').values_list('music_id', flat=True)
+            recently_played_ids = recent_music_ids(user.id)
             queryset = Music.objects.filter(id__in=recently_played_ids)
         elif slug == 'favorites':
             favorite_ids = Favorite.objects.filter(user=user).values_list('music_id', flat=True)
@@ -345,12 +606,16 @@ class HomeViewSet(viewsets.ViewSet):
         elif slug == 'new_releases':
             queryset = Music.objects.order_by('-created_at')
         elif slug == 'recommended_for_you':
-            favorite_artists = user.profile.favorite_artists.all()
-            queryset = Music.objects.filter(artist__in=favorite_artists).order_by('-play_count')
+            rec_ids = recommend_for_user(user.id, settings.RECOMMENDER_SECTION_SIZE)
+            if not rec_ids:
+                trending_ids = Music.objects.order_by('-play_count').values_list('id', flat=True)
+                rec_ids = rank_by_taste(user.id, list(trending_ids[:settings.RECOMMENDER_SECTION_SIZE]))
+            queryset = music_in_order(rec_ids)
         elif slug == 'recommended_mood':
-            recently_played_ids = RecentlyPlayed.objects.filter(user=user).order_by('-played_at').values_list('music_id', flat=True)[:5]
-            recent_tags = Tag.objects.filter(music_tracks__id__in=recently_played_ids).distinct()
-            queryset = Music.objects.filter(tags__in=recent_tags).exclude(id__in=recently_played_ids).distinct().order_by('-play_count')
+            recently_played_ids = recent_music_ids(user.id)
+            queryset = music_in_order(similar_by_tags(
+                recently_played_ids[:5], settings.RECOMMENDER_SECTION_SIZE, exclude_ids=recently_played_ids
+            ))
         elif slug == 'popular_language':
             user_lang = getattr(user.profile, 'language', 'en')
             lang_enum = Music.Language.ARABIC if user_lang == 'ar' else Music.Language.ENGLISH
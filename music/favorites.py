@@ -0,0 +1,127 @@
+"""
+Per-user favorites membership used for every ``is_favorite`` check.
+
+A user's favorites are cached as one sorted array of music IDs, so a check
+is a binary search and a whole page of tracks costs two cache round trips
+per request, however many favorites the user has. The array is cached
+under a per-user version that the Favorite receivers in ``signals.py`` bump
+on every change; an array built from data that changed meanwhile ends up
+under a stale version and is never read. Versions only reach other web and
+Celery workers through a shared cache backend (see ``music.checks``).
+
+Offline clients replay queued toggles through ``apply_favorite_operations``
+and catch up with ``favorite_changes``, using ``FavoriteRemoval`` tombstones
+to resolve conflicts and report removals.
+"""
+
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from .models import Favorite, FavoriteRemoval, Music
+
+
+def _version_key(user_id):
+    return f'favorite_ids_version_{user_id}'
+
+
+def bump_favorites_version(user_id):
+    """Make the user's cached favorites unreachable so they are rebuilt on next use"""
+    cache.set(_version_key(user_id), time.time_ns(), None)
+
+
+def favorite_ids(user_id):
+    """Sorted array of the IDs of the user's favorite tracks"""
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = time.time_ns()
+        cache.set(_version_key(user_id), version, None)
+    key = f'favorite_ids_{user_id}_{version}'
+    ids = cache.get(key)
+    if ids is None:
+        ids = array('q', sorted(Favorite.objects.filter(user_id=user_id).values_list('music_id', flat=True)))
+        cache.set(key, ids, settings.FAVORITE_IDS_CACHE_TIMEOUT)
+    return ids
+
+
+def is_favorite(request, music_id):
+    """Whether the requesting user has favorited a track; loads the array once per request"""
+    if request is None or not request.user.is_authenticated:
+        return False
+    ids = getattr(request, '_favorite_ids', None)
+    if ids is None:
+        ids = request._favorite_ids = favorite_ids(request.user.id)
+    index = bisect_left(ids, music_id)
+    return index < len(ids) and ids[index] == music_id
+
+
+def sync_token(moment=None):
+    """Opaque version token: the server time in microseconds"""
+    return int((moment or timezone.now()).timestamp() * 1_000_000)
+
+
+def token_time(token):
+    return datetime.fromtimestamp(token / 1_000_000, tz=dt_timezone.utc)
+
+
+def apply_favorite_operations(user, operations):
+    """
+    Apply queued ``{'music_id', 'action', 'timestamp'}`` operations last-writer-wins.
+
+    Per track only the latest operation counts, and it only applies when it is
+    newer than the stored state: the favorite's ``created_at`` or the removal's
+    ``removed_at``. Timestamps in the future are clamped to now. Tracks that no
+    longer exist are skipped. Returns ``(added, removed)`` music ID lists.
+    """
+    now = timezone.now()
+    latest = {}
+    for operation in operations:
+        music_id = operation['music_id']
+        if music_id not in latest or operation['timestamp'] >= latest[music_id]['timestamp']:
+            latest[music_id] = {**operation, 'timestamp': min(operation['timestamp'], now)}
+
+    with transaction.atomic():
+        existing = set(Music.objects.filter(pk__in=latest).values_list('id', flat=True))
+        favorited = dict(Favorite.objects.filter(user=user, music_id__in=existing).values_list('music_id', 'created_at'))
+        removals = dict(FavoriteRemoval.objects.filter(user=user, music_id__in=existing).values_list('music_id', 'removed_at'))
+
+        added, removed, tombstones = [], [], {}
+        for music_id in existing:
+            operation = latest[music_id]
+            stored = max(filter(None, (favorited.get(music_id), removals.get(music_id))), default=None)
+            if stored is not None and operation['timestamp'] <= stored:
+                continue
+            if operation['action'] == 'add':
+                if music_id not in favorited:
+                    added.append(music_id)
+            else:
+                tombstones[music_id] = operation['timestamp']
+                if music_id in favorited:
+                    removed.append(music_id)
+
+        Favorite.objects.bulk_create(
+            [Favorite(user=user, music_id=music_id, created_at=latest[music_id]['timestamp']) for music_id in added],
+            ignore_conflicts=True
+        )
+        if removed:
+            Favorite.objects.filter(user=user, music_id__in=removed).delete()
+        if tombstones:
+            FavoriteRemoval.objects.record(user, tombstones)
+
+    # bulk_create sends no post_save, so the cached array is refreshed here
+    if added:
+        bump_favorites_version(user.pk)
+    return added, removed
+
+
+def favorite_changes(user, since):
+    """``(added, removed)`` music IDs changed after a sync token"""
+    moment = token_time(since)
+    added = list(Favorite.objects.filter(user=user, updated_at__gt=moment).values_list('music_id', flat=True))
+    removed = list(FavoriteRemoval.objects.filter(user=user, updated_at__gt=moment)
+                   .exclude(music_id__in=added).values_list('music_id', flat=True))
+    return sorted(added), sorted(removed)
@@ -0,0 +1,178 @@
+"""
+Acoustic fingerprinting for duplicate detection.
+
+Tracks are decoded to mono PCM, turned into a log-magnitude spectrogram and
+reduced to its local peaks. Pairs of nearby peaks ("landmarks") are packed
+into integer hashes that survive re-encoding at a different bitrate. The
+hashes are stored in an inverted index (FingerprintHash, indexed on hash), and
+a query votes for (track, time offset) pairs so that only tracks sharing many
+hashes at a consistent offset count as matches.
+"""
+
+import logging
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from numpy.lib.stride_tricks import sliding_window_view
+from .audio import decode_pcm, local_file_path, UnsupportedAudioError
+from .fingerprint_models import FingerprintHash, DuplicateCandidate
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SIZE = 1024
+HOP_SIZE = 512
+PEAK_NEIGHBOURHOOD = (15, 11)  # (frequency bins, frames)
+FAN_OUT = 5
+MAX_DELTA_FRAMES = 63
+QUERY_BATCH_SIZE = 500
+
+
+def spectrogram(samples, block_frames=1024):
+    """Log-magnitude STFT of ``samples`` as a (frequency, time) array"""
+    if len(samples) < WINDOW_SIZE:
+        return np.zeros((WINDOW_SIZE // 2 + 1, 0), dtype=np.float32)
+    frames = sliding_window_view(samples, WINDOW_SIZE)[::HOP_SIZE]
+    window = np.hanning(WINDOW_SIZE).astype(np.float32)
+    blocks = [
+        np.log1p(np.abs(np.fft.rfft(frames[start:start + block_frames] * window, axis=1)))
+        for start in range(0, len(frames), block_frames)
+    ]
+    return np.concatenate(blocks).T.astype(np.float32)
+
+
+def _max_filter(values, size):
+    """Separable 2-D maximum filter"""
+    for axis, width in enumerate(size):
+        pad = [(0, 0), (0, 0)]
+        pad[axis] = (width // 2, width // 2)
+        padded = np.pad(values, pad, mode='constant', constant_values=-np.inf)
+        values = sliding_window_view(padded, width, axis=axis).max(axis=-1)
+    return values
+
+
+def find_peaks(spec):
+    """Return (frequency bins, frames) of the spectrogram's prominent local maxima"""
+    if not spec.size:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    threshold = spec.mean() + spec.std()
+    peaks = (spec == _max_filter(spec, PEAK_NEIGHBOURHOOD)) & (spec > threshold)
+    freqs, times = np.nonzero(peaks)
+    return freqs.astype(np.int64), times.astype(np.int64)
+
+
+def landmark_hashes(freqs, times):
+    """
+    Pair each peak with the next ``FAN_OUT`` peaks in time.
+
+    A hash packs (anchor frequency, target frequency, frame delta) into one
+    integer; the returned offsets are the anchor frames.
+    """
+    order = np.lexsort((freqs, times))
+    freqs, times = freqs[order], times[order]
+    hashes, offsets = [], []
+    for step in range(1, FAN_OUT + 1):
+        delta = times[step:] - times[:-step]
+        keep = (delta > 0) & (delta <= MAX_DELTA_FRAMES)
+        hashes.append((freqs[:-step][keep] << 16) | (freqs[step:][keep] << 6) | delta[keep])
+        offsets.append(times[:-step][keep])
+    if not hashes:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(hashes), np.concatenate(offsets)
+
+
+def compute_fingerprint(samples):
+    """Return (hashes, offsets) for mono PCM samples"""
+    return landmark_hashes(*find_peaks(spectrogram(samples)))
+
+
+def find_matches(hashes, offsets, exclude_music_id=None):
+    """
+    Look the hashes up in the inverted index.
+
+    Returns ``[(music_id, matched_hashes, score)]`` ordered by score, where
+    ``matched_hashes`` is the largest number of hashes agreeing on a single
+    time offset and ``score`` is that count relative to the query size.
+    """
+    if not len(hashes):
+        return []
+
+    order = np.argsort(hashes, kind='stable')
+    query_hashes, query_offsets = hashes[order], offsets[order]
+    unique_hashes = np.unique(query_hashes)
+
+    rows = []
+    for start in range(0, len(unique_hashes), QUERY_BATCH_SIZE):
+        batch = unique_hashes[start:start + QUERY_BATCH_SIZE].tolist()
+        postings = FingerprintHash.objects.filter(hash__in=batch)
+        if exclude_music_id is not None:
+            postings = postings.exclude(music_id=exclude_music_id)
+        rows.extend(postings.values_list('music_id', 'hash', 'offset'))
+    if not rows:
+        return []
+
+    music_ids, row_hashes, row_offsets = (np.array(column, dtype=np.int64) for column in zip(*rows))
+
+    # Pair every posting with every query occurrence of the same hash
+    lo = np.searchsorted(query_hashes, row_hashes, side='left')
+    hi = np.searchsorted(query_hashes, row_hashes, side='right')
+    counts = hi - lo
+    posting_index = np.repeat(np.arange(len(rows)), counts)
+    query_index = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    deltas = row_offsets[posting_index] - query_offsets[query_index]
+
+    # Votes per (track, offset); a track's strength is its best-aligned offset
+    pairs = np.stack([music_ids[posting_index], deltas], axis=1)
+    aligned, votes = np.unique(pairs, axis=0, return_counts=True)
+    best = {}
+    for (music_id, _delta), count in zip(aligned.tolist(), votes.tolist()):
+        if count > best.get(music_id, 0):
+            best[music_id] = count
+
+    total = len(hashes)
+    return sorted(
+        ((music_id, count, count / total) for music_id, count in best.items()),
+        key=lambda match: match[2],
+        reverse=True
+    )
+
+
+def index_fingerprint(music, hashes, offsets):
+    """Replace the track's postings in the inverted index"""
+    with transaction.atomic():
+        FingerprintHash.objects.filter(music=music).delete()
+        FingerprintHash.objects.bulk_create(
+            (FingerprintHash(music=music, hash=int(h), offset=int(o)) for h, o in zip(hashes, offsets)),
+            batch_size=1000
+        )
+
+
+def fingerprint_track(music):
+    """
+    Fingerprint a track's audio file, flag likely duplicates and index it.
+
+    Returns the list of DuplicateCandidate rows created or updated.
+    """
+    if not music.audio_file:
+        return []
+    try:
+        with local_file_path(music.audio_file) as path:
+            samples = decode_pcm(path, settings.FINGERPRINT_SAMPLE_RATE)
+    except UnsupportedAudioError as exc:
+        logger.info('Skipping fingerprint for music %s: %s', music.pk, exc)
+        return []
+
+    hashes, offsets = compute_fingerprint(samples)
+    matches = find_matches(hashes, offsets, exclude_music_id=music.pk)
+    index_fingerprint(music, hashes, offsets)
+
+    flagged = []
+    for music_id, matched, score in matches:
+        if matched < settings.FINGERPRINT_MIN_MATCHES or score < settings.FINGERPRINT_MIN_SCORE:
+            continue
+        candidate, _created = DuplicateCandidate.objects.update_or_create(
+            music=music,
+            duplicate_of_id=music_id,
+            defaults={'score': score, 'matched_hashes': matched}
+        )
+        flagged.append(candidate)
+    return flagged
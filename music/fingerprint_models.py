@@ -0,0 +1,76 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class FingerprintHash(models.Model):
+    """
+    One landmark hash of a track's acoustic fingerprint.
+
+    Together the rows form an inverted index from hash to (track, time offset),
+    so candidate matches are found with index lookups instead of a catalog scan.
+    """
+    music = models.ForeignKey(
+        'music.Music',
+        on_delete=models.CASCADE,
+        related_name='fingerprint_hashes',
+        verbose_name=_('music')
+    )
+    hash = models.IntegerField(_('hash'))
+    offset = models.PositiveIntegerField(_('offset'), help_text=_('Anchor time in spectrogram frames'))
+
+    class Meta:
+        verbose_name = _('fingerprint hash')
+        verbose_name_plural = _('fingerprint hashes')
+        indexes = [
+            models.Index(fields=['hash']),
+        ]
+
+    def __str__(self):
+        return f"{self.hash} @ {self.offset}"
+
+
+class DuplicateCandidate(models.Model):
+    """Likely duplicate track found by acoustic fingerprinting, pending admin review"""
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', _('Pending')
+        CONFIRMED = 'CONFIRMED', _('Confirmed')
+        DISMISSED = 'DISMISSED', _('Dismissed')
+
+    music = models.ForeignKey(
+        'music.Music',
+        on_delete=models.CASCADE,
+        related_name='duplicate_flags',
+        verbose_name=_('music')
+    )
+    duplicate_of = models.ForeignKey(
+        'music.Music',
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name=_('duplicate of')
+    )
+    score = models.FloatField(
+        _('score'),
+        help_text=_('Share of the fingerprint hashes that matched at a consistent offset')
+    )
+    matched_hashes = models.PositiveIntegerField(_('matched hashes'), default=0)
+    status = models.CharField(
+        _('status'),
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    reviewed_at = models.DateTimeField(_('reviewed at'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('duplicate candidate')
+        verbose_name_plural = _('duplicate candidates')
+        ordering = ['-created_at']
+        unique_together = [['music', 'duplicate_of']]
+        indexes = [
+            models.Index(fields=['status', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.music_id} may duplicate {self.duplicate_of_id} ({self.score:.0%})"
@@ -0,0 +1,68 @@
+from django.apps import apps
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class ReleaseNoticeManager(models.Manager):
+    def fan_out(self, music_id, artist_ids, chunk_size=None):
+        """
+        Tell the followers of ``artist_ids`` about a new track; returns how many follows were read.
+
+        Followers are read from the join table in primary key order, one
+        chunk per query, and each chunk is inserted with one statement. The
+        unique (user, music) pair tells followers of several of the artists
+        once, and makes announcing a track again harmless.
+        """
+        chunk_size = chunk_size or settings.RELEASE_FANOUT_CHUNK_SIZE
+        follows = apps.get_model('accounts', 'UserProfile').favorite_artists.through.objects \
+            .filter(artist_id__in=artist_ids).order_by('pk')
+        read, last_pk = 0, 0
+        while True:
+            chunk = list(follows.filter(pk__gt=last_pk).values_list('pk', 'userprofile__user_id', 'artist_id')[:chunk_size])
+            if chunk:
+                last_pk = chunk[-1][0]
+                read += len(chunk)
+                self.bulk_create(
+                    [self.model(user_id=user_id, music_id=music_id, artist_id=artist_id) for _pk, user_id, artist_id in chunk],
+                    ignore_conflicts=True
+                )
+            if len(chunk) < chunk_size:
+                return read
+
+
+class ReleaseNotice(models.Model):
+    """A new track by an artist the user follows"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='release_notices',
+        verbose_name=_('user')
+    )
+    music = models.ForeignKey(
+        'music.Music',
+        on_delete=models.CASCADE,
+        related_name='release_notices',
+        verbose_name=_('music')
+    )
+    artist = models.ForeignKey(
+        'music.Artist',
+        on_delete=models.CASCADE,
+        related_name='release_notices',
+        verbose_name=_('artist')
+    )
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+
+    objects = ReleaseNoticeManager()
+
+    class Meta:
+        verbose_name = _('release notice')
+        verbose_name_plural = _('release notices')
+        ordering = ['-created_at']
+        unique_together = [['user', 'music']]
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.music_id} for {self.user_id}"
@@ -0,0 +1,111 @@
+import posixpath
+from io import BytesIO
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+# Image fields that get resized derivatives, by model label. Each model has a
+# matching ``<field>_derivatives`` JSON field holding the generated file names.
+IMAGE_DERIVATIVE_FIELDS = {
+    'music.Artist': 'image',
+    'music.Album': 'cover_image',
+    'music.Advertisement': 'image',
+    'accounts.UserProfile': 'profile_image',
+}
+
+SAVE_OPTIONS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def _prepare(image, image_format):
+    """Convert to a mode the target format can store"""
+    if image_format == 'jpeg':
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            return background
+        return image.convert('RGB')
+    if image.mode not in ('RGB', 'RGBA'):
+        return image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+    return image
+
+
+def render_derivatives(field_file):
+    """
+    Resize an image into every configured size and format.
+
+    Files are stored in a ``derivatives/`` folder next to the original and the
+    returned mapping is what goes into the ``<field>_derivatives`` JSON field.
+    """
+    storage = field_file.storage
+    directory = posixpath.join(posixpath.dirname(field_file.name), 'derivatives')
+    basename = posixpath.splitext(posixpath.basename(field_file.name))[0]
+    largest = max(settings.IMAGE_DERIVATIVE_SIZES.values())
+
+    with field_file.open('rb'):
+        image = Image.open(field_file)
+        # Let the JPEG decoder downscale while decoding instead of after
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    derivatives = {'source': field_file.name}
+    sizes = sorted(settings.IMAGE_DERIVATIVE_SIZES.items(), key=lambda item: item[1], reverse=True)
+    for size_name, max_pixels in sizes:
+        # Resize from the previous (larger) step; thumbnail() never upscales
+        image.thumbnail((max_pixels, max_pixels), Image.Resampling.LANCZOS)
+        derivatives[size_name] = {}
+        for image_format in settings.IMAGE_DERIVATIVE_FORMATS:
+            buffer = BytesIO()
+            _prepare(image, image_format).save(buffer, **SAVE_OPTIONS[image_format])
+            extension = 'jpg' if image_format == 'jpeg' else image_format
+            name = storage.save(
+                f'{directory}/{basename}_{size_name}.{extension}',
+                ContentFile(buffer.getvalue())
+            )
+            derivatives[size_name][image_format] = name
+    return derivatives
+
+
+def derivative_file_names(derivatives):
+    """All file names listed in a derivatives mapping"""
+    return [
+        name
+        for key, formats in (derivatives or {}).items() if key != 'source'
+        for name in formats.values()
+    ]
+
+
+def update_image_derivatives(model_label, pk):
+    """Generate derivatives for one object and store them if the image is unchanged"""
+    model = apps.get_model(model_label)
+    field_name = IMAGE_DERIVATIVE_FIELDS[model_label]
+    derivatives_field = f'{field_name}_derivatives'
+
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return None
+    image = getattr(instance, field_name)
+    previous = getattr(instance, derivatives_field) or {}
+    if not image:
+        derivatives = {}
+    elif previous.get('source') == image.name:
+        return previous
+    else:
+        derivatives = render_derivatives(image)
+
+    # Only store the result if the image was not replaced in the meantime
+    if image:
+        unchanged = Q(**{field_name: image.name})
+    else:
+        unchanged = Q(**{field_name: ''}) | Q(**{f'{field_name}__isnull': True})
+    updated = model.objects.filter(unchanged, pk=pk).update(**{derivatives_field: derivatives})
+    stale = previous if updated else derivatives
+    for name in derivative_file_names(stale):
+        image.storage.delete(name)
+    return derivatives if updated else None
@@ -0,0 +1,261 @@
+"""
+Per-user listening history held in the cache tier as bounded lists.
+
+Each user has a history list, the latest LISTENING_HISTORY_BUFFER plays as
+``music_id:timestamp`` entries, newest first, and a list of the plays not
+yet written to ``RecentlyPlayed``; users with pending plays are kept in a
+sorted set scored by the time of their oldest one. With Redis, recording a
+play is a single MULTI/EXEC (LPUSH and LTRIM on the history, LPUSH on the
+pending list, ZADD NX on the set), so concurrent plays never overwrite each
+other and nothing touches the database; the length LPUSH returns tells the
+caller when to flush. Reading is one LRANGE, deduplicated to one entry per
+track and at most LISTENING_HISTORY_SIZE of them.
+
+A flush takes the whole pending list in one MULTI/EXEC and upserts it into
+``RecentlyPlayed``; plays recorded meanwhile start a new list, and plays
+whose write fails are pushed back. The periodic
+``flush_pending_listening_history`` sweep catches users who stopped before
+LISTENING_HISTORY_FLUSH_SIZE plays. Pending plays are only as durable as the
+Redis server. A history missing from the cache (first use or evicted) is
+seeded once from ``RecentlyPlayed``. Flushed plays also feed the user's
+taste profile and mark their artists' summaries stale.
+
+Other cache backends (development runs tasks inline with a process-local
+cache) keep the same lists as plain cache entries under a process lock.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.db import transaction
+from django.utils import timezone
+from .artist_summaries import mark_stale
+from .models import Music, RecentlyPlayed
+from .taste import record_taste_events
+
+PENDING_USERS_KEY = 'listening_history_pending_users'
+
+
+def _keys(user_id):
+    """(history, seeded marker, pending plays) cache keys of a user"""
+    return (
+        f'listening_history_{user_id}',
+        f'listening_history_seeded_{user_id}',
+        f'listening_history_pending_{user_id}',
+    )
+
+
+def _encode(music_id, played_at):
+    return f'{music_id}:{played_at!r}'
+
+
+def _decode(entry):
+    music_id, played_at = entry.split(':')
+    return int(music_id), float(played_at)
+
+
+class _RedisHistory:
+    """The lists as native Redis lists; every write is one MULTI/EXEC"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def _keys(self, user_id):
+        return [cache.make_key(key) for key in _keys(user_id)]
+
+    def record(self, user_id, entry, now):
+        """Append a play; returns how many plays are pending"""
+        history, seeded, pending = self._keys(user_id)
+        timeout = settings.LISTENING_HISTORY_CACHE_TIMEOUT
+        with self.client.pipeline() as pipe:
+            pipe.lpush(history, entry).ltrim(history, 0, settings.LISTENING_HISTORY_BUFFER - 1)
+            pipe.expire(history, timeout).expire(seeded, timeout)
+            pipe.lpush(pending, entry).zadd(cache.make_key(PENDING_USERS_KEY), {user_id: now}, nx=True)
+            return pipe.execute()[4]
+
+    def read(self, user_id):
+        """The history entries, or None before it is seeded"""
+        history, seeded, _pending = self._keys(user_id)
+        with self.client.pipeline(transaction=False) as pipe:
+            entries, is_seeded = pipe.lrange(history, 0, -1).exists(seeded).execute()
+        return [entry.decode() for entry in entries] if is_seeded else None
+
+    def seed(self, user_id, entries):
+        """Put older plays behind the ones recorded so far, once; returns the history"""
+        history, seeded, _pending = self._keys(user_id)
+        timeout = settings.LISTENING_HISTORY_CACHE_TIMEOUT
+        with self.client.pipeline() as pipe:
+            if self.client.set(seeded, 1, ex=timeout, nx=True) and entries:
+                pipe.rpush(history, *entries).ltrim(history, 0, settings.LISTENING_HISTORY_BUFFER - 1)
+                pipe.expire(history, timeout)
+            pipe.lrange(history, 0, -1)
+            return [entry.decode() for entry in pipe.execute()[-1]]
+
+    def take(self, user_id):
+        """Remove and return the pending plays"""
+        _history, _seeded, pending = self._keys(user_id)
+        with self.client.pipeline() as pipe:
+            pipe.lrange(pending, 0, -1).delete(pending).zrem(cache.make_key(PENDING_USERS_KEY), user_id)
+            return [entry.decode() for entry in pipe.execute()[0]]
+
+    def give_back(self, user_id, entries):
+        """Return plays taken by a failed flush, behind any recorded since"""
+        _history, _seeded, pending = self._keys(user_id)
+        oldest = min(_decode(entry)[1] for entry in entries)
+        with self.client.pipeline() as pipe:
+            pipe.rpush(pending, *entries).zadd(cache.make_key(PENDING_USERS_KEY), {user_id: oldest}, lt=True)
+            pipe.execute()
+
+    def due(self, cutoff):
+        """IDs of users whose oldest pending play is no newer than ``cutoff``"""
+        return [int(user_id) for user_id in self.client.zrangebyscore(cache.make_key(PENDING_USERS_KEY), '-inf', cutoff)]
+
+
+class _LocalHistory:
+    """The same lists as plain cache entries, updated under a process lock"""
+
+    lock = threading.Lock()
+
+    def record(self, user_id, entry, now):
+        history, seeded, pending = _keys(user_id)
+        timeout = settings.LISTENING_HISTORY_CACHE_TIMEOUT
+        with self.lock:
+            cache.set(history, [entry] + cache.get(history, [])[:settings.LISTENING_HISTORY_BUFFER - 1], timeout)
+            cache.touch(seeded, timeout)
+            plays = [entry] + cache.get(pending, [])
+            cache.set(pending, plays, None)
+            users = cache.get(PENDING_USERS_KEY, {})
+            users.setdefault(user_id, now)
+            cache.set(PENDING_USERS_KEY, users, None)
+        return len(plays)
+
+    def read(self, user_id):
+        history, seeded, _pending = _keys(user_id)
+        entries = cache.get_many([history, seeded])
+        return entries.get(history, []) if seeded in entries else None
+
+    def seed(self, user_id, entries):
+        history, seeded, _pending = _keys(user_id)
+        timeout = settings.LISTENING_HISTORY_CACHE_TIMEOUT
+        with self.lock:
+            current = cache.get(history, [])
+            if cache.add(seeded, 1, timeout):
+                current = (current + entries)[:settings.LISTENING_HISTORY_BUFFER]
+                cache.set(history, current, timeout)
+        return current
+
+    def take(self, user_id):
+        _history, _seeded, pending = _keys(user_id)
+        with self.lock:
+            entries = cache.get(pending, [])
+            cache.delete(pending)
+            users = cache.get(PENDING_USERS_KEY, {})
+            users.pop(user_id, None)
+            cache.set(PENDING_USERS_KEY, users, None)
+        return entries
+
+    def give_back(self, user_id, entries):
+        _history, _seeded, pending = _keys(user_id)
+        oldest = min(_decode(entry)[1] for entry in entries)
+        with self.lock:
+            cache.set(pending, cache.get(pending, []) + entries, None)
+            users = cache.get(PENDING_USERS_KEY, {})
+            users[user_id] = min(users.get(user_id, oldest), oldest)
+            cache.set(PENDING_USERS_KEY, users, None)
+
+    def due(self, cutoff):
+        return [user_id for user_id, oldest in cache.get(PENDING_USERS_KEY, {}).items() if oldest <= cutoff]
+
+
+def _store():
+    if isinstance(cache, RedisCache):
+        return _RedisHistory(cache._cache.get_client(write=True))
+    return _LocalHistory()
+
+
+def _load(user_id):
+    """[(music_id, played_at timestamp), ...] for a user, newest first"""
+    store = _store()
+    entries = store.read(user_id)
+    if entries is None:
+        entries = store.seed(user_id, [
+            _encode(music_id, played_at.timestamp())
+            for music_id, played_at in RecentlyPlayed.objects.filter(user_id=user_id)
+            .order_by('-played_at').values_list('music_id', 'played_at')[:settings.LISTENING_HISTORY_SIZE]
+        ])
+    latest = {}
+    for music_id, played_at in map(_decode, entries):
+        latest.setdefault(music_id, played_at)
+    return list(latest.items())[:settings.LISTENING_HISTORY_SIZE]
+
+
+def recent_plays(user_id, limit=None):
+    """Most recent plays as (music_id, played_at datetime), newest first"""
+    return [
+        (music_id, datetime.fromtimestamp(played_at, tz=dt_timezone.utc))
+        for music_id, played_at in _load(user_id)[:limit]
+    ]
+
+
+def recent_music_ids(user_id, limit=None):
+    """IDs of the most recently played tracks, newest first"""
+    return [music_id for music_id, _played_at in _load(user_id)[:limit]]
+
+
+def record_play(user_id, music_id):
+    """
+    Put a track at the top of the user's history.
+
+    Returns True when enough plays are pending that the caller should queue
+    ``flush_listening_history`` for this user.
+    """
+    now = time.time()
+    return _store().record(user_id, _encode(music_id, now), now) >= settings.LISTENING_HISTORY_FLUSH_SIZE
+
+
+def flush_history(user_id):
+    """Move the user's pending plays into RecentlyPlayed; returns how many tracks were written"""
+    store = _store()
+    entries = store.take(user_id)
+    if not entries:
+        return 0
+    plays = [
+        (music_id, datetime.fromtimestamp(played_at, tz=dt_timezone.utc))
+        for music_id, played_at in map(_decode, entries)
+    ]
+    latest = {}
+    for music_id, played_at in plays:
+        latest[music_id] = max(played_at, latest.get(music_id, played_at))
+
+    try:
+        with transaction.atomic():
+            # Tracks deleted since they were played have no row to point to
+            existing = set(Music.objects.filter(pk__in=latest).values_list('id', flat=True))
+            RecentlyPlayed.objects.bulk_create(
+                [
+                    RecentlyPlayed(user_id=user_id, music_id=music_id, played_at=played_at)
+                    for music_id, played_at in latest.items() if music_id in existing
+                ],
+                update_conflicts=True,
+                unique_fields=['user', 'music'],
+                update_fields=['played_at']
+            )
+            record_taste_events(user_id, [
+                (music_id, settings.TASTE_PLAY_WEIGHT, played_at) for music_id, played_at in plays
+                if music_id in existing
+            ])
+            mark_stale(music_ids=list(existing))
+    except Exception:
+        # Keep the plays for the next flush
+        store.give_back(user_id, entries)
+        raise
+    return len(existing)
+
+
+def flush_pending_histories():
+    """Flush every user whose oldest pending play has waited LISTENING_HISTORY_FLUSH_INTERVAL; returns tracks written"""
+    cutoff = timezone.now() - timedelta(seconds=settings.LISTENING_HISTORY_FLUSH_INTERVAL)
+    return sum(flush_history(user_id) for user_id in _store().due(cutoff.timestamp()))
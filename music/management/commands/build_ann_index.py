@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from music.ann import build_index, current_index, measure_recall
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the nearest-neighbour index behind /music/{id}/similar/ and optionally measure its recall'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--benchmark', type=int, default=0, metavar='QUERIES',
+                            help='Compare this many sampled queries with a brute-force scan')
+        parser.add_argument('--limit', type=int, default=10, help='Neighbours per benchmark query (the k in recall@k)')
+        parser.add_argument('--probes', type=int, default=None, help='Lists scanned per query (defaults to ANN_PROBES)')
+
+    def handle(self, *args, **options):
+        indexed = build_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} track(s).'))
+        if not options['benchmark']:
+            return
+
+        recall, ann_seconds, exact_seconds = measure_recall(
+            current_index(), options['benchmark'], options['limit'], options['probes']
+        )
+        self.stdout.write(
+            f"recall@{options['limit']}: {recall:.3f}, "
+            f'{ann_seconds * 1000:.2f} ms per query (brute force {exact_seconds * 1000:.2f} ms)'
+        )
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from music.recommender import build_neighbours
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the item-item track neighbours behind "Recommended for You"'
+
+    def handle(self, *args, **options):
+        built = build_neighbours()
+        self.stdout.write(self.style.SUCCESS(f'Stored neighbours for {built} track(s).'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from music.blob_models import AudioBlob
+from music.models import Music
+
+
+class Command(BaseCommand):
+    help = 'Move audio files uploaded before content-addressed storage into the blob store'
+
+    def handle(self, *args, **options):
+        legacy = Music.objects.filter(audio_blob__isnull=True).exclude(audio_file='')
+
+        moved = 0
+        for music in legacy.iterator():
+            storage, old_name = music.audio_file.storage, music.audio_file.name
+            if not storage.exists(old_name):
+                self.stdout.write(self.style.WARNING(f'Missing file for music {music.pk}: {old_name}'))
+                continue
+
+            with music.audio_file.open('rb') as audio:
+                music.audio_blob = AudioBlob.objects.store(audio, name=old_name)
+            music.audio_file = music.audio_blob.file.name
+            Music.objects.filter(pk=music.pk).update(audio_blob=music.audio_blob, audio_file=music.audio_file)
+
+            if old_name != music.audio_file.name:
+                storage.delete(old_name)
+            moved += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Moved {moved} audio file(s) into the blob store.'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from music.fingerprint import fingerprint_track
+from music.models import Music
+
+
+class Command(BaseCommand):
+    help = 'Fingerprint tracks that are not in the acoustic index yet and flag likely duplicates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-fingerprint every track with an audio file')
+
+    def handle(self, *args, **options):
+        tracks = Music.objects.exclude(audio_file='').exclude(audio_file__isnull=True).order_by('id')
+        if not options['all']:
+            tracks = tracks.filter(fingerprint_hashes__isnull=True)
+
+        flagged = 0
+        for music in tracks.iterator():
+            flagged += len(fingerprint_track(music))
+
+        self.stdout.write(self.style.SUCCESS(f'Fingerprinting done, {flagged} likely duplicate(s) flagged.'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from music.models import AudioBlob
+from music.previews import generate_blob_preview
+
+
+class Command(BaseCommand):
+    help = 'Cut preview clips for audio files that do not have one yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-cut every preview, e.g. after changing the preview window')
+
+    def handle(self, *args, **options):
+        blobs = AudioBlob.objects.order_by('id')
+        if not options['all']:
+            blobs = blobs.filter(Q(preview_file__isnull=True) | Q(preview_file=''))
+
+        generated = 0
+        for blob in blobs.iterator():
+            if generate_blob_preview(blob, force=options['all']):
+                generated += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Generated {generated} preview clip(s).'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from music.upload_models import UploadSession
+
+
+class Command(BaseCommand):
+    help = 'Delete expired or abandoned chunked upload sessions and their staged files'
+
+    def handle(self, *args, **options):
+        stale = UploadSession.objects.filter(
+            Q(status=UploadSession.Status.ABORTED) |
+            Q(status=UploadSession.Status.ACTIVE, expires_at__lte=timezone.now())
+        )
+
+        purged = 0
+        for session in stale.iterator():
+            session.discard_staging_file()
+            session.delete()
+            purged += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} upload session(s).'))
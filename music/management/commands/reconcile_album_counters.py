@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from music.models import Album
+
+
+class Command(BaseCommand):
+    help = 'Recompute album track counts, durations and plays that drifted from their tracks'
+
+    def handle(self, *args, **options):
+        fixed = Album.objects.reconcile_counters()
+        self.stdout.write(self.style.SUCCESS(f'Reconciliation done, {fixed} album(s) corrected.'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from music.models import Artist
+
+
+class Command(BaseCommand):
+    help = 'Recompute artist follower counts that drifted from the favorite artists of user profiles'
+
+    def handle(self, *args, **options):
+        fixed = Artist.objects.reconcile_followers()
+        self.stdout.write(self.style.SUCCESS(f'Reconciliation done, {fixed} artist(s) corrected.'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from music.models import Playlist
+
+
+class Command(BaseCommand):
+    help = 'Recompute playlist track counts and total durations that drifted from their tracks'
+
+    def handle(self, *args, **options):
+        fixed = Playlist.objects.reconcile_counters()
+        self.stdout.write(self.style.SUCCESS(f'Reconciliation done, {fixed} playlist(s) corrected.'))
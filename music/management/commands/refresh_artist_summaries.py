@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from music.artist_summaries import build_summaries, refresh_stale_summaries
+from music.models import Artist
+
+
+class Command(BaseCommand):
+    help = 'Rebuild stale artist summaries (top tracks, albums, total plays), or all of them with --all'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Rebuild every artist, not only stale summaries')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            artist_ids = list(Artist.objects.values_list('id', flat=True))
+            batch_size = settings.ARTIST_SUMMARY_BATCH_SIZE
+            for start in range(0, len(artist_ids), batch_size):
+                build_summaries(artist_ids[start:start + batch_size])
+            refreshed = len(artist_ids)
+        else:
+            refreshed = refresh_stale_summaries()
+        self.stdout.write(self.style.SUCCESS(f'Refresh done, {refreshed} artist summaries rebuilt.'))
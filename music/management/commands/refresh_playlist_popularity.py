@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from music.models import Playlist
+
+
+class Command(BaseCommand):
+    help = 'Recompute the popularity score used to rank public playlists'
+
+    def handle(self, *args, **options):
+        scored = Playlist.objects.refresh_popularity()
+        self.stdout.write(self.style.SUCCESS(f'Scored {scored} public playlist(s).'))
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.28 on 2026-10-19 02:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import music.upload_models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('music', '0005_music_thumb_url'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255, verbose_name='filename')),
+                ('total_size', models.PositiveBigIntegerField(help_text='Declared size of the complete file in bytes', verbose_name='total size')),
+                ('received_bytes', models.PositiveBigIntegerField(default=0, verbose_name='received bytes')),
+                ('status', models.CharField(choices=[('ACTIVE', 'Active'), ('COMPLETED', 'Completed'), ('ABORTED', 'Aborted')], default='ACTIVE', max_length=20, verbose_name='status')),
+                ('expires_at', models.DateTimeField(default=music.upload_models.default_upload_expiry, verbose_name='expires at')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+                ('music', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_sessions', to='music.music', verbose_name='music')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'upload session',
+                'verbose_name_plural': 'upload sessions',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', 'status'], name='music_uploa_user_id_9c6c9e_idx'), models.Index(fields=['status', 'expires_at'], name='music_uploa_status_a8b6b6_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.28 on 2026-10-19 02:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+import music.blob_models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0006_upload_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudioBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('file', models.FileField(max_length=255, upload_to=music.blob_models.blob_upload_path, verbose_name='file')),
+                ('size', models.PositiveBigIntegerField(help_text='Size in bytes', verbose_name='size')),
+                ('ref_count', models.PositiveIntegerField(default=0, help_text='Number of tracks using this file', verbose_name='reference count')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+            ],
+            options={
+                'verbose_name': 'audio blob',
+                'verbose_name_plural': 'audio blobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='checksum',
+            field=models.CharField(blank=True, help_text='SHA-256 of the complete file, if declared up front', max_length=64, verbose_name='checksum'),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='deduplicated',
+            field=models.BooleanField(default=False, help_text='The file was already stored, so no chunks need to be sent', verbose_name='deduplicated'),
+        ),
+        migrations.AddField(
+            model_name='music',
+            name='audio_blob',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='tracks', to='music.audioblob', verbose_name='audio blob'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.28 on 2026-10-19 02:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0007_audio_blob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FingerprintHash',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash', models.IntegerField(verbose_name='hash')),
+                ('offset', models.PositiveIntegerField(help_text='Anchor time in spectrogram frames', verbose_name='offset')),
+                ('music', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fingerprint_hashes', to='music.music', verbose_name='music')),
+            ],
+            options={
+                'verbose_name': 'fingerprint hash',
+                'verbose_name_plural': 'fingerprint hashes',
+                'indexes': [models.Index(fields=['hash'], name='music_finge_hash_aeab67_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DuplicateCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(help_text='Share of the fingerprint hashes that matched at a consistent offset', verbose_name='score')),
+                ('matched_hashes', models.PositiveIntegerField(default=0, verbose_name='matched hashes')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('CONFIRMED', 'Confirmed'), ('DISMISSED', 'Dismissed')], default='PENDING', max_length=20, verbose_name='status')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('reviewed_at', models.DateTimeField(blank=True, null=True, verbose_name='reviewed at')),
+                ('duplicate_of', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='music.music', verbose_name='duplicate of')),
+                ('music', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_flags', to='music.music', verbose_name='music')),
+            ],
+            options={
+                'verbose_name': 'duplicate candidate',
+                'verbose_name_plural': 'duplicate candidates',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', '-created_at'], name='music_dupli_status_7e3349_idx')],
+                'unique_together': {('music', 'duplicate_of')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.28 on 2026-10-19 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0008_audio_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='advertisement',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized WebP/JPEG versions of the image', verbose_name='image derivatives'),
+        ),
+        migrations.AddField(
+            model_name='album',
+            name='cover_image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized WebP/JPEG versions of the cover image', verbose_name='cover image derivatives'),
+        ),
+        migrations.AddField(
+            model_name='artist',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized WebP/JPEG versions of the image', verbose_name='image derivatives'),
+        ),
+    ]
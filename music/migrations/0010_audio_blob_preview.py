@@ -0,0 +1,18 @@
+# Generated by Django 4.2.28 on 2026-10-19 02:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0009_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='audioblob',
+            name='preview_file',
+            field=models.FileField(blank=True, help_text='Short clip cut from the original for previews', max_length=255, null=True, upload_to='', verbose_name='preview file'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.28 on 2026-10-19 02:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+from music.positions import spaced_keys
+
+
+def assign_positions(apps, schema_editor):
+    """Keep the previous order (by track ID) for existing playlists"""
+    PlaylistTrack = apps.get_model('music', 'PlaylistTrack')
+    playlist_ids = PlaylistTrack.objects.values_list('playlist_id', flat=True).distinct()
+    for playlist_id in playlist_ids.iterator():
+        entries = list(PlaylistTrack.objects.filter(playlist_id=playlist_id).order_by('music_id'))
+        for entry, position in zip(entries, spaced_keys(len(entries))):
+            entry.position = position
+        PlaylistTrack.objects.bulk_update(entries, ['position'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0010_audio_blob_preview'),
+    ]
+
+    operations = [
+        # Adopt the existing auto-created M2M table as the through model
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='PlaylistTrack',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('music', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='playlist_entries', to='music.music', verbose_name='music')),
+                        ('playlist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='playlist_tracks', to='music.playlist', verbose_name='playlist')),
+                    ],
+                    options={
+                        'verbose_name': 'playlist track',
+                        'verbose_name_plural': 'playlist tracks',
+                        'db_table': 'music_playlist_music_tracks',
+                        'unique_together': {('playlist', 'music')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='playlist',
+                    name='music_tracks',
+                    field=models.ManyToManyField(blank=True, related_name='playlists', through='music.PlaylistTrack', to='music.music', verbose_name='music tracks'),
+                ),
+            ],
+            database_operations=[],
+        ),
+        migrations.AddField(
+            model_name='playlisttrack',
+            name='position',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255, verbose_name='position'),
+        ),
+        migrations.AddField(
+            model_name='playlisttrack',
+            name='added_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='added at'),
+            preserve_default=False,
+        ),
+        migrations.AlterModelOptions(
+            name='playlisttrack',
+            options={'ordering': ['position', 'id'], 'verbose_name': 'playlist track', 'verbose_name_plural': 'playlist tracks'},
+        ),
+        migrations.RunPython(assign_positions, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='playlisttrack',
+            index=models.Index(fields=['playlist', 'position'], name='music_playl_playlis_fecbf6_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.28 on 2026-10-19 03:00
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Playlist = apps.get_model('music', 'Playlist')
+    playlists = list(Playlist.objects.annotate(
+        actual_count=Count('playlist_tracks'),
+        actual_duration=Coalesce(Sum('playlist_tracks__music__duration'), 0)
+    ).filter(actual_count__gt=0))
+    for playlist in playlists:
+        playlist.track_count = playlist.actual_count
+        playlist.total_duration = playlist.actual_duration
+    Playlist.objects.bulk_update(playlists, ['track_count', 'total_duration'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0011_playlist_track'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playlist',
+            name='total_duration',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Sum of track durations in seconds', verbose_name='total duration'),
+        ),
+        migrations.AddField(
+            model_name='playlist',
+            name='track_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='track count'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.28 on 2026-10-19 03:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def start_revisions(apps, schema_editor):
+    """Existing playlists have no log yet: clients start from a snapshot"""
+    Playlist = apps.get_model('music', 'Playlist')
+    Playlist.objects.filter(playlist_tracks__isnull=False).distinct().update(revision=1, compacted_revision=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0012_playlist_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playlist',
+            name='compacted_revision',
+            field=models.PositiveBigIntegerField(default=0, editable=False, help_text='Changes up to this revision are no longer in the change log', verbose_name='compacted revision'),
+        ),
+        migrations.AddField(
+            model_name='playlist',
+            name='revision',
+            field=models.PositiveBigIntegerField(default=0, editable=False, help_text='Increases with every change to the tracks', verbose_name='revision'),
+        ),
+        migrations.CreateModel(
+            name='PlaylistChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('revision', models.PositiveBigIntegerField(verbose_name='revision')),
+                ('operation', models.CharField(choices=[('add', 'Add'), ('remove', 'Remove'), ('move', 'Move')], max_length=10, verbose_name='operation')),
+                ('music_id', models.BigIntegerField(verbose_name='music ID')),
+                ('position', models.CharField(blank=True, default='', max_length=255, verbose_name='position')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('playlist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='music.playlist', verbose_name='playlist')),
+            ],
+            options={
+                'verbose_name': 'playlist change',
+                'verbose_name_plural': 'playlist changes',
+                'ordering': ['playlist', 'revision'],
+                'unique_together': {('playlist', 'revision')},
+            },
+        ),
+        migrations.RunPython(start_revisions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.28 on 2026-10-19 03:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0013_playlist_change_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playlist',
+            name='popularity',
+            field=models.FloatField(default=0, editable=False, help_text='Ranking score for public browsing, refreshed periodically', verbose_name='popularity'),
+        ),
+        migrations.AddIndex(
+            model_name='playlist',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['-updated_at', '-id'], name='playlist_public_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playlist',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['-popularity', '-id'], name='playlist_public_popular_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.28 on 2026-10-19 03:11
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0014_playlist_public_browse'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recentlyplayed',
+            name='played_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='played at'),
+        ),
+    ]
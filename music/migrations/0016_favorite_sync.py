@@ -0,0 +1,61 @@
+# Generated by Django 4.2.28 on 2026-10-19 03:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('music', '0015_recently_played_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FavoriteRemoval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('removed_at', models.DateTimeField(verbose_name='removed at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+            ],
+            options={
+                'verbose_name': 'favorite removal',
+                'verbose_name_plural': 'favorite removals',
+            },
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='updated at'),
+        ),
+        migrations.AlterField(
+            model_name='favorite',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='created at'),
+        ),
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['user', 'updated_at'], name='music_favor_user_id_56c1aa_idx'),
+        ),
+        migrations.AddField(
+            model_name='favoriteremoval',
+            name='music',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorite_removals', to='music.music', verbose_name='music'),
+        ),
+        migrations.AddField(
+            model_name='favoriteremoval',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorite_removals', to=settings.AUTH_USER_MODEL, verbose_name='user'),
+        ),
+        migrations.AddIndex(
+            model_name='favoriteremoval',
+            index=models.Index(fields=['user', 'updated_at'], name='music_favor_user_id_2b105c_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='favoriteremoval',
+            unique_together={('user', 'music')},
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.28 on 2026-10-19 03:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0016_favorite_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackNeighbours',
+            fields=[
+                ('music', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='neighbours', serialize=False, to='music.music', verbose_name='music')),
+                ('neighbour_ids', models.BinaryField(verbose_name='neighbour IDs')),
+                ('scores', models.BinaryField(verbose_name='scores')),
+                ('built_at', models.DateTimeField(auto_now=True, verbose_name='built at')),
+            ],
+            options={
+                'verbose_name': 'track neighbours',
+                'verbose_name_plural': 'track neighbours',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.28 on 2026-10-19 03:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0017_track_neighbours'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='music',
+            name='tags_updated_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, help_text='Last change of the tags, used to sync the tag similarity index', null=True, verbose_name='tags updated at'),
+        ),
+    ]
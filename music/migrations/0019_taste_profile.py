@@ -0,0 +1,29 @@
+# Generated by Django 4.2.28 on 2026-10-19 03:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_userprofile_profile_image_derivatives'),
+        ('music', '0018_music_tags_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TasteProfile',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='taste_profile', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='user')),
+                ('vector', models.BinaryField(default=bytes, verbose_name='vector')),
+                ('decayed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='decayed at')),
+            ],
+            options={
+                'verbose_name': 'taste profile',
+                'verbose_name_plural': 'taste profiles',
+            },
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 4.2.28 on 2026-10-19 03:48
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_followers(apps, schema_editor):
+    Artist = apps.get_model('music', 'Artist')
+    artists = list(Artist.objects.annotate(actual_count=Count('favorited_by')).filter(actual_count__gt=0))
+    for artist in artists:
+        artist.followers_count = artist.actual_count
+    Artist.objects.bulk_update(artists, ['followers_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounts', '0003_userprofile_profile_image_derivatives'),
+        ('music', '0019_taste_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReleaseNotice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+            ],
+            options={
+                'verbose_name': 'release notice',
+                'verbose_name_plural': 'release notices',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='artist',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='followers count'),
+        ),
+        migrations.RunPython(fill_followers, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='artist',
+            index=models.Index(fields=['-followers_count', 'name'], name='music_artis_followe_0f6d9c_idx'),
+        ),
+        migrations.AddField(
+            model_name='releasenotice',
+            name='artist',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='release_notices', to='music.artist', verbose_name='artist'),
+        ),
+        migrations.AddField(
+            model_name='releasenotice',
+            name='music',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='release_notices', to='music.music', verbose_name='music'),
+        ),
+        migrations.AddField(
+            model_name='releasenotice',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='release_notices', to=settings.AUTH_USER_MODEL, verbose_name='user'),
+        ),
+        migrations.AddIndex(
+            model_name='releasenotice',
+            index=models.Index(fields=['user', '-created_at'], name='music_relea_user_id_c9c639_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='releasenotice',
+            unique_together={('user', 'music')},
+        ),
+    ]
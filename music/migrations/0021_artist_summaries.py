@@ -0,0 +1,34 @@
+# Generated by Django 4.2.28 on 2026-10-19 03:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0020_artist_followers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArtistSummary',
+            fields=[
+                ('artist', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='music.artist', verbose_name='artist')),
+                ('top_track_ids', models.JSONField(default=list, verbose_name='top track IDs')),
+                ('albums', models.JSONField(default=list, verbose_name='albums')),
+                ('track_count', models.PositiveIntegerField(default=0, verbose_name='track count')),
+                ('total_plays', models.PositiveBigIntegerField(default=0, verbose_name='total plays')),
+                ('stale', models.BooleanField(db_index=True, default=False, verbose_name='stale')),
+                ('refreshed_at', models.DateTimeField(auto_now=True, verbose_name='refreshed at')),
+            ],
+            options={
+                'verbose_name': 'artist summary',
+                'verbose_name_plural': 'artist summaries',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recentlyplayed',
+            index=models.Index(fields=['music', 'played_at'], name='music_recen_music_i_651080_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.28 on 2026-10-19 03:57
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_album_counters(apps, schema_editor):
+    Album = apps.get_model('music', 'Album')
+    albums = list(Album.objects.annotate(
+        actual_count=Count('tracks'),
+        actual_duration=Coalesce(Sum('tracks__duration'), 0),
+        actual_plays=Coalesce(Sum('tracks__play_count'), 0)
+    ).filter(actual_count__gt=0))
+    for album in albums:
+        album.track_count = album.actual_count
+        album.total_duration = album.actual_duration
+        album.total_plays = album.actual_plays
+    Album.objects.bulk_update(albums, ['track_count', 'total_duration', 'total_plays'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0021_artist_summaries'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='music',
+            name='music_music_album_i_aadc41_idx',
+        ),
+        migrations.AddField(
+            model_name='album',
+            name='total_duration',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Sum of track durations in seconds', verbose_name='total duration'),
+        ),
+        migrations.AddField(
+            model_name='album',
+            name='total_plays',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='total plays'),
+        ),
+        migrations.AddField(
+            model_name='album',
+            name='track_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='track count'),
+        ),
+        migrations.AddField(
+            model_name='music',
+            name='disc_number',
+            field=models.PositiveSmallIntegerField(default=1, verbose_name='disc number'),
+        ),
+        migrations.AddField(
+            model_name='music',
+            name='track_number',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='track number'),
+        ),
+        migrations.AddIndex(
+            model_name='music',
+            index=models.Index(fields=['album', 'disc_number', 'track_number'], name='music_music_album_i_0eaed9_idx'),
+        ),
+        migrations.RunPython(fill_album_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.28 on 2026-10-19 04:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('music', '0022_album_track_order'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingPlay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('played_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='played at')),
+                ('music', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_plays', to='music.music', verbose_name='music')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_plays', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'pending play',
+                'verbose_name_plural': 'pending plays',
+                'indexes': [models.Index(fields=['user', '-played_at'], name='music_pendi_user_id_e441d4_idx'), models.Index(fields=['played_at'], name='music_pendi_played__9bb88a_idx')],
+            },
+        ),
+    ]
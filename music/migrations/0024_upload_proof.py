@@ -0,0 +1,23 @@
+# Generated by Django 4.2.28 on 2026-10-19 04:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0023_pending_plays'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='proof_length',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='proof length'),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='proof_offset',
+            field=models.PositiveBigIntegerField(blank=True, null=True, verbose_name='proof offset'),
+        ),
+    ]
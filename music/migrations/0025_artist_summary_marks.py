@@ -0,0 +1,23 @@
+# Generated by Django 4.2.28 on 2026-10-19 04:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0024_upload_proof'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artistsummary',
+            name='marks',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='marks'),
+        ),
+        migrations.AddField(
+            model_name='artistsummary',
+            name='marks_built',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='marks built'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.28 on 2026-10-19 04:31
+
+from django.db import migrations
+from django.db.models import Max
+
+
+def flush_pending_plays(apps, schema_editor):
+    """Fold plays still pending into RecentlyPlayed before their table goes"""
+    PendingPlay = apps.get_model('music', 'PendingPlay')
+    RecentlyPlayed = apps.get_model('music', 'RecentlyPlayed')
+    latest = PendingPlay.objects.values('user_id', 'music_id').annotate(played_at=Max('played_at'))
+    RecentlyPlayed.objects.bulk_create(
+        [RecentlyPlayed(**play) for play in latest],
+        update_conflicts=True,
+        unique_fields=['user', 'music'],
+        update_fields=['played_at']
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0025_artist_summary_marks'),
+    ]
+
+    operations = [
+        migrations.RunPython(flush_pending_plays, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='PendingPlay',
+        ),
+    ]
@@ -1,12 +1,52 @@
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, Greatest
 from django.conf import settings
+from django.utils import timezone
 from django.core.validators import FileExtensionValidator
 from django.utils.translation import gettext_lazy as _
+from .positions import key_between, spaced_keys
 from .validators import validate_audio_file_size, validate_image_file_size
 
 # Import advertisement models
 from .ads_models import Advertisement, AdImpression, AdClick
 
+# Import chunked upload and audio storage models
+from .upload_models import UploadSession
+from .blob_models import AudioBlob
+
+# Import fingerprinting models
+from .fingerprint_models import FingerprintHash, DuplicateCandidate
+
+# Import recommendation models
+from .recommendation_models import TrackNeighbours, TasteProfile
+
+# Import artist follower and summary models
+from .follower_models import ReleaseNotice
+from .summary_models import ArtistSummary
+
+
+class ArtistManager(models.Manager):
+    """Maintains the denormalized follower counts"""
+
+    def adjust_followers(self, artist_ids, followers):
+        """Add ``followers`` (may be negative) to each artist's count"""
+        if not artist_ids or not followers:
+            return 0
+        return self.filter(pk__in=artist_ids).update(followers_count=Greatest(F('followers_count') + followers, 0))
+
+    def reconcile_followers(self, queryset=None):
+        """Recompute follower counts that drifted from the join table; returns how many were fixed"""
+        queryset = self.all() if queryset is None else queryset
+        drifted = list(queryset.annotate(actual_count=Count('favorited_by')).exclude(
+            followers_count=F('actual_count')
+        ).only('pk'))
+        for artist in drifted:
+            artist.followers_count = artist.actual_count
+        self.bulk_update(drifted, ['followers_count'], batch_size=500)
+        return len(drifted)
+
 
 class Artist(models.Model):
     """Artist model for music creators"""
@@ -20,9 +60,21 @@ class Artist(models.Model):
         validators=[validate_image_file_size]
     )
     image_url = models.URLField(_('image URL'), max_length=500, null=True, blank=True)
+    image_derivatives = models.JSONField(
+        _('image derivatives'),
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text=_('Resized WebP/JPEG versions of the image')
+    )
+
+    # Users with the artist among their favorite artists, kept by signals
+    followers_count = models.PositiveIntegerField(_('followers count'), default=0, editable=False)
 
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
+    objects = ArtistManager()
     
     class Meta:
         verbose_name = _('artist')
@@ -30,12 +82,46 @@ class Artist(models.Model):
         ordering = ['name']
         indexes = [
             models.Index(fields=['name']),
+            models.Index(fields=['-followers_count', 'name']),
         ]
     
     def __str__(self):
         return self.name
 
 
+class AlbumManager(models.Manager):
+    """Maintains the denormalized track count, duration and plays"""
+
+    def adjust_counters(self, album_ids, tracks, duration, plays):
+        """Add ``tracks``, ``duration`` seconds and ``plays`` (any may be negative) to each album"""
+        if not album_ids or not (tracks or duration or plays):
+            return 0
+        return self.filter(pk__in=album_ids).update(
+            track_count=Greatest(F('track_count') + tracks, 0),
+            total_duration=Greatest(F('total_duration') + duration, 0),
+            total_plays=Greatest(F('total_plays') + plays, 0)
+        )
+
+    def reconcile_counters(self, queryset=None):
+        """Recompute counters that drifted from the album's tracks; returns how many were fixed"""
+        queryset = self.all() if queryset is None else queryset
+        drifted = list(queryset.annotate(
+            actual_count=Count('tracks'),
+            actual_duration=Coalesce(Sum('tracks__duration'), 0),
+            actual_plays=Coalesce(Sum('tracks__play_count'), 0)
+        ).exclude(
+            track_count=F('actual_count'),
+            total_duration=F('actual_duration'),
+            total_plays=F('actual_plays')
+        ).only('pk'))
+        for album in drifted:
+            album.track_count = album.actual_count
+            album.total_duration = album.actual_duration
+            album.total_plays = album.actual_plays
+        self.bulk_update(drifted, ['track_count', 'total_duration', 'total_plays'], batch_size=500)
+        return len(drifted)
+
+
 class Album(models.Model):
     """Album model for grouping music"""
     title = models.CharField(_('title'), max_length=200)
@@ -54,10 +140,25 @@ class Album(models.Model):
         validators=[validate_image_file_size]
     )
     cover_image_url = models.URLField(_('cover image URL'), max_length=500, null=True, blank=True)
+    cover_image_derivatives = models.JSONField(
+        _('cover image derivatives'),
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text=_('Resized WebP/JPEG versions of the cover image')
+    )
 
     description = models.TextField(_('description'), blank=True)
+    # Denormalized from the tracks, kept by signals
+    track_count = models.PositiveIntegerField(_('track count'), default=0, editable=False)
+    total_duration = models.PositiveIntegerField(
+        _('total duration'), default=0, editable=False, help_text=_('Sum of track durations in seconds')
+    )
+    total_plays = models.PositiveBigIntegerField(_('total plays'), default=0, editable=False)
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
+    objects = AlbumManager()
     
     class Meta:
         verbose_name = _('album')
@@ -143,6 +244,9 @@ class Music(models.Model):
         related_name='tracks',
         verbose_name=_('album')
     )
+    # Position on the album; unnumbered tracks play after the numbered ones, by upload
+    disc_number = models.PositiveSmallIntegerField(_('disc number'), default=1)
+    track_number = models.PositiveSmallIntegerField(_('track number'), null=True, blank=True)
     audio_file = models.FileField(
         _('audio file'),
         upload_to='music/',
@@ -153,6 +257,15 @@ class Music(models.Model):
             validate_audio_file_size
         ]
     )
+    audio_blob = models.ForeignKey(
+        AudioBlob,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='tracks',
+        verbose_name=_('audio blob')
+    )
     audio_url = models.URLField(_('audio URL'), max_length=500, null=True, blank=True)
     thumb_url = models.URLField(_('thumbnail URL'), max_length=500, null=True, blank=True)
 
@@ -181,6 +294,14 @@ class Music(models.Model):
         verbose_name=_('uploaded by')
     )
     play_count = models.PositiveIntegerField(_('play count'), default=0)
+    tags_updated_at = models.DateTimeField(
+        _('tags updated at'),
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        help_text=_('Last change of the tags, used to sync the tag similarity index')
+    )
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
     
@@ -190,7 +311,7 @@ class Music(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['-created_at']),
-            models.Index(fields=['album']),
+            models.Index(fields=['album', 'disc_number', 'track_number']),
             models.Index(fields=['language']),
             models.Index(fields=['-play_count']),
         ]
@@ -199,10 +320,123 @@ class Music(models.Model):
         artist_names = ', '.join(self.artist.values_list('name', flat=True))
         return f"{self.title} - {artist_names}" if artist_names else self.title
     
+    def save(self, *args, **kwargs):
+        if self.audio_file and not self.audio_file._committed:
+            # A newly assigned file goes into the content-addressed blob store
+            with transaction.atomic():
+                previous_blob_id = self.audio_blob_id
+                self.audio_blob = AudioBlob.objects.store(self.audio_file.file, name=self.audio_file.name)
+                self.audio_file = self.audio_blob.file.name
+                update_fields = kwargs.get('update_fields')
+                if update_fields is not None:
+                    kwargs['update_fields'] = set(update_fields) | {'audio_blob'}
+                super().save(*args, **kwargs)
+                if previous_blob_id:
+                    AudioBlob.objects.release(previous_blob_id)
+            return
+        super().save(*args, **kwargs)
+    
+    # Play order of an album's tracks, read from the (album, disc, track) index
+    ALBUM_ORDER = ('disc_number', F('track_number').asc(nulls_last=True), 'id')
+
     def increment_play_count(self):
-        """Increment play count"""
+        """Increment play count, and the album's total plays"""
         self.play_count += 1
         self.save(update_fields=['play_count'])
+        if self.album_id:
+            Album.objects.adjust_counters([self.album_id], 0, 0, 1)
+
+
+class PlaylistManager(models.Manager):
+    """Maintains the denormalized counters and the track change log"""
+
+    def adjust_counters(self, playlist_ids, tracks, duration):
+        """Add ``tracks`` and ``duration`` seconds (either may be negative) to each playlist"""
+        if not playlist_ids or not (tracks or duration):
+            return 0
+        return self.filter(pk__in=playlist_ids).update(
+            track_count=Greatest(F('track_count') + tracks, 0),
+            total_duration=Greatest(F('total_duration') + duration, 0)
+        )
+
+    def reconcile_counters(self, queryset=None):
+        """Recompute counters that drifted from the playlist's tracks; returns how many were fixed"""
+        queryset = self.all() if queryset is None else queryset
+        drifted = list(queryset.annotate(
+            actual_count=Count('playlist_tracks'),
+            actual_duration=Coalesce(Sum('playlist_tracks__music__duration'), 0)
+        ).exclude(
+            track_count=F('actual_count'),
+            total_duration=F('actual_duration')
+        ).only('pk'))
+        for playlist in drifted:
+            playlist.track_count = playlist.actual_count
+            playlist.total_duration = playlist.actual_duration
+        self.bulk_update(drifted, ['track_count', 'total_duration'], batch_size=500)
+        return len(drifted)
+
+    def refresh_popularity(self, batch_size=500):
+        """
+        Recompute the popularity of public playlists and return how many were scored.
+
+        The score is the sum of the tracks' play counts, halved for every
+        PLAYLIST_POPULARITY_HALF_LIFE_DAYS since the tracks last changed, so
+        abandoned playlists make room for active ones.
+        """
+        half_life = settings.PLAYLIST_POPULARITY_HALF_LIFE_DAYS * 24 * 60 * 60
+        now = timezone.now()
+        playlists = self.filter(is_public=True).annotate(
+            plays=Coalesce(Sum('playlist_tracks__music__play_count'), 0)
+        ).only('pk', 'updated_at').order_by()
+
+        scored, batch = 0, []
+        for playlist in playlists.iterator(chunk_size=batch_size):
+            age = max((now - playlist.updated_at).total_seconds(), 0)
+            playlist.popularity = playlist.plays * 0.5 ** (age / half_life)
+            batch.append(playlist)
+            if len(batch) == batch_size:
+                scored += self.bulk_update(batch, ['popularity'])
+                batch = []
+        return scored + self.bulk_update(batch, ['popularity'])
+
+    def record_changes(self, playlist_id, changes):
+        """
+        Append ``(operation, music_id, position)`` tuples to the playlist's change
+        log, one revision each, and return the new revision.
+
+        Once the log holds twice PLAYLIST_CHANGE_LOG_LENGTH entries it is cut
+        back to the most recent ones; older revisions then sync from a snapshot.
+        """
+        if not changes:
+            return None
+        with transaction.atomic():
+            state = self.select_for_update().filter(pk=playlist_id).values('revision', 'compacted_revision').first()
+            if state is None:
+                return None
+            revision = state['revision']
+            PlaylistChange.objects.bulk_create([
+                PlaylistChange(
+                    playlist_id=playlist_id, revision=revision + offset,
+                    operation=operation, music_id=music_id, position=position or ''
+                )
+                for offset, (operation, music_id, position) in enumerate(changes, 1)
+            ])
+            revision += len(changes)
+            updates = {'revision': revision, 'updated_at': timezone.now()}
+            keep = settings.PLAYLIST_CHANGE_LOG_LENGTH
+            if revision - state['compacted_revision'] > 2 * keep:
+                updates['compacted_revision'] = revision - keep
+                PlaylistChange.objects.filter(playlist_id=playlist_id, revision__lte=revision - keep).delete()
+            self.filter(pk=playlist_id).update(**updates)
+        return revision
+
+    def reset_change_log(self, playlist_id):
+        """Start a new revision with an empty log, so every client resyncs from a snapshot"""
+        with transaction.atomic():
+            self.filter(pk=playlist_id).update(
+                revision=F('revision') + 1, compacted_revision=F('revision') + 1
+            )
+            PlaylistChange.objects.filter(playlist_id=playlist_id).delete()
 
 
 class Playlist(models.Model):
@@ -216,13 +450,41 @@ class Playlist(models.Model):
     )
     music_tracks = models.ManyToManyField(
         Music,
+        through='PlaylistTrack',
         related_name='playlists',
         blank=True,
         verbose_name=_('music tracks')
     )
     is_public = models.BooleanField(_('is public'), default=False)
+    track_count = models.PositiveIntegerField(_('track count'), default=0, editable=False)
+    total_duration = models.PositiveIntegerField(
+        _('total duration'),
+        default=0,
+        editable=False,
+        help_text=_('Sum of track durations in seconds')
+    )
+    revision = models.PositiveBigIntegerField(
+        _('revision'),
+        default=0,
+        editable=False,
+        help_text=_('Increases with every change to the tracks')
+    )
+    compacted_revision = models.PositiveBigIntegerField(
+        _('compacted revision'),
+        default=0,
+        editable=False,
+        help_text=_('Changes up to this revision are no longer in the change log')
+    )
+    popularity = models.FloatField(
+        _('popularity'),
+        default=0,
+        editable=False,
+        help_text=_('Ranking score for public browsing, refreshed periodically')
+    )
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
+    objects = PlaylistManager()
     
     class Meta:
         verbose_name = _('playlist')
@@ -230,14 +492,149 @@ class Playlist(models.Model):
         ordering = ['-updated_at']
         indexes = [
             models.Index(fields=['user', '-updated_at']),
+            # Public browsing only ever scans public rows
+            models.Index(fields=['-updated_at', '-id'], condition=Q(is_public=True), name='playlist_public_recent_idx'),
+            models.Index(fields=['-popularity', '-id'], condition=Q(is_public=True), name='playlist_public_popular_idx'),
         ]
     
     def __str__(self):
         return f"{self.name} by {self.user.email}"
-    
-    @property
-    def track_count(self):
-        return self.music_tracks.count()
+
+
+class PlaylistTrackManager(models.Manager):
+    """Ordered playlist entries; inserts and moves only write the affected row"""
+
+    def position_for(self, playlist_id, after=None, before=None, exclude=None):
+        """
+        Key for a track placed right after the track ``after`` or right before
+        ``before`` (music IDs), or at the end of the playlist when neither is given.
+
+        Raises DoesNotExist when the anchor track is not in the playlist.
+        """
+        entries = self.filter(playlist_id=playlist_id)
+        if exclude is not None:
+            entries = entries.exclude(music_id=exclude)
+        positions = entries.order_by('position').values_list('position', flat=True)
+
+        if after is not None:
+            lower = entries.get(music_id=after).position
+            upper = positions.filter(position__gt=lower).first()
+        elif before is not None:
+            upper = entries.get(music_id=before).position
+            lower = positions.filter(position__lt=upper).last()
+        else:
+            lower, upper = positions.last(), None
+
+        key = key_between(lower or None, upper)
+        if len(key) > self.model.POSITION_MAX_LENGTH:
+            self.renumber(playlist_id)
+            return self.position_for(playlist_id, after, before, exclude)
+        return key
+
+    def insert(self, playlist, music, after=None, before=None):
+        """Add a track at the given place; returns (entry, created)"""
+        entry = self.filter(playlist=playlist, music=music).first()
+        if entry is not None:
+            return entry, False
+        position = self.position_for(playlist.pk, after=after, before=before)
+        return self.create(playlist=playlist, music=music, position=position), True
+
+    def move(self, playlist, music, after=None, before=None):
+        """Reposition a track already in the playlist"""
+        entry = self.get(playlist=playlist, music=music)
+        entry.position = self.position_for(playlist.pk, after=after, before=before, exclude=music.pk)
+        entry.save(update_fields=['position'])
+        return entry
+
+    def fill_positions(self, playlist_id):
+        """Append entries added without a position (plain ``music_tracks.add``)"""
+        pending = list(self.filter(playlist_id=playlist_id, position='').order_by('music_id'))
+        if not pending:
+            return
+        last = self.filter(playlist_id=playlist_id).exclude(position='').order_by('position') \
+            .values_list('position', flat=True).last()
+        for entry in pending:
+            entry.position = last = key_between(last, None)
+        self.bulk_update(pending, ['position'])
+
+    def renumber(self, playlist_id):
+        """Rewrite every key of a playlist with even spacing (only needed when keys grow long)"""
+        entries = list(self.filter(playlist_id=playlist_id).order_by('position', 'id'))
+        for entry, position in zip(entries, spaced_keys(len(entries))):
+            entry.position = position
+        self.bulk_update(entries, ['position'], batch_size=500)
+        # Every key changed; replaying single moves would cost more than a snapshot
+        Playlist.objects.reset_change_log(playlist_id)
+
+
+class PlaylistTrack(models.Model):
+    """A track in a playlist, ordered by a lexicographic position key"""
+    POSITION_MAX_LENGTH = 200
+
+    playlist = models.ForeignKey(
+        Playlist,
+        on_delete=models.CASCADE,
+        related_name='playlist_tracks',
+        verbose_name=_('playlist')
+    )
+    music = models.ForeignKey(
+        Music,
+        on_delete=models.CASCADE,
+        related_name='playlist_entries',
+        verbose_name=_('music')
+    )
+    position = models.CharField(_('position'), max_length=255, blank=True, default='', editable=False)
+    added_at = models.DateTimeField(_('added at'), auto_now_add=True)
+
+    objects = PlaylistTrackManager()
+
+    class Meta:
+        db_table = 'music_playlist_music_tracks'
+        verbose_name = _('playlist track')
+        verbose_name_plural = _('playlist tracks')
+        ordering = ['position', 'id']
+        unique_together = ['playlist', 'music']
+        indexes = [
+            models.Index(fields=['playlist', 'position']),
+        ]
+
+    def __str__(self):
+        return f"{self.music} in {self.playlist.name}"
+
+    def save(self, *args, **kwargs):
+        if not self.position:
+            self.position = PlaylistTrack.objects.position_for(self.playlist_id)
+        super().save(*args, **kwargs)
+
+
+class PlaylistChange(models.Model):
+    """One entry of a playlist's append-only track change log"""
+    class Operation(models.TextChoices):
+        ADD = 'add', _('Add')
+        REMOVE = 'remove', _('Remove')
+        MOVE = 'move', _('Move')
+
+    playlist = models.ForeignKey(
+        Playlist,
+        on_delete=models.CASCADE,
+        related_name='changes',
+        verbose_name=_('playlist')
+    )
+    revision = models.PositiveBigIntegerField(_('revision'))
+    operation = models.CharField(_('operation'), max_length=10, choices=Operation.choices)
+    # Not a foreign key: the entry outlives the track it mentions
+    music_id = models.BigIntegerField(_('music ID'))
+    position = models.CharField(_('position'), max_length=255, blank=True, default='')
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('playlist change')
+        verbose_name_plural = _('playlist changes')
+        ordering = ['playlist', 'revision']
+        unique_together = ['playlist', 'revision']
+
+    def __str__(self):
+        return f"{self.operation} {self.music_id} @ {self.revision}"
 
 
 class RecentlyPlayed(models.Model):
@@ -254,7 +651,8 @@ class RecentlyPlayed(models.Model):
         related_name='recent_plays',
         verbose_name=_('music')
     )
-    played_at = models.DateTimeField(_('played at'), auto_now_add=True)
+    # Set explicitly when plays are flushed from the listening history
+    played_at = models.DateTimeField(_('played at'), default=timezone.now)
     
     class Meta:
         verbose_name = _('recently played')
@@ -262,6 +660,7 @@ class RecentlyPlayed(models.Model):
         ordering = ['-played_at']
         indexes = [
             models.Index(fields=['user', '-played_at']),
+            models.Index(fields=['music', 'played_at']),
         ]
         unique_together = [['user', 'music']]
     
@@ -269,6 +668,54 @@ class RecentlyPlayed(models.Model):
         return f"{self.user.email} played {self.music.title}"
 
 
+class FavoriteManager(models.Manager):
+    """
+    Race-free favorite writes: the unique (user, music) constraint decides the
+    outcome instead of a separate existence check.
+
+    Each write is one statement returning the affected row, so the Favorite
+    receivers are sent post_save / post_delete by hand with that row.
+    """
+
+    def _write(self, sql, params):
+        """Run a RETURNING statement; the affected favorite, or None"""
+        table = connections[self.db].ops.quote_name(self.model._meta.db_table)
+        return next(iter(self.raw(sql.format(table=table), params, using=self.db)), None)
+
+    def add(self, user, music):
+        """Insert the favorite and return it, or None when it already existed"""
+        now = timezone.now()
+        favorite = self._write(
+            'INSERT INTO {table} (user_id, music_id, created_at, updated_at) VALUES (%s, %s, %s, %s) '
+            'ON CONFLICT (user_id, music_id) DO NOTHING RETURNING *',
+            [user.pk, music.pk, now, now]
+        )
+        if favorite is not None:
+            post_save.send(sender=self.model, instance=favorite, created=True, update_fields=None, raw=False, using=self.db)
+        return favorite
+
+    def remove(self, user, music_id):
+        """Delete the favorite; returns False when there was none"""
+        favorite = self._write(
+            'DELETE FROM {table} WHERE user_id = %s AND music_id = %s RETURNING *',
+            [user.pk, music_id]
+        )
+        if favorite is None:
+            return False
+        post_delete.send(sender=self.model, instance=favorite, origin=favorite, using=self.db)
+        # Lets offline clients' older adds lose against this removal
+        FavoriteRemoval.objects.record(user, {music_id: timezone.now()})
+        return True
+
+    def toggle(self, user, music):
+        """Flip the favorite and return whether the track is now favorited"""
+        if self.remove(user, music.pk):
+            return False
+        # Losing a race against a parallel add still leaves it favorited
+        self.add(user, music)
+        return True
+
+
 class Favorite(models.Model):
     """Track user's favorite music"""
     user = models.ForeignKey(
@@ -283,7 +730,11 @@ class Favorite(models.Model):
         related_name='favorited_by',
         verbose_name=_('music')
     )
-    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    # When the user favorited the track; offline syncs set it to the client's time
+    created_at = models.DateTimeField(_('created at'), default=timezone.now)
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
+    objects = FavoriteManager()
     
     class Meta:
         verbose_name = _('favorite')
@@ -292,7 +743,53 @@ class Favorite(models.Model):
         unique_together = [['user', 'music']]
         indexes = [
             models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['user', 'updated_at']),
         ]
     
     def __str__(self):
         return f"{self.user.email} favorited {self.music.title}"
+
+
+class FavoriteRemovalManager(models.Manager):
+    def record(self, user, removed):
+        """Upsert ``{music_id: removed_at}`` removals for a user in one statement"""
+        return self.bulk_create(
+            [self.model(user=user, music_id=music_id, removed_at=removed_at) for music_id, removed_at in removed.items()],
+            update_conflicts=True,
+            unique_fields=['user', 'music'],
+            update_fields=['removed_at', 'updated_at']
+        )
+
+
+class FavoriteRemoval(models.Model):
+    """
+    Tombstone of a removed favorite, so favorites syncs can resolve conflicts
+    last-writer-wins and report removals in deltas
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='favorite_removals',
+        verbose_name=_('user')
+    )
+    music = models.ForeignKey(
+        Music,
+        on_delete=models.CASCADE,
+        related_name='favorite_removals',
+        verbose_name=_('music')
+    )
+    removed_at = models.DateTimeField(_('removed at'))
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
+    objects = FavoriteRemovalManager()
+
+    class Meta:
+        verbose_name = _('favorite removal')
+        verbose_name_plural = _('favorite removals')
+        unique_together = [['user', 'music']]
+        indexes = [
+            models.Index(fields=['user', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} unfavorited {self.music_id}"
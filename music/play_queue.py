@@ -0,0 +1,220 @@
+"""
+Play queue index used to resolve the next/previous track.
+
+Every queue context (an artist, tag or the whole catalog) is cached as a
+sorted array of track IDs. Albums and playlists keep their own order (disc
+and track number, or position), so they are cached as the ordered IDs plus a
+sorted copy mapping each ID to its rank.
+
+Each context has its own version, set to the time of its last change by the
+signals in ``signals.py`` and set again once that change commits; arrays are
+cached under that version, so a change simply makes the old array
+unreachable, including one a reader built before the commit.
+Once warm, resolving neighbours within a context or album costs two cache
+round trips and no queries. The whole catalog is only cached for shuffles;
+playback falls back to it with one primary key index read instead.
+"""
+
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from .ann import current_index
+from .listening_history import recent_music_ids
+from .models import Music, PlaylistTrack
+from .sampling import MAX_SEED, shuffled_neighbour
+
+# Query parameter naming each explicit context, in order of precedence
+QUEUE_CONTEXT_PARAMS = (
+    ('album', 'album_id'),
+    ('playlist', 'playlist_id'),
+    ('artist', 'artist_id'),
+    ('tag', 'tag'),
+)
+GLOBAL_CONTEXT = ('global', 'all')
+# Contexts cached as (order, sorted IDs, ranks) rather than sorted IDs
+ORDERED_KINDS = ('album', 'playlist')
+# Part of every array key; bumped when the cached shape of a context changes
+QUEUE_LAYOUT = 2
+
+
+def _version_key(context):
+    return 'play_queue_version_{}_{}'.format(*context)
+
+
+def bump_context_version(kind, key):
+    """Mark a context as changed so its cached ID array is rebuilt on next use"""
+    cache.set(_version_key((kind, key)), time.time_ns(), None)
+    # Again after commit, so an array rebuilt from pre-commit rows is never read
+    transaction.on_commit(lambda: cache.set(_version_key((kind, key)), time.time_ns(), None))
+
+
+def queue_context(query_params):
+    """The explicit context requested by the client, or None"""
+    for kind, param in QUEUE_CONTEXT_PARAMS:
+        value = query_params.get(param)
+        if not value:
+            continue
+        if kind == 'tag':
+            return kind, value
+        try:
+            return kind, int(value)
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+def shuffle_seed(query_params):
+    """The seed of the shuffle the client is playing in, or None"""
+    try:
+        seed = int(query_params.get('shuffle'))
+    except (TypeError, ValueError):
+        return None
+    return seed if 0 <= seed <= MAX_SEED else None
+
+
+def _ordered_queue(kind, key):
+    """(IDs in play order, the same IDs sorted, rank of each sorted ID)"""
+    if kind == 'album':
+        ids = Music.objects.filter(album_id=key).order_by(*Music.ALBUM_ORDER).values_list('id', flat=True)
+    else:
+        ids = PlaylistTrack.objects.filter(playlist_id=key).order_by('position', 'id').values_list('music_id', flat=True)
+    order = array('q', ids)
+    ranks = sorted(range(len(order)), key=order.__getitem__)
+    return order, array('q', (order[rank] for rank in ranks)), array('q', ranks)
+
+
+def _context_ids(kind, key):
+    """Load the queue of one context from the database"""
+    if kind in ORDERED_KINDS:
+        return _ordered_queue(kind, key)
+    if kind == 'artist':
+        ids = Music.artist.through.objects.filter(artist_id=key).values_list('music_id', flat=True)
+    elif kind == 'tag':
+        ids = Music.tags.through.objects.filter(tag__name=key).values_list('music_id', flat=True).distinct()
+    else:
+        ids = Music.objects.values_list('id', flat=True)
+    return array('q', sorted(ids))
+
+
+def load_contexts(contexts):
+    """Return {context: cached queue}, building and caching missing ones"""
+    version_keys = {context: _version_key(context) for context in contexts}
+    versions = cache.get_many(version_keys.values())
+
+    new_versions = {}
+    array_keys = {}
+    for context, version_key in version_keys.items():
+        version = versions.get(version_key)
+        if version is None:
+            version = new_versions[version_key] = time.time_ns()
+        array_keys[context] = 'play_queue_{}_{}_{}_{}'.format(QUEUE_LAYOUT, *context, version)
+    if new_versions:
+        cache.set_many(new_versions, None)
+
+    cached = cache.get_many(array_keys.values())
+    queues, missing = {}, {}
+    for context, array_key in array_keys.items():
+        if array_key in cached:
+            queues[context] = cached[array_key]
+        else:
+            queues[context] = missing[array_key] = _context_ids(*context)
+    if missing:
+        cache.set_many(missing, settings.PLAY_QUEUE_CACHE_TIMEOUT)
+    return queues
+
+
+def _ordered_neighbour(queue, music_id, offset):
+    order, sorted_ids, ranks = queue
+    index = bisect_left(sorted_ids, music_id)
+    if index == len(sorted_ids) or sorted_ids[index] != music_id:
+        return None
+    rank = ranks[index] + offset
+    return order[rank] if 0 <= rank < len(order) else None
+
+
+def _after(ids, music_id):
+    index = bisect_right(ids, music_id)
+    return ids[index] if index < len(ids) else None
+
+
+def _before(ids, music_id):
+    index = bisect_left(ids, music_id)
+    return ids[index - 1] if index > 0 else None
+
+
+def _catalog_neighbour(music_id, offset):
+    """The next or previous track of the whole catalog by ID, wrapping around at either end"""
+    ids = Music.objects.order_by('id').values_list('id', flat=True)
+    if offset > 0:
+        return ids.filter(id__gt=music_id).first() or ids.first()
+    return ids.filter(id__lt=music_id).last() or ids.last()
+
+
+def _radio_next(music_id, user_id=None):
+    """
+    The track most like this one in the nearest-neighbour index, if it is built.
+
+    Tracks in the listener's recent history are skipped, so two tracks that are
+    each other's closest match do not play back and forth. The history is only
+    read here, once every other context has run out, and comes from the cache.
+    """
+    index = current_index()
+    vector = index.vector_of(music_id) if index is not None else None
+    if vector is None:
+        return None
+    played = recent_music_ids(user_id) if user_id is not None else []
+    similar = index.search(vector, 1, exclude_ids=[music_id, *played])
+    return similar[0] if similar else None
+
+
+def sorted_queue_ids(context, queue):
+    """The sorted IDs of a cached queue"""
+    return queue[1] if context[0] in ORDERED_KINDS else queue
+
+
+def _in_queue(ids, music_id):
+    index = bisect_left(ids, music_id)
+    return index < len(ids) and ids[index] == music_id
+
+
+def resolve_neighbours(music, context=None, shuffle=None, user_id=None):
+    """
+    Return (next_id, previous_id) for a track.
+
+    The explicit context is tried first, in the order of the seeded shuffle
+    ``shuffle`` if one is given; playlists only apply when the track is part
+    of them. Otherwise the track's album is used, in disc and track order. Once those run out,
+    playback continues with the most similar track not in the recent history
+    of the listener ``user_id``, like a radio; only when there is none does
+    the whole catalog take over, in ID order and wrapping around at either end.
+    """
+    album_context = ('album', music.album_id) if music.album_id else None
+    contexts = [c for c in (context, album_context) if c]
+    queues = load_contexts(dict.fromkeys(contexts)) if contexts else {}
+
+    explicit = queues.get(context) if context else None
+    album = queues.get(album_context) if album_context else None
+
+    results = []
+    for offset, step in ((1, _after), (-1, _before)):
+        if explicit is None:
+            neighbour = None
+        elif shuffle is not None:
+            # Ordered queues shuffle their sorted copy, so reordering them keeps the shuffle
+            ids = sorted_queue_ids(context, explicit)
+            neighbour = shuffled_neighbour(ids, music.id, shuffle, offset) if _in_queue(ids, music.id) else None
+        elif context[0] in ORDERED_KINDS:
+            neighbour = _ordered_neighbour(explicit, music.id, offset)
+        else:
+            neighbour = step(explicit, music.id)
+        if neighbour is None and album is not None:
+            neighbour = _ordered_neighbour(album, music.id, offset)
+        if neighbour is None and offset == 1:
+            neighbour = _radio_next(music.id, user_id)
+        if neighbour is None:
+            neighbour = _catalog_neighbour(music.id, offset)
+        results.append(neighbour)
+    return tuple(results)
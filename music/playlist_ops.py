@@ -0,0 +1,133 @@
+"""
+Batched playlist mutations.
+
+A batch of removes, moves and adds is applied in one transaction: positions
+are worked out in memory against the playlist's current keys, then written
+with a single delete, ``bulk_update`` and ``bulk_create``.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from django.db import transaction
+from django.db.models import Sum
+from api.messages import BUSINESS_ANCHOR_NOT_IN_PLAYLIST, BUSINESS_TRACK_NOT_IN_PLAYLIST
+from .models import Music, Playlist, PlaylistChange, PlaylistTrack
+from .play_queue import bump_context_version
+from .positions import key_between
+
+
+class PlaylistOperationError(ValueError):
+    """An operation refers to a track that is not (or no longer) in the playlist"""
+
+    def __init__(self, message, operation):
+        super().__init__(message)
+        self.operation = operation
+
+
+class _PositionIndex:
+    """Sorted position keys of a playlist with the key of each track"""
+
+    def __init__(self, rows):
+        self.keys = sorted(position for _music_id, position in rows)
+        self.by_music = dict(rows)
+
+    def __contains__(self, music_id):
+        return music_id in self.by_music
+
+    def discard(self, music_id):
+        key = self.by_music.pop(music_id)
+        del self.keys[bisect_left(self.keys, key)]
+
+    def place(self, music_id, after=None, before=None):
+        """Pick a key for ``music_id`` next to an anchor (or at the end) and record it"""
+        if after is not None:
+            lower = self.by_music[after]
+            index = bisect_right(self.keys, lower)
+            upper = self.keys[index] if index < len(self.keys) else None
+        elif before is not None:
+            upper = self.by_music[before]
+            index = bisect_left(self.keys, upper)
+            lower = self.keys[index - 1] if index else None
+        else:
+            lower, upper = (self.keys[-1] if self.keys else None), None
+        key = key_between(lower or None, upper)
+        self.by_music[music_id] = key
+        insort(self.keys, key)
+        return key
+
+
+def _place(index, music_id, operation):
+    after, before = operation.get('after_id'), operation.get('before_id')
+    anchor = after if after is not None else before
+    if anchor is not None and (anchor == music_id or anchor not in index):
+        raise PlaylistOperationError(BUSINESS_ANCHOR_NOT_IN_PLAYLIST, operation)
+    return index.place(music_id, after=after, before=before)
+
+
+def apply_playlist_changes(playlist, add=(), remove=(), move=()):
+    """
+    Apply removes, then moves, then adds to a playlist atomically.
+
+    ``remove`` is a list of music IDs; ``add`` and ``move`` are lists of
+    ``{'music_id', 'after_id' | 'before_id'}`` dicts, applied in order so an
+    operation can anchor on a track added earlier in the same batch. Adding a
+    track that is already present is a no-op. Raises PlaylistOperationError
+    (and rolls back) when a move or anchor refers to a track not in the playlist.
+    """
+    with transaction.atomic():
+        # Serialise batches on the same playlist
+        Playlist.objects.select_for_update().filter(pk=playlist.pk).exists()
+
+        rows = list(PlaylistTrack.objects.filter(playlist=playlist).values_list('music_id', 'position'))
+        index = _PositionIndex(rows)
+
+        removed = [music_id for music_id in dict.fromkeys(remove) if music_id in index]
+        for music_id in removed:
+            index.discard(music_id)
+
+        moved = {}
+        for operation in move:
+            music_id = operation['music_id']
+            if music_id not in index:
+                raise PlaylistOperationError(BUSINESS_TRACK_NOT_IN_PLAYLIST, operation)
+            index.discard(music_id)
+            moved[music_id] = _place(index, music_id, operation)
+
+        added = {}
+        for operation in add:
+            music_id = operation['music_id']
+            if music_id in index:
+                continue
+            added[music_id] = _place(index, music_id, operation)
+
+        if removed:
+            playlist.music_tracks.remove(*removed)
+        if moved:
+            entries = list(PlaylistTrack.objects.filter(playlist=playlist, music_id__in=moved))
+            for entry in entries:
+                entry.position = moved[entry.music_id]
+            PlaylistTrack.objects.bulk_update(entries, ['position'])
+        if added:
+            PlaylistTrack.objects.bulk_create([
+                PlaylistTrack(playlist=playlist, music_id=music_id, position=position)
+                for music_id, position in added.items()
+            ])
+            # bulk_create skips m2m_changed, so the counters are adjusted here
+            duration = Music.objects.filter(pk__in=added).aggregate(total=Sum('duration'))['total'] or 0
+            Playlist.objects.adjust_counters([playlist.pk], len(added), duration)
+        if any(len(key) > PlaylistTrack.POSITION_MAX_LENGTH for key in [*moved.values(), *added.values()]):
+            PlaylistTrack.objects.renumber(playlist.pk)
+            positions = dict(PlaylistTrack.objects.filter(
+                playlist=playlist, music_id__in=[*moved, *added]
+            ).values_list('music_id', 'position'))
+            moved = {music_id: positions[music_id] for music_id in moved}
+            added = {music_id: positions[music_id] for music_id in added}
+
+        # Removes were logged by the m2m signal; entries written in bulk are logged here
+        Playlist.objects.record_changes(playlist.pk, [
+            *((PlaylistChange.Operation.MOVE, music_id, position) for music_id, position in moved.items()),
+            *((PlaylistChange.Operation.ADD, music_id, position) for music_id, position in added.items()),
+        ])
+
+    if moved or added:
+        bump_context_version('playlist', playlist.pk)
+    return {'added': added, 'removed': removed, 'moved': moved}
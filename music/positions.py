@@ -0,0 +1,78 @@
+"""
+Lexicographic position keys for user-ordered lists.
+
+A key is a base-36 fraction written with the digits ``0-9a-z`` and no trailing
+zeros, so plain string comparison matches numeric order in every database
+collation. A key can always be generated between two others, which lets an
+item be inserted or moved by writing its own row only.
+"""
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+
+# Appended and initial keys use this many digits, spaced STEP apart, leaving
+# room for several inserts between neighbours before keys get longer.
+KEY_WIDTH = 6
+STEP = BASE ** 2
+MIDDLE = BASE ** KEY_WIDTH // 2
+
+
+def _encode(value):
+    digits = []
+    for _ in range(KEY_WIDTH):
+        value, digit = divmod(value, BASE)
+        digits.append(DIGITS[digit])
+    return ''.join(reversed(digits)).rstrip('0')
+
+
+def _decode(key):
+    value = 0
+    for char in key[:KEY_WIDTH].ljust(KEY_WIDTH, '0'):
+        value = value * BASE + DIGITS.index(char)
+    return value
+
+
+def key_between(before, after):
+    """
+    Return a key sorting strictly between ``before`` and ``after``.
+
+    Either bound may be None for the start or end of the list.
+    """
+    if before is not None and after is not None and before >= after:
+        raise ValueError(f'{before!r} must sort before {after!r}')
+    if before is None and after is None:
+        return _encode(MIDDLE)
+    if after is None:
+        value = _decode(before) + STEP
+        if value < BASE ** KEY_WIDTH:
+            return _encode(value)
+    if before is None:
+        value = _decode(after) - STEP
+        if value > 0:
+            return _encode(value)
+
+    # Midpoint, digit by digit: copy the shared prefix, then pick a digit
+    # between the two bounds, extending the key when they are adjacent.
+    before = before or ''
+    result = []
+    index = 0
+    while True:
+        low = DIGITS.index(before[index]) if index < len(before) else 0
+        high = DIGITS.index(after[index]) if after is not None and index < len(after) else BASE
+        if low == high:
+            result.append(DIGITS[low])
+        elif high - low > 1:
+            result.append(DIGITS[(low + high) // 2])
+            return ''.join(result)
+        else:
+            # Adjacent digits: keep the lower one, the upper bound no longer applies
+            result.append(DIGITS[low])
+            after = None
+        index += 1
+
+
+def spaced_keys(count):
+    """``count`` evenly spaced keys in ascending order, for renumbering a list"""
+    step = min(STEP, BASE ** KEY_WIDTH // (count + 1))
+    start = max(step, MIDDLE - count // 2 * step)
+    return [_encode(start + i * step) for i in range(count)]
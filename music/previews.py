@@ -0,0 +1,266 @@
+"""
+Preview clip generation.
+
+MP3 and ADTS AAC files are cut on frame boundaries and WAV files on sample
+boundaries, copying the original bytes so the preview is never re-encoded.
+Other formats are stream-copied with ffmpeg when it is available.
+"""
+
+import logging
+import os
+import posixpath
+import shutil
+import subprocess
+import tempfile
+import wave
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from .audio import local_file_path, UnsupportedAudioError
+from .blob_models import AudioBlob
+
+logger = logging.getLogger(__name__)
+
+COPY_BLOCK_SIZE = 64 * 1024
+
+# Bitrates in kbps indexed by [MPEG1?][layer][bitrate index]
+MP3_BITRATES = {
+    True: {
+        1: [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+        2: [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+        3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    },
+    False: {
+        1: [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+        2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+        3: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    },
+}
+MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG1
+    2: [22050, 24000, 16000],  # MPEG2
+    0: [11025, 12000, 8000],   # MPEG2.5
+}
+ADTS_SAMPLE_RATES = [96000, 88200, 64000, 48000, 44100, 32000, 24000, 22050,
+                     16000, 12000, 11025, 8000, 7350]
+
+
+def _parse_mp3_header(header):
+    """Return (frame size, samples, sample rate) for a 4 byte MPEG audio header, or None"""
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x03
+    layer = 4 - ((header[1] >> 1) & 0x03)
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0x03
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = MP3_BITRATES[mpeg1][layer][bitrate_index] * 1000
+    sample_rate = MP3_SAMPLE_RATES[version][sample_rate_index]
+    padding = (header[2] >> 1) & 0x01
+
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate
+    if layer == 3 and not mpeg1:
+        return 72 * bitrate // sample_rate + padding, 576, sample_rate
+    return 144 * bitrate // sample_rate + padding, 1152, sample_rate
+
+
+def _parse_adts_header(header):
+    """Return (frame size, samples, sample rate) for a 7 byte ADTS header, or None"""
+    if len(header) < 7 or header[0] != 0xFF or header[1] & 0xF6 != 0xF0:
+        return None
+    sample_rate_index = (header[2] >> 2) & 0x0F
+    if sample_rate_index >= len(ADTS_SAMPLE_RATES):
+        return None
+    frame_size = ((header[3] & 0x03) << 11) | (header[4] << 3) | (header[5] >> 5)
+    if frame_size < 7:
+        return None
+    return frame_size, 1024 * ((header[6] & 0x03) + 1), ADTS_SAMPLE_RATES[sample_rate_index]
+
+
+def _id3v2_size(source):
+    """Size of a leading ID3v2 tag, 0 if there is none"""
+    source.seek(0)
+    header = source.read(10)
+    if len(header) < 10 or header[:3] != b'ID3':
+        return 0
+    size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+    footer = 10 if header[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def scan_frames(source, parse_header, header_size):
+    """
+    Yield (position, size, seconds) for each audio frame.
+
+    Only frame headers are read; the file is walked by seeking from one frame
+    to the next, resynchronising on the next 0xFF byte after garbage.
+    """
+    position = _id3v2_size(source)
+    while True:
+        source.seek(position)
+        header = source.read(header_size)
+        if len(header) < header_size or header[:3] == b'TAG':
+            return
+        parsed = parse_header(header)
+        if parsed is None:
+            source.seek(position + 1)
+            block = source.read(COPY_BLOCK_SIZE)
+            sync = block.find(b'\xff')
+            if sync < 0:
+                if len(block) < COPY_BLOCK_SIZE:
+                    return
+                position += 1 + len(block)
+            else:
+                position += 1 + sync
+            continue
+        frame_size, samples, sample_rate = parsed
+        yield position, frame_size, samples / sample_rate
+        position += frame_size
+
+
+def _is_vbr_info_frame(source, position, size):
+    """Whether an MP3 frame is a Xing/Info/VBRI header rather than audio"""
+    source.seek(position)
+    frame = source.read(size)
+    return any(marker in frame for marker in (b'Xing', b'Info', b'VBRI'))
+
+
+def frame_byte_range(frames, offset, length):
+    """
+    Pick the byte range of whole frames covering ``length`` seconds.
+
+    The clip starts at ``offset`` or earlier if the track is too short to fit
+    a full-length preview there.
+    """
+    frames = list(frames)
+    if not frames:
+        return None
+    duration = sum(seconds for _position, _size, seconds in frames)
+    start_time = max(0.0, min(offset, duration - length))
+
+    elapsed, start, end = 0.0, None, None
+    for position, size, seconds in frames:
+        if start is None and elapsed + seconds > start_time:
+            start = position
+        if start is not None:
+            end = position + size
+            if elapsed + seconds >= start_time + length:
+                break
+        elapsed += seconds
+    return start, end
+
+
+def _copy_range(source, destination, start, end):
+    source.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        block = source.read(min(COPY_BLOCK_SIZE, remaining))
+        if not block:
+            break
+        destination.write(block)
+        remaining -= len(block)
+
+
+def cut_frames(path, destination, offset, length, parse_header, header_size):
+    """Copy the frames of an MP3/ADTS stream that cover the preview window"""
+    with open(path, 'rb') as source:
+        frames = scan_frames(source, parse_header, header_size)
+        if parse_header is _parse_mp3_header:
+            first = next(frames, None)
+            if first is None:
+                raise UnsupportedAudioError('No MPEG audio frames found')
+            rest = list(frames)
+            frames = rest if _is_vbr_info_frame(source, first[0], first[1]) else [first] + rest
+        byte_range = frame_byte_range(frames, offset, length)
+        if byte_range is None:
+            raise UnsupportedAudioError('No audio frames found')
+        _copy_range(source, destination, *byte_range)
+
+
+def cut_wav(path, destination, offset, length):
+    """Copy the PCM samples of the preview window into a new WAV file"""
+    try:
+        with wave.open(path, 'rb') as source, wave.open(destination, 'wb') as target:
+            rate = source.getframerate()
+            total = source.getnframes()
+            frame_count = min(total, int(length * rate))
+            start = max(0, min(int(offset * rate), total - frame_count))
+            target.setparams(source.getparams())
+            source.setpos(start)
+            block_frames = max(1, COPY_BLOCK_SIZE // (source.getsampwidth() * source.getnchannels()))
+            while frame_count > 0:
+                data = source.readframes(min(block_frames, frame_count))
+                if not data:
+                    break
+                target.writeframes(data)
+                frame_count -= block_frames
+    except wave.Error as exc:
+        raise UnsupportedAudioError(str(exc)) from exc
+
+
+def cut_with_ffmpeg(path, destination_path, offset, length):
+    """Stream-copy the preview window with ffmpeg (no re-encoding)"""
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        raise UnsupportedAudioError(f'ffmpeg is required to cut {os.path.basename(path)}')
+    result = subprocess.run(
+        [ffmpeg, '-nostdin', '-v', 'error', '-y', '-ss', str(offset), '-t', str(length),
+         '-i', path, '-map', '0:a', '-c', 'copy', destination_path],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        check=False
+    )
+    if result.returncode != 0:
+        raise UnsupportedAudioError(result.stderr.decode(errors='replace').strip())
+
+
+def cut_preview(path, destination_path, offset, length):
+    """Write a preview clip of the audio file at ``path`` to ``destination_path``"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.mp3':
+        with open(destination_path, 'wb') as destination:
+            cut_frames(path, destination, offset, length, _parse_mp3_header, 4)
+    elif extension == '.aac':
+        with open(destination_path, 'wb') as destination:
+            cut_frames(path, destination, offset, length, _parse_adts_header, 7)
+    elif extension == '.wav':
+        cut_wav(path, destination_path, offset, length)
+    else:
+        cut_with_ffmpeg(path, destination_path, offset, length)
+
+
+def preview_name(blob):
+    """Store the preview next to the original: <dir>/<sha256>_preview.<ext>"""
+    stem, extension = posixpath.splitext(blob.file.name)
+    return f'{stem}_preview{extension}'
+
+
+def generate_blob_preview(blob, force=False):
+    """Cut and store the preview clip for an audio blob, returning the stored name"""
+    if blob.preview_file and not force:
+        return blob.preview_file.name
+
+    extension = posixpath.splitext(blob.file.name)[1]
+    with tempfile.TemporaryDirectory() as workdir:
+        clip_path = os.path.join(workdir, f'preview{extension}')
+        try:
+            with local_file_path(blob.file) as path:
+                cut_preview(path, clip_path, settings.PREVIEW_OFFSET_SECONDS, settings.PREVIEW_LENGTH_SECONDS)
+        except UnsupportedAudioError as exc:
+            logger.info('Skipping preview for blob %s: %s', blob.sha256, exc)
+            return None
+
+        previous = blob.preview_file.name if blob.preview_file else None
+        with open(clip_path, 'rb') as clip:
+            name = blob.preview_file.storage.save(preview_name(blob), File(clip))
+
+    with transaction.atomic():
+        AudioBlob.objects.filter(pk=blob.pk).update(preview_file=name)
+    if previous and previous != name:
+        blob.preview_file.storage.delete(previous)
+    blob.preview_file = name
+    return name
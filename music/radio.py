@@ -0,0 +1,138 @@
+"""
+Endless radio sessions seeded by a track, an artist or a tag.
+
+A session is one entry in the shared cache, so any worker can serve its next
+batch, under a random token holding the seed, the IDs already played (the
+last RADIO_HISTORY_SIZE, which are never repeated) and the artists of the
+last RADIO_ARTIST_SPACING tracks, which are held back so no artist dominates
+a stretch of the station.
+
+Each batch is drawn from precomputed similarity data: the co-listened
+neighbours (``TrackNeighbours``) and nearest neighbours (the ANN index) of
+the session's latest tracks, plus the cached play queue of an artist or tag
+seed. Only when those run dry does the tag index widen the pool. A batch
+costs a neighbour lookup and an artist lookup however far ahead the client
+asks.
+"""
+
+import uuid
+from array import array
+from collections import defaultdict, deque
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from .ann import current_index
+from .models import Music, TrackNeighbours
+from .play_queue import load_contexts
+from .tag_index import similar_by_tags
+
+
+def _session_key(user_id, token):
+    return f'radio_session_{user_id}_{token}'
+
+
+def start_session(user_id, kind, key):
+    """Open a station on a ('track', id), ('artist', id) or ('tag', name) seed; returns its token"""
+    token = uuid.uuid4().hex
+    state = {
+        'seed': (kind, key),
+        'played': array('q', [key] if kind == 'track' else []),
+        'artists': [],
+    }
+    cache.set(_session_key(user_id, token), state, settings.RADIO_SESSION_TIMEOUT)
+    return token
+
+
+def _seed_pool(state, seen):
+    """Unplayed tracks of an artist or tag seed, read from a rotating offset"""
+    kind, key = state['seed']
+    if kind == 'track':
+        return []
+    ids = load_contexts([(kind, key)])[(kind, key)]
+    pool = []
+    start = len(state['played']) % len(ids) if ids else 0
+    for offset in range(len(ids)):
+        music_id = ids[(start + offset) % len(ids)]
+        if music_id not in seen:
+            pool.append(music_id)
+            if len(pool) == settings.RADIO_CANDIDATES:
+                break
+    return pool
+
+
+def _candidate_scores(seeds, pool):
+    """{music_id: score} merged from the seeds' neighbours, newest seed weighing most"""
+    scores = defaultdict(float)
+    for rank, music_id in enumerate(pool):
+        scores[music_id] += settings.RADIO_POOL_WEIGHT * (1 - rank / len(pool))
+
+    weight_of = {music_id: settings.RADIO_SEED_DECAY ** rank for rank, music_id in enumerate(seeds)}
+    rows = TrackNeighbours.objects.filter(music_id__in=seeds).values_list('music_id', 'neighbour_ids', 'scores')
+    for music_id, neighbour_ids, neighbour_scores in rows:
+        weight = weight_of[music_id]
+        for neighbour_id, score in zip(np.frombuffer(neighbour_ids, dtype=np.int64).tolist(),
+                                       np.frombuffer(neighbour_scores, dtype=np.float32).tolist()):
+            scores[neighbour_id] += weight * score
+
+    index = current_index()
+    if index is not None:
+        for music_id, weight in weight_of.items():
+            for neighbour_id, score in index.similar(music_id, settings.RADIO_CANDIDATES, with_scores=True):
+                scores[neighbour_id] += weight * max(score, 0.0)
+    return scores
+
+
+def next_batch(user_id, token, size):
+    """
+    The next ``size`` track IDs of a station, or None if the session expired.
+
+    Candidates are taken best first, skipping tracks already played and, on
+    a first pass, tracks by the artists held back; a second pass relaxes the
+    spacing rather than cut the batch short.
+    """
+    key = _session_key(user_id, token)
+    state = cache.get(key)
+    if state is None:
+        return None
+
+    played = state['played']
+    seen = set(played)
+    seeds = played[::-1][:settings.RADIO_SEED_TRACKS].tolist()
+    pool = _seed_pool(state, seen)
+    if not seeds:
+        seeds = pool[:settings.RADIO_SEED_TRACKS]
+    scores = _candidate_scores(seeds, pool)
+    candidates = [music_id for music_id in scores if music_id not in seen]
+    if len(candidates) < size and seeds:
+        # Tracks sharing the seeds' tags rank after every similar track
+        widened = similar_by_tags(seeds, settings.RADIO_CANDIDATES, exclude_ids=seen.union(scores))
+        for rank, music_id in enumerate(widened):
+            scores[music_id] = -1 - rank
+        candidates += widened
+
+    # Deleted tracks drop out here: they have no row to join their artists to
+    artists_of = {}
+    for music_id, artist_id in Music.objects.filter(pk__in=candidates).values_list('id', 'artist'):
+        artists = artists_of.setdefault(music_id, set())
+        if artist_id is not None:
+            artists.add(artist_id)
+    ranked = sorted(artists_of, key=lambda music_id: (-scores[music_id], music_id))
+
+    window = deque(state['artists'], maxlen=settings.RADIO_ARTIST_SPACING)
+    batch = []
+    for spaced in (True, False):
+        for music_id in ranked:
+            if len(batch) == size:
+                break
+            if music_id in seen:
+                continue
+            if spaced and any(artists_of[music_id] & set(artists) for artists in window):
+                continue
+            batch.append(music_id)
+            seen.add(music_id)
+            window.append(tuple(artists_of[music_id]))
+
+    state['played'] = (played + array('q', batch))[-settings.RADIO_HISTORY_SIZE:]
+    state['artists'] = list(window)
+    cache.set(key, state, settings.RADIO_SESSION_TIMEOUT)
+    return batch
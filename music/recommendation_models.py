@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class TrackNeighbours(models.Model):
+    """
+    The tracks most often listened to alongside one track.
+
+    Rows are rebuilt offline by ``build_recommendations``; the neighbour IDs
+    (int64) and their similarity scores (float32) are stored as packed arrays,
+    best first, so serving a user's recommendations only reads a few rows.
+    """
+    music = models.OneToOneField(
+        'music.Music',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='neighbours',
+        verbose_name=_('music')
+    )
+    neighbour_ids = models.BinaryField(_('neighbour IDs'))
+    scores = models.BinaryField(_('scores'))
+    built_at = models.DateTimeField(_('built at'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('track neighbours')
+        verbose_name_plural = _('track neighbours')
+
+    def __str__(self):
+        return f"Neighbours of {self.music_id}"
+
+
+class TasteProfile(models.Model):
+    """
+    A user's decayed affinity for tags, artists and languages.
+
+    Updated incrementally by ``music.taste`` as plays and favorites come in;
+    the vector is stored packed (sorted int64 feature keys, then float32
+    weights) together with the time its weights were last decayed to.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='taste_profile',
+        verbose_name=_('user')
+    )
+    vector = models.BinaryField(_('vector'), default=bytes)
+    decayed_at = models.DateTimeField(_('decayed at'), default=timezone.now)
+
+    class Meta:
+        verbose_name = _('taste profile')
+        verbose_name_plural = _('taste profiles')
+
+    def __str__(self):
+        return f"Taste of {self.user_id}"
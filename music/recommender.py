@@ -0,0 +1,188 @@
+"""
+Item-item recommendations from co-occurrence in listening data.
+
+``build_neighbours`` runs offline. Every user (their plays and favorites)
+and every playlist is a basket of weighted tracks; two tracks co-occur when
+they share a basket, and a track's neighbours are the tracks with the highest
+cosine similarity ``C[i, j] / sqrt(C[i, i] * C[j, j])`` over the summed
+weight products. The sparse matrix is built with NumPy a chunk of baskets at
+a time and only the top RECOMMENDER_NEIGHBOURS per track are stored.
+
+``recommend_for_user`` merges the neighbour lists of the user's most recent
+tracks, read from the cached listening history, with one primary-key query
+and re-ranks the candidates by the user's taste profile.
+"""
+
+from itertools import chain
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from .favorites import favorite_ids
+from .listening_history import recent_music_ids
+from .models import Favorite, Music, PlaylistTrack, RecentlyPlayed, TrackNeighbours
+from .taste import taste_scores
+
+# Users and playlists share one basket key space: key * 2 + kind
+USER_BASKET, PLAYLIST_BASKET = 0, 1
+
+
+def _read_pairs(queryset):
+    """(owner_id, music_id) rows as an (n, 2) int64 array"""
+    rows = queryset.iterator(chunk_size=10000)
+    return np.fromiter(chain.from_iterable(rows), dtype=np.int64).reshape(-1, 2)
+
+
+def _basket_entries():
+    """(basket keys, music IDs, weights), one entry per source row"""
+    sources = [
+        (RecentlyPlayed.objects.values_list('user_id', 'music_id'), USER_BASKET, settings.RECOMMENDER_PLAY_WEIGHT),
+        (Favorite.objects.values_list('user_id', 'music_id'), USER_BASKET, settings.RECOMMENDER_FAVORITE_WEIGHT),
+        (PlaylistTrack.objects.values_list('playlist_id', 'music_id'), PLAYLIST_BASKET,
+         settings.RECOMMENDER_PLAYLIST_WEIGHT),
+    ]
+    baskets, tracks, weights = [], [], []
+    for queryset, kind, weight in sources:
+        pairs = _read_pairs(queryset)
+        baskets.append(pairs[:, 0] * 2 + kind)
+        tracks.append(pairs[:, 1])
+        weights.append(np.full(len(pairs), weight, dtype=np.float64))
+    return np.concatenate(baskets), np.concatenate(tracks), np.concatenate(weights)
+
+
+def _group_bounds(sorted_keys):
+    """Start offsets and sizes of the runs of equal keys in a sorted array"""
+    if not len(sorted_keys):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    return starts, np.diff(np.r_[starts, len(sorted_keys)])
+
+
+def _top_per_group(groups, scores, limit):
+    """Index array keeping the ``limit`` best scores of every group, groups ascending and best first"""
+    order = np.lexsort((-scores, groups))
+    starts, sizes = _group_bounds(groups[order])
+    rank = np.arange(len(order)) - np.repeat(starts, sizes)
+    return order[rank < limit]
+
+
+def _sum_by_key(keys, values):
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    return unique_keys, np.bincount(inverse, weights=values)
+
+
+def _cooccurrence(items, weights, starts, sizes, track_count):
+    """
+    Sum ``w_i * w_j`` over baskets for every ordered pair of distinct tracks.
+
+    Baskets are expanded into pairs a chunk at a time, so memory stays
+    bounded by RECOMMENDER_PAIR_CHUNK rather than by the largest basket sum.
+    Returns ``(pair keys, totals)`` with ``key = i * track_count + j``.
+    """
+    keys, totals = np.empty(0, dtype=np.int64), np.empty(0)
+    cumulative = np.cumsum(sizes * sizes)
+    first = 0
+    while first < len(starts):
+        done = cumulative[first - 1] if first else 0
+        last = max(int(np.searchsorted(cumulative, done + settings.RECOMMENDER_PAIR_CHUNK, side='right')), first + 1)
+        basket_starts, basket_sizes = starts[first:last], sizes[first:last]
+
+        # Each entry is repeated once per entry of its basket and paired with it
+        entries = np.arange(basket_starts[0], basket_starts[-1] + basket_sizes[-1])
+        repeats = np.repeat(basket_sizes, basket_sizes)
+        left = np.repeat(entries, repeats)
+        offsets = np.arange(len(left)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        right = np.repeat(np.repeat(basket_starts, basket_sizes), repeats) + offsets
+        distinct = left != right
+        left, right = left[distinct], right[distinct]
+
+        chunk_keys, chunk_totals = _sum_by_key(
+            items[left] * track_count + items[right], weights[left] * weights[right]
+        )
+        keys, totals = _sum_by_key(np.r_[keys, chunk_keys], np.r_[totals, chunk_totals])
+        first = last
+    return keys, totals
+
+
+def build_neighbours():
+    """
+    Rebuild every track's ``TrackNeighbours`` row from listening data.
+
+    Returns the number of tracks that got neighbours.
+    """
+    baskets, tracks, weights = _basket_entries()
+    track_ids, track_index = np.unique(tracks, return_inverse=True)
+    track_count = len(track_ids)
+    if not track_count:
+        TrackNeighbours.objects.all().delete()
+        return 0
+
+    # One entry per (basket, track): a favorite that was also played counts both weights
+    entry_keys, weights = _sum_by_key(baskets * track_count + track_index, weights)
+    baskets, items = entry_keys // track_count, entry_keys % track_count
+
+    # Very large baskets add little signal and quadratic cost; keep their heaviest tracks
+    keep = _top_per_group(baskets, weights, settings.RECOMMENDER_MAX_BASKET)
+    baskets, items, weights = baskets[keep], items[keep], weights[keep]
+    starts, sizes = _group_bounds(baskets)
+    norms = np.bincount(items, weights=weights * weights, minlength=track_count)
+
+    pair_keys, totals = _cooccurrence(items, weights, starts, sizes, track_count)
+    rows, columns = pair_keys // track_count, pair_keys % track_count
+    scores = totals / np.sqrt(norms[rows] * norms[columns])
+
+    best = _top_per_group(rows, scores, settings.RECOMMENDER_NEIGHBOURS)
+    rows, columns, scores = rows[best], columns[best], scores[best]
+    row_starts, row_sizes = _group_bounds(rows)
+
+    with transaction.atomic():
+        # Tracks deleted while the matrix was built have no row to point to
+        existing = np.fromiter(Music.objects.values_list('id', flat=True).iterator(), dtype=np.int64)
+        kept = np.isin(track_ids[rows[row_starts]], existing)
+        TrackNeighbours.objects.all().delete()
+        TrackNeighbours.objects.bulk_create(
+            (
+                TrackNeighbours(
+                    music_id=int(track_ids[rows[start]]),
+                    neighbour_ids=track_ids[columns[start:start + size]].astype(np.int64).tobytes(),
+                    scores=scores[start:start + size].astype(np.float32).tobytes()
+                )
+                for start, size in zip(row_starts[kept].tolist(), row_sizes[kept].tolist())
+            ),
+            batch_size=1000
+        )
+    return int(kept.sum())
+
+
+def recommend_for_user(user_id, limit):
+    """
+    IDs of up to ``limit`` tracks for a user, best first.
+
+    The neighbour lists of the user's most recent plays (or, before they have
+    played anything, their latest favorites) are merged, more recent seeds
+    weighing more, and boosted by the user's taste profile. Tracks the user
+    recently played or favorited are left out.
+    """
+    history = recent_music_ids(user_id)
+    seeds = history[:settings.RECOMMENDER_SEED_TRACKS] or list(
+        Favorite.objects.filter(user_id=user_id).order_by('-created_at')
+        .values_list('music_id', flat=True)[:settings.RECOMMENDER_SEED_TRACKS]
+    )
+    if not seeds:
+        return []
+
+    seed_weight = {music_id: settings.RECOMMENDER_SEED_DECAY ** rank for rank, music_id in enumerate(seeds)}
+    candidates, candidate_scores = [], []
+    for music_id, neighbour_ids, scores in TrackNeighbours.objects.filter(music_id__in=seeds) \
+            .values_list('music_id', 'neighbour_ids', 'scores'):
+        candidates.append(np.frombuffer(neighbour_ids, dtype=np.int64))
+        candidate_scores.append(np.frombuffer(scores, dtype=np.float32) * seed_weight[music_id])
+    if not candidates:
+        return []
+
+    candidates, totals = _sum_by_key(np.concatenate(candidates), np.concatenate(candidate_scores))
+    known = np.isin(candidates, np.array(history + list(favorite_ids(user_id)), dtype=np.int64))
+    candidates, totals = candidates[~known], totals[~known]
+    # Among co-listened tracks, favor those matching the user's taste profile
+    totals = totals * (1 + settings.RECOMMENDER_TASTE_BLEND * taste_scores(user_id, candidates.tolist()))
+    order = np.argsort(-totals, kind='stable')[:limit]
+    return candidates[order].tolist()
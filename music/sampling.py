@@ -0,0 +1,137 @@
+"""
+Random sampling and seeded shuffles that never sort the catalog at random.
+
+A shuffle gives every track a key, a 64-bit hash of its ID mixed with the
+shuffle seed, and plays the tracks in key order. A track's key does not
+depend on the rest of the queue, so the order is reproducible from the seed
+alone: any page of it can be served on any request, and adding or removing
+one track does not reshuffle the others. The neighbours of a track in that
+order are found with one vectorised pass over the queue's cached ID array,
+without sorting it.
+
+Samples are drawn without replacement, uniformly or in proportion to a
+weight array. Catalog-wide samples draw IDs in the primary key range and
+keep those that exist, which is uniform over the existing tracks and only
+touches the primary key index.
+"""
+
+import secrets
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max, Min
+from .models import Music
+
+# splitmix64 constants
+_GOLDEN = 0x9E3779B97F4A7C15
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+MAX_SEED = 2 ** 63 - 1
+WEIGHTS_CACHE_KEY = 'sampling_catalog_weights'
+
+
+def new_seed():
+    """A fresh seed for a client to send back with every page"""
+    return secrets.randbelow(MAX_SEED)
+
+
+def shuffle_keys(ids, seed):
+    """The shuffle key of each ID for a seed"""
+    keys = np.asarray(ids, dtype=np.int64).astype(np.uint64) + np.uint64(seed * _GOLDEN % 2 ** 64)
+    keys ^= keys >> np.uint64(30)
+    keys *= _MIX1
+    keys ^= keys >> np.uint64(27)
+    keys *= _MIX2
+    keys ^= keys >> np.uint64(31)
+    return keys
+
+
+def shuffled(ids, seed):
+    """The IDs in the order of a seeded shuffle"""
+    ids = np.asarray(ids, dtype=np.int64)
+    return ids[np.lexsort((ids, shuffle_keys(ids, seed)))]
+
+
+def shuffled_neighbour(ids, music_id, seed, offset):
+    """The track after (offset 1) or before (offset -1) a track in a seeded shuffle; None at either end"""
+    ids = np.asarray(ids, dtype=np.int64)
+    keys = shuffle_keys(ids, seed)
+    key = shuffle_keys([music_id], seed)[0]
+    # Keys compare first and IDs break the (practically impossible) ties
+    if offset > 0:
+        later = (keys > key) | ((keys == key) & (ids > music_id))
+    else:
+        later = (keys < key) | ((keys == key) & (ids < music_id))
+    rows = np.flatnonzero(later)
+    if not len(rows):
+        return None
+    order = np.lexsort((ids[rows], keys[rows]))
+    return int(ids[rows[order[0] if offset > 0 else order[-1]]])
+
+
+def sample(ids, count, rng, weights=None):
+    """
+    Up to ``count`` distinct IDs drawn without replacement, in draw order.
+
+    With ``weights`` each ID is drawn in proportion to its weight
+    (Efraimidis-Spirakis keys); IDs weighing nothing come last.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    count = min(count, len(ids))
+    if weights is None:
+        return ids[rng.choice(len(ids), count, replace=False)].tolist()
+    with np.errstate(divide='ignore'):
+        keys = np.log(rng.random(len(ids))) / np.asarray(weights, dtype=float)
+    best = np.argpartition(-keys, count - 1)[:count] if count else np.empty(0, dtype=np.int64)
+    return ids[best[np.argsort(-keys[best], kind='stable')]].tolist()
+
+
+def sample_catalog(count, rng, exclude_ids=()):
+    """
+    Up to ``count`` random track IDs from the whole catalog, uniformly.
+
+    IDs are drawn in the primary key range and kept if they exist, drawing
+    more per round as gaps in the range show up. If the range is too sparse
+    for SAMPLING_RANGE_ATTEMPTS rounds, the rest is read from random points
+    of the primary key index, which slightly favours tracks after gaps.
+    Excluded IDs are never returned.
+    """
+    bounds = Music.objects.aggregate(low=Min('id'), high=Max('id'))
+    if bounds['low'] is None:
+        return []
+    found = []
+    taken = set(exclude_ids)
+    hit_rate = 1.0
+    for _attempt in range(settings.SAMPLING_RANGE_ATTEMPTS):
+        missing = count - len(found)
+        if not missing:
+            break
+        draws = int(min(missing / max(hit_rate, 1 / settings.SAMPLING_MAX_OVERSAMPLE), settings.SAMPLING_MAX_DRAWS))
+        drawn = [music_id for music_id in rng.integers(bounds['low'], bounds['high'] + 1, size=max(draws, 1)).tolist()
+                 if music_id not in taken]
+        existing = set(Music.objects.filter(pk__in=drawn).values_list('id', flat=True))
+        hit_rate = len(existing) / max(len(drawn), 1)
+        for music_id in drawn:
+            if music_id in existing and music_id not in taken and len(found) < count:
+                found.append(music_id)
+                taken.add(music_id)
+
+    missing = count - len(found)
+    if missing:
+        pivot = int(rng.integers(bounds['low'], bounds['high'] + 1))
+        remaining = Music.objects.exclude(pk__in=taken).values_list('id', flat=True)
+        found += remaining.filter(id__gte=pivot).order_by('id')[:missing]
+        if len(found) < count:
+            found += remaining.filter(id__lt=pivot).order_by('id')[:count - len(found)]
+    return found
+
+
+def catalog_weights():
+    """(track IDs, popularity weights) of the whole catalog, cached for SAMPLING_WEIGHTS_TIMEOUT"""
+    cached = cache.get(WEIGHTS_CACHE_KEY)
+    if cached is None:
+        rows = np.array(list(Music.objects.values_list('id', 'play_count')), dtype=np.int64).reshape(-1, 2)
+        # Popular tracks come up more often, but every track keeps a chance
+        cached = rows[:, 0].copy(), 1 + np.log1p(rows[:, 1]).astype(np.float32)
+        cache.set(WEIGHTS_CACHE_KEY, cached, settings.SAMPLING_WEIGHTS_TIMEOUT)
+    return cached
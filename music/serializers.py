@@ -1,6 +1,15 @@
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.urls import reverse
 from rest_framework import serializers
-from .models import Artist, Album, Tag, Music, Playlist, RecentlyPlayed, Favorite
+from api.fields import DerivativeImageField
+from .models import Artist, Album, Tag, Music, Playlist, PlaylistChange, PlaylistTrack, RecentlyPlayed, Favorite
+from .favorites import is_favorite
+from .play_queue import queue_context, resolve_neighbours, shuffle_seed
+from .sampling import MAX_SEED
+from .tag_index import similar_by_tags
+from .tasks import fingerprint_music, generate_music_preview
 
 
 
@@ -9,8 +18,8 @@ class ArtistSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Artist
-        fields = ['id', 'name', 'bio', 'image', 'image_url', 'created_at']
-        read_only_fields = ['id', 'created_at']
+        fields = ['id', 'name', 'bio', 'image', 'image_url', 'followers_count', 'created_at']
+        read_only_fields = ['id', 'followers_count', 'created_at']
     
     def validate(self, data):
         """Ensure either image or image_url is provided"""
@@ -25,10 +34,11 @@ class ArtistSerializer(serializers.ModelSerializer):
 
 class ArtistListSerializer(serializers.ModelSerializer):
     """Lightweight serializer for listing artists"""
+    image = DerivativeImageField(size='medium', read_only=True)
     
     class Meta:
         model = Artist
-        fields = ['id', 'name', 'image','image_url']
+        fields = ['id', 'name', 'image','image_url', 'followers_count']
 
 
 class AlbumSerializer(serializers.ModelSerializer):
@@ -45,7 +55,8 @@ class AlbumSerializer(serializers.ModelSerializer):
     class Meta:
         model = Album
         fields = ['id', 'title', 'artist', 'artist_ids', 'release_date',
-                  'cover_image', 'cover_image_url', 'description', 'created_at']
+                  'cover_image', 'cover_image_url', 'description',
+                  'track_count', 'total_duration', 'total_plays', 'created_at']
         read_only_fields = ['id', 'created_at']
     
     def validate(self, data):
@@ -76,13 +87,15 @@ class AlbumSerializer(serializers.ModelSerializer):
 class AlbumListSerializer(serializers.ModelSerializer):
     """Lightweight serializer for listing albums"""
     artist_names = serializers.SerializerMethodField()
+    cover_image = DerivativeImageField(size='medium', read_only=True)
     
     class Meta:
         model = Album
-        fields = ['id', 'title', 'artist_names', 'cover_image', 'cover_image_url', 'release_date']
+        fields = ['id', 'title', 'artist_names', 'cover_image', 'cover_image_url', 'release_date',
+                  'track_count', 'total_duration']
     
     def get_artist_names(self, obj):
-        return list(obj.artist.values_list('name', flat=True))
+        return [artist.name for artist in obj.artist.all()]
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -104,34 +117,40 @@ class MusicSerializer(serializers.ModelSerializer):
     related_by_artist = serializers.SerializerMethodField()
     related_by_tags = serializers.SerializerMethodField()
     is_favorite = serializers.SerializerMethodField()
+    preview_url = serializers.SerializerMethodField()
 
     language_display = serializers.CharField(source='get_language_display', read_only=True)
     
     class Meta:
         model = Music
-        fields = ['id', 'title', 'artist', 'album', 'audio_file', 'audio_url', 'thumb_url', 'duration',
-                  'language', 'language_display', 'tags', 'play_count', 'is_favorited', 'is_favorite', 'created_at',
+        fields = ['id', 'title', 'artist', 'album', 'disc_number', 'track_number', 'audio_file', 'audio_url',
+                  'preview_url', 'thumb_url', 'duration', 'language', 'language_display', 'tags', 'play_count', 'is_favorited', 'is_favorite', 'created_at',
                   'related_by_album', 'related_by_artist', 'related_by_tags']
         read_only_fields = ['id', 'play_count', 'created_at']
 
 
     
+    def get_preview_url(self, obj):
+        """Link to the Range-capable preview stream, once the clip has been cut"""
+        if obj.audio_blob_id is None or not obj.audio_blob.preview_file:
+            return None
+        url = reverse('music-preview', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
     def get_is_favorited(self, obj):
         """Check if current user has favorited this music (Legacy)"""
         return self.get_is_favorite(obj)
 
     def get_is_favorite(self, obj):
         """Check if current user has favorited this music"""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Favorite.objects.filter(user=request.user, music=obj).exists()
-        return False
+        return is_favorite(self.context.get('request'), obj.id)
     
     def get_related_by_album(self, obj):
         """Get other songs from the same album"""
         if not obj.album:
             return []
-        related = Music.objects.filter(album=obj.album).exclude(id=obj.id)
+        related = Music.objects.filter(album=obj.album).exclude(id=obj.id).order_by(*Music.ALBUM_ORDER)
         return MusicListSerializer(related[:10], many=True, context=self.context).data
         
     def get_related_by_artist(self, obj):
@@ -144,17 +163,20 @@ class MusicSerializer(serializers.ModelSerializer):
         return MusicListSerializer(related[:10], many=True, context=self.context).data
         
     def get_related_by_tags(self, obj):
-        """Get other songs sharing at least one tag"""
-        tags = obj.tags.all()
-        if not tags:
-            return []
-        artists = obj.artist.all()
-        related = Music.objects.filter(tags__in=tags).exclude(id=obj.id).distinct()
+        """Get the songs whose tags are most similar, from the in-memory tag index"""
         # Exclude songs already in artist or album list
-        related = related.exclude(artist__in=artists)
-        if obj.album:
-            related = related.exclude(album=obj.album)
-        return MusicListSerializer(related[:10], many=True, context=self.context).data
+        shown = Q(artist__in=obj.artist.all())
+        if obj.album_id:
+            shown |= Q(album_id=obj.album_id)
+        related_ids = similar_by_tags([obj.id], 10, exclude_ids=Music.objects.filter(shown).values_list('id', flat=True))
+        if not related_ids:
+            return []
+        related = Music.objects.in_bulk(related_ids)
+        return MusicListSerializer(
+            [related[music_id] for music_id in related_ids if music_id in related],
+            many=True,
+            context=self.context
+        ).data
 
 
 
@@ -170,20 +192,17 @@ class MusicListSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Music
-        fields = ['id', 'title', 'artist_names', 'album_title', 'thumb_url', 'audio_url', 'duration',
+        fields = ['id', 'title', 'artist_names', 'album_title', 'disc_number', 'track_number', 'thumb_url', 'audio_url', 'duration',
                   'language', 'language_display', 'tags', 'play_count', 'is_favorited', 'is_favorite']
     
     def get_artist_names(self, obj):
-        return list(obj.artist.values_list('name', flat=True))
+        return [artist.name for artist in obj.artist.all()]
     
     def get_is_favorited(self, obj):
         return self.get_is_favorite(obj)
 
     def get_is_favorite(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Favorite.objects.filter(user=request.user, music=obj).exists()
-        return False
+        return is_favorite(self.context.get('request'), obj.id)
 
 
 class MusicUploadSerializer(serializers.ModelSerializer):
@@ -211,8 +230,8 @@ class MusicUploadSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Music
-        fields = ['id', 'title', 'artist_ids', 'album_id', 'audio_file', 'audio_url', 'thumb_url',
-                  'duration', 'language', 'tag_ids']
+        fields = ['id', 'title', 'artist_ids', 'album_id', 'disc_number', 'track_number', 'audio_file', 'audio_url',
+                  'thumb_url', 'duration', 'language', 'tag_ids']
     
     def validate(self, data):
         """Ensure either audio_file or audio_url is provided"""
@@ -231,20 +250,109 @@ class MusicUploadSerializer(serializers.ModelSerializer):
             music.artist.set(artist_ids)
         if tag_ids:
             music.tags.set(tag_ids)
+        if music.audio_file:
+            transaction.on_commit(lambda: fingerprint_music.delay(music.id))
+            transaction.on_commit(lambda: generate_music_preview.delay(music.id))
         return music
 
 
 class PlaylistSerializer(serializers.ModelSerializer):
-    """Serializer for Playlist model"""
+    """Playlist summary; tracks are listed page by page at /playlists/{id}/tracks/"""
     user_email = serializers.CharField(source='user.email', read_only=True)
-    music_tracks = MusicListSerializer(many=True, read_only=True)
-    track_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Playlist
-        fields = ['id', 'name', 'user_email', 'music_tracks', 'track_count',
+        fields = ['id', 'name', 'user_email', 'track_count', 'total_duration', 'revision',
                   'is_public', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'user_email', 'track_count', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'user_email', 'track_count', 'total_duration', 'revision',
+                            'created_at', 'updated_at']
+
+
+class PublicPlaylistSerializer(serializers.ModelSerializer):
+    """Summary of someone else's public playlist (no owner email, no tracks)"""
+    owner_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Playlist
+        fields = ['id', 'name', 'owner_name', 'track_count', 'total_duration', 'updated_at']
+
+    def get_owner_name(self, obj):
+        return obj.user.get_full_name()
+
+
+class PublicPlaylistQuerySerializer(serializers.Serializer):
+    """How public playlists are ranked"""
+    ordering = serializers.ChoiceField(choices=['popular', 'recent'], default='popular', required=False)
+
+
+class PopularArtistsQuerySerializer(serializers.Serializer):
+    """How many of the most followed artists to return"""
+    limit = serializers.IntegerField(required=False, default=20, min_value=1, max_value=100)
+
+
+class SimilarMusicQuerySerializer(serializers.Serializer):
+    """How many similar tracks to return"""
+    limit = serializers.IntegerField(required=False, default=20, min_value=1, max_value=100)
+
+
+class ShuffleQuerySerializer(serializers.Serializer):
+    """Page of a seeded shuffle; omit the seed to start a new one"""
+    seed = serializers.IntegerField(required=False, min_value=0, max_value=MAX_SEED)
+    offset = serializers.IntegerField(required=False, default=0, min_value=0)
+    limit = serializers.IntegerField(
+        required=False, default=settings.SHUFFLE_PAGE_SIZE, min_value=1, max_value=settings.SHUFFLE_MAX_PAGE_SIZE
+    )
+
+
+class SurpriseQuerySerializer(serializers.Serializer):
+    """How many random tracks to pick, with which seed, and whether popular tracks come up more often"""
+    limit = serializers.IntegerField(required=False, default=20, min_value=1, max_value=100)
+    seed = serializers.IntegerField(required=False, min_value=0, max_value=MAX_SEED)
+    weighted = serializers.BooleanField(required=False, default=False)
+
+
+class RadioStartSerializer(serializers.Serializer):
+    """Seed of a new radio station: exactly one of a track, an artist or a tag"""
+    track_id = serializers.IntegerField(required=False)
+    artist_id = serializers.IntegerField(required=False)
+    tag = serializers.CharField(required=False)
+    size = serializers.IntegerField(
+        required=False, default=settings.RADIO_DEFAULT_BATCH, min_value=1, max_value=settings.RADIO_MAX_BATCH
+    )
+
+    def validate(self, data):
+        if len([field for field in ('track_id', 'artist_id', 'tag') if field in data]) != 1:
+            raise serializers.ValidationError("Provide exactly one of 'track_id', 'artist_id' or 'tag'.")
+        return data
+
+
+class RadioBatchQuerySerializer(serializers.Serializer):
+    """How many upcoming tracks of a station to return"""
+    size = serializers.IntegerField(
+        required=False, default=settings.RADIO_DEFAULT_BATCH, min_value=1, max_value=settings.RADIO_MAX_BATCH
+    )
+
+
+class PlaylistTrackSerializer(serializers.ModelSerializer):
+    """A playlist entry with its position key and the track"""
+    music = MusicListSerializer(read_only=True)
+
+    class Meta:
+        model = PlaylistTrack
+        fields = ['position', 'added_at', 'music']
+
+
+class PlaylistChangeSerializer(serializers.ModelSerializer):
+    """One logged track operation, replayed by clients in revision order"""
+
+    class Meta:
+        model = PlaylistChange
+        fields = ['revision', 'operation', 'music_id', 'position']
+
+
+class PlaylistSyncQuerySerializer(serializers.Serializer):
+    """Revision the client last synced to; omit it to get a snapshot"""
+    since = serializers.IntegerField(required=False, min_value=0)
 
 
 class PlaylistCreateSerializer(serializers.ModelSerializer):
@@ -263,14 +371,69 @@ class PlaylistAddTrackSerializer(serializers.Serializer):
     )
 
 
+class PlaylistTrackPositionSerializer(PlaylistAddTrackSerializer):
+    """Serializer for placing a track after or before another one (default: at the end)"""
+    after_id = serializers.IntegerField(required=False)
+    before_id = serializers.IntegerField(required=False)
+
+    def validate(self, data):
+        if 'after_id' in data and 'before_id' in data:
+            raise serializers.ValidationError(
+                "Provide either 'after_id' or 'before_id', not both."
+            )
+        return data
+
+
+class PlaylistTrackOperationSerializer(serializers.Serializer):
+    """One add or move operation of a bulk playlist update"""
+    music_id = serializers.IntegerField()
+    after_id = serializers.IntegerField(required=False)
+    before_id = serializers.IntegerField(required=False)
+
+    def validate(self, data):
+        if 'after_id' in data and 'before_id' in data:
+            raise serializers.ValidationError(
+                "Provide either 'after_id' or 'before_id', not both."
+            )
+        return data
+
+
+class PlaylistBulkUpdateSerializer(serializers.Serializer):
+    """Batch of playlist operations; every referenced track is checked in one query"""
+    add = PlaylistTrackOperationSerializer(many=True, required=False)
+    remove = serializers.ListField(child=serializers.IntegerField(), required=False)
+    move = PlaylistTrackOperationSerializer(many=True, required=False)
+
+    def validate(self, data):
+        operations = data.get('add', []) + data.get('move', [])
+        count = len(operations) + len(data.get('remove', []))
+        if not count:
+            raise serializers.ValidationError("At least one operation is required.")
+        if count > settings.PLAYLIST_BULK_MAX_OPERATIONS:
+            raise serializers.ValidationError(
+                f"At most {settings.PLAYLIST_BULK_MAX_OPERATIONS} operations are allowed per request."
+            )
+
+        referenced = set(data.get('remove', []))
+        for operation in operations:
+            referenced.update(
+                operation[key] for key in ('music_id', 'after_id', 'before_id') if key in operation
+            )
+        existing = set(Music.objects.filter(id__in=referenced).values_list('id', flat=True))
+        missing = sorted(referenced - existing)
+        if missing:
+            raise serializers.ValidationError({'music_ids': [f"Music not found: {missing}"]})
+        return data
+
+
 class RecentlyPlayedSerializer(serializers.ModelSerializer):
     """Serializer for RecentlyPlayed model"""
     music = MusicListSerializer(read_only=True)
     
     class Meta:
         model = RecentlyPlayed
-        fields = ['id', 'music', 'played_at']
-        read_only_fields = ['id', 'played_at']
+        fields = ['music', 'played_at']
+        read_only_fields = ['played_at']
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
@@ -351,10 +514,31 @@ class NormalizedMusicSerializer(serializers.ModelSerializer):
         return self.get_is_favorite(obj)
 
     def get_is_favorite(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Favorite.objects.filter(user=request.user, music=obj).exists()
-        return False
+        return is_favorite(self.context.get('request'), obj.id)
+
+
+class FavoriteOperationSerializer(serializers.Serializer):
+    """One queued favorite toggle, stamped with the time the user made it"""
+    music_id = serializers.IntegerField()
+    action = serializers.ChoiceField(choices=['add', 'remove'])
+    timestamp = serializers.DateTimeField()
+
+
+class FavoriteSyncSerializer(serializers.Serializer):
+    """Batch of offline favorite operations"""
+    operations = FavoriteOperationSerializer(many=True, allow_empty=False)
+
+    def validate_operations(self, value):
+        if len(value) > settings.FAVORITES_SYNC_MAX_OPERATIONS:
+            raise serializers.ValidationError(
+                f"At most {settings.FAVORITES_SYNC_MAX_OPERATIONS} operations per sync."
+            )
+        return value
+
+
+class FavoriteChangesQuerySerializer(serializers.Serializer):
+    """Version token returned by the previous sync"""
+    since = serializers.IntegerField(min_value=0)
 
 
 class HomeSectionSerializer(serializers.Serializer):
@@ -403,105 +587,28 @@ class MusicPlaybackSerializer(serializers.ModelSerializer):
 
     def get_is_favorite(self, obj):
         """Check if current user has favorited this music."""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Favorite.objects.filter(user=request.user, music=obj).exists()
-        return False
+        return is_favorite(self.context.get('request'), obj.id)
+
+    def _neighbours(self, obj):
+        """Next/previous IDs from the play queue index, resolved once per track"""
+        if not hasattr(self, '_resolved_neighbours'):
+            self._resolved_neighbours = {}
+        if obj.pk not in self._resolved_neighbours:
+            request = self.context.get('request')
+            context = queue_context(request.query_params) if request else None
+            shuffle = shuffle_seed(request.query_params) if request else None
+            user_id = request.user.id if request and request.user.is_authenticated else None
+            self._resolved_neighbours[obj.pk] = resolve_neighbours(obj, context, shuffle, user_id)
+        return self._resolved_neighbours[obj.pk]
 
     def get_next_song_id(self, obj):
         """
         Get the ID of the next song based on the streaming context (album, playlist, artist, tag).
         """
-        request = self.context.get('request')
-        if not request:
-            return self._get_default_next(obj)
-
-        album_id = request.query_params.get('album_id')
-        playlist_id = request.query_params.get('playlist_id')
-        artist_id = request.query_params.get('artist_id')
-        tag = request.query_params.get('tag')
-
-        if album_id:
-            next_song = Music.objects.filter(album_id=album_id, id__gt=obj.id).order_by('id').first()
-            if next_song: return next_song.id
-        elif playlist_id:
-            try:
-                playlist = Playlist.objects.get(id=playlist_id)
-                tracks = list(playlist.music_tracks.order_by('id').values_list('id', flat=True))
-                if obj.id in tracks:
-                    idx = tracks.index(obj.id)
-                    if idx + 1 < len(tracks):
-                        return tracks[idx+1]
-            except Playlist.DoesNotExist:
-                pass
-        elif artist_id:
-            next_song = Music.objects.filter(artist__id=artist_id, id__gt=obj.id).order_by('id').first()
-            if next_song: return next_song.id
-        elif tag:
-            next_song = Music.objects.filter(tags__name=tag, id__gt=obj.id).order_by('id').first()
-            if next_song: return next_song.id
-
-        return self._get_default_next(obj)
-
-    def _get_default_next(self, obj):
-        """Default fallback logic for next song."""
-        if obj.album:
-            next_song = Music.objects.filter(album=obj.album, id__gt=obj.id).order_by('id').first()
-            if next_song:
-                return next_song.id
-        
-        next_global = Music.objects.filter(id__gt=obj.id).order_by('id').first()
-        if next_global:
-            return next_global.id
-            
-        first_global = Music.objects.order_by('id').first()
-        return first_global.id if first_global else None
+        return self._neighbours(obj)[0]
 
     def get_previous_song_id(self, obj):
         """
         Get the ID of the previous song based on the streaming context.
         """
-        request = self.context.get('request')
-        if not request:
-            return self._get_default_prev(obj)
-
-        album_id = request.query_params.get('album_id')
-        playlist_id = request.query_params.get('playlist_id')
-        artist_id = request.query_params.get('artist_id')
-        tag = request.query_params.get('tag')
-
-        if album_id:
-            prev_song = Music.objects.filter(album_id=album_id, id__lt=obj.id).order_by('-id').first()
-            if prev_song: return prev_song.id
-        elif playlist_id:
-            try:
-                playlist = Playlist.objects.get(id=playlist_id)
-                tracks = list(playlist.music_tracks.order_by('id').values_list('id', flat=True))
-                if obj.id in tracks:
-                    idx = tracks.index(obj.id)
-                    if idx > 0:
-                        return tracks[idx-1]
-            except Playlist.DoesNotExist:
-                pass
-        elif artist_id:
-            prev_song = Music.objects.filter(artist__id=artist_id, id__lt=obj.id).order_by('-id').first()
-            if prev_song: return prev_song.id
-        elif tag:
-            prev_song = Music.objects.filter(tags__name=tag, id__lt=obj.id).order_by('-id').first()
-            if prev_song: return prev_song.id
-
-        return self._get_default_prev(obj)
-
-    def _get_default_prev(self, obj):
-        """Default fallback logic for previous song."""
-        if obj.album:
-            prev_song = Music.objects.filter(album=obj.album, id__lt=obj.id).order_by('-id').first()
-            if prev_song:
-                return prev_song.id
-        
-        prev_global = Music.objects.filter(id__lt=obj.id).order_by('-id').first()
-        if prev_global:
-            return prev_global.id
-            
-        last_global = Music.objects.order_by('-id').first()
-        return last_global.id if last_global else None
+        return self._neighbours(obj)[1]
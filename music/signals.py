@@ -1,6 +1,19 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete, m2m_changed
 from django.dispatch import receiver
 from django.core.cache import cache
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Subquery
+from django.utils import timezone
+from .artist_summaries import mark_stale
+from .blob_models import AudioBlob
+from .favorites import bump_favorites_version
+from .images import IMAGE_DERIVATIVE_FIELDS
+from accounts.models import UserProfile
+from .models import Album, Artist, Music, Playlist, PlaylistChange, PlaylistTrack
+from .play_queue import bump_context_version, GLOBAL_CONTEXT
+from .tag_index import bump_tag_index_generation, bump_tag_index_version
+from .tasks import fan_out_release, generate_image_derivatives, update_taste_profile
 
 def clear_user_home_cache(user_id):
     """Clear home feed cache for a specific user"""
@@ -24,6 +37,20 @@ def clear_all_home_caches():
 @receiver(post_delete, sender='music.Favorite')
 def invalidate_favorite_cache(sender, instance, **kwargs):
     clear_user_home_cache(instance.user_id)
+    # Again after commit, so an array rebuilt from pre-commit rows is never read
+    bump_favorites_version(instance.user_id)
+    transaction.on_commit(lambda: bump_favorites_version(instance.user_id))
+
+@receiver(post_save, sender='music.Favorite')
+@receiver(post_delete, sender='music.Favorite')
+def learn_favorite_taste(sender, instance, created=False, **kwargs):
+    if kwargs['signal'] is post_save and not created:
+        return
+    weight = settings.TASTE_FAVORITE_WEIGHT if created else -settings.TASTE_FAVORITE_WEIGHT
+    # A removal is dated like the favorite itself, so it cancels what was learned
+    event = (instance.music_id, weight, instance.created_at.isoformat())
+    user_id = instance.user_id
+    transaction.on_commit(lambda: update_taste_profile.delay(user_id, [event]))
 
 @receiver(post_save, sender='music.RecentlyPlayed')
 @receiver(post_delete, sender='music.RecentlyPlayed')
@@ -40,3 +67,339 @@ def invalidate_recently_played_cache(sender, instance, **kwargs):
 @receiver(post_delete, sender='music.Tag')
 def invalidate_global_music_cache(sender, instance, **kwargs):
     clear_all_home_caches()
+
+@receiver(post_delete, sender='music.Music')
+def release_audio_blob(sender, instance, **kwargs):
+    """Drop the track's reference to its shared audio file"""
+    if instance.audio_blob_id:
+        AudioBlob.objects.release(instance.audio_blob_id)
+
+
+def queue_image_derivatives(sender, instance, **kwargs):
+    """Render resized versions of a new or replaced image in the background"""
+    field_name = IMAGE_DERIVATIVE_FIELDS[sender._meta.label]
+    image = getattr(instance, field_name)
+    derivatives = getattr(instance, f'{field_name}_derivatives') or {}
+    if (image.name or None) != (derivatives.get('source') or None):
+        model_label, pk = sender._meta.label, instance.pk
+        transaction.on_commit(lambda: generate_image_derivatives.delay(model_label, pk))
+
+for model_label in IMAGE_DERIVATIVE_FIELDS:
+    post_save.connect(queue_image_derivatives, sender=model_label, dispatch_uid=f'image_derivatives_{model_label}')
+
+
+# Play queue index: bump the version of every queue context a change touches
+
+@receiver(pre_save, sender='music.Music')
+def remember_previous_track_state(sender, instance, update_fields=None, **kwargs):
+    # Always reset, so a later partial save never sees a stale snapshot
+    instance._previous_state = None
+    tracked = {'album', 'duration', 'disc_number', 'track_number'}
+    if not instance._state.adding and (update_fields is None or tracked & set(update_fields)):
+        instance._previous_state = sender.objects.filter(pk=instance.pk) \
+            .values('album_id', 'duration', 'disc_number', 'track_number').first()
+
+@receiver(post_save, sender='music.Music')
+def invalidate_music_play_queues(sender, instance, created, **kwargs):
+    previous = instance.__dict__.get('_previous_state') or {}
+    previous_album_id = previous.get('album_id', instance.album_id)
+    if created:
+        bump_context_version(*GLOBAL_CONTEXT)
+        if instance.album_id:
+            bump_context_version('album', instance.album_id)
+    elif previous_album_id != instance.album_id:
+        for album_id in (previous_album_id, instance.album_id):
+            if album_id:
+                bump_context_version('album', album_id)
+    elif instance.album_id and (previous.get('disc_number', instance.disc_number), previous.get('track_number', instance.track_number)) \
+            != (instance.disc_number, instance.track_number):
+        bump_context_version('album', instance.album_id)
+
+@receiver(pre_delete, sender='music.Music')
+def remember_music_play_queues(sender, instance, **kwargs):
+    instance._playlist_ids = list(instance.playlists.values_list('id', flat=True))
+    instance._play_queue_contexts = [GLOBAL_CONTEXT] + (
+        [('album', instance.album_id)] if instance.album_id else []
+    ) + [
+        ('artist', artist_id) for artist_id in instance.artist.values_list('id', flat=True)
+    ] + [
+        ('tag', name) for name in instance.tags.values_list('name', flat=True)
+    ] + [
+        ('playlist', playlist_id) for playlist_id in instance._playlist_ids
+    ]
+
+@receiver(post_delete, sender='music.Music')
+def invalidate_deleted_music_play_queues(sender, instance, **kwargs):
+    for context in instance.__dict__.pop('_play_queue_contexts', []):
+        bump_context_version(*context)
+
+@receiver(post_save, sender='music.Album')
+@receiver(post_delete, sender='music.Album')
+@receiver(post_save, sender='music.Artist')
+@receiver(post_delete, sender='music.Artist')
+@receiver(post_save, sender='music.Playlist')
+@receiver(post_delete, sender='music.Playlist')
+def invalidate_owner_play_queue(sender, instance, created=True, **kwargs):
+    # Saves never change membership; creation matters because IDs get reused
+    if created:
+        bump_context_version(sender._meta.model_name, instance.pk)
+
+@receiver(post_save, sender='music.PlaylistTrack')
+def invalidate_playlist_order(sender, instance, **kwargs):
+    bump_context_version('playlist', instance.playlist_id)
+
+@receiver(post_save, sender='music.Tag')
+@receiver(post_delete, sender='music.Tag')
+def invalidate_tag_play_queue(sender, instance, **kwargs):
+    # Tag queues are keyed by name, which may just have changed
+    bump_context_version('tag', instance.name)
+
+# Membership relations: (queue kind, accessor on Music, field keying the queue)
+PLAY_QUEUE_RELATIONS = {
+    Music.artist.through: ('artist', 'artist', 'pk'),
+    Music.tags.through: ('tag', 'tags', 'name'),
+    Playlist.music_tracks.through: ('playlist', 'playlists', 'pk'),
+}
+
+def invalidate_membership_play_queues(sender, instance, action, model, pk_set, **kwargs):
+    kind, accessor, key_field = PLAY_QUEUE_RELATIONS[sender]
+    if kind == 'playlist' and action == 'post_add':
+        # Plain ``music_tracks.add`` leaves the position empty; append those entries
+        for playlist_id in ([instance.pk] if isinstance(instance, Playlist) else pk_set):
+            PlaylistTrack.objects.fill_positions(playlist_id)
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+    if not isinstance(instance, Music):
+        # The instance is the artist/tag/playlist owning the queue
+        if action != 'pre_clear':
+            bump_context_version(kind, getattr(instance, key_field))
+        return
+
+    stash = f'_cleared_{kind}_queues'
+    if action == 'pre_clear':
+        setattr(instance, stash, list(getattr(instance, accessor).values_list(key_field, flat=True)))
+        return
+    if action == 'post_clear':
+        keys = instance.__dict__.pop(stash, [])
+    elif key_field == 'pk':
+        keys = pk_set
+    else:
+        keys = model.objects.filter(pk__in=pk_set).values_list(key_field, flat=True)
+    for key in keys:
+        bump_context_version(kind, key)
+
+for through in PLAY_QUEUE_RELATIONS:
+    m2m_changed.connect(invalidate_membership_play_queues, sender=through, dispatch_uid=f'play_queue_{through._meta.label}')
+
+
+# Denormalized Playlist.track_count / total_duration and the playlist change log
+
+ADD, REMOVE, MOVE = PlaylistChange.Operation.values
+
+@receiver(post_save, sender='music.Music')
+def sync_playlist_durations(sender, instance, created, **kwargs):
+    previous = instance.__dict__.get('_previous_state') or {}
+    change = instance.duration - previous.get('duration', instance.duration)
+    if change:
+        playlist_ids = PlaylistTrack.objects.filter(music=instance).values_list('playlist_id', flat=True)
+        Playlist.objects.adjust_counters(list(playlist_ids), 0, change)
+
+@receiver(post_delete, sender='music.Music')
+def sync_deleted_music_playlists(sender, instance, **kwargs):
+    # The cascade removes the entries without sending m2m_changed
+    playlist_ids = instance.__dict__.pop('_playlist_ids', [])
+    Playlist.objects.adjust_counters(playlist_ids, -1, -instance.duration)
+    for playlist_id in playlist_ids:
+        Playlist.objects.record_changes(playlist_id, [(REMOVE, instance.pk, '')])
+
+@receiver(post_save, sender='music.PlaylistTrack')
+def sync_playlist_entry(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        # The track is rarely loaded here; its duration is then read inside the UPDATE
+        duration = instance.music.duration if sender.music.is_cached(instance) \
+            else Subquery(Music.objects.filter(pk=instance.music_id).values('duration'))
+        Playlist.objects.adjust_counters([instance.playlist_id], 1, duration)
+        Playlist.objects.record_changes(instance.playlist_id, [(ADD, instance.music_id, instance.position)])
+    elif update_fields is None or 'position' in update_fields:
+        Playlist.objects.record_changes(instance.playlist_id, [(MOVE, instance.music_id, instance.position)])
+
+def sync_playlist_membership(sender, instance, action, pk_set, **kwargs):
+    if isinstance(instance, Playlist):
+        if action == 'post_add':
+            # ``pk_set`` only holds the tracks that were actually added
+            added = list(sender.objects.filter(playlist=instance, music_id__in=pk_set)
+                         .order_by('position').values_list('music_id', 'position', 'music__duration'))
+            Playlist.objects.adjust_counters([instance.pk], len(added), sum(row[2] for row in added))
+            Playlist.objects.record_changes(instance.pk, [(ADD, music_id, position) for music_id, position, _ in added])
+        elif action in ('pre_remove', 'pre_clear'):
+            # ... but for removals it holds every ID passed, present or not
+            entries = sender.objects.filter(playlist=instance)
+            if action == 'pre_remove':
+                entries = entries.filter(music_id__in=pk_set)
+            instance._removed_entries = list(entries.values_list('music_id', 'music__duration'))
+        elif action in ('post_remove', 'post_clear'):
+            removed = instance.__dict__.pop('_removed_entries', [])
+            Playlist.objects.adjust_counters([instance.pk], -len(removed), -sum(row[1] for row in removed))
+            Playlist.objects.record_changes(instance.pk, [(REMOVE, music_id, '') for music_id, _ in removed])
+        return
+
+    # Reverse side: a track joins or leaves several playlists
+    if action == 'post_add':
+        Playlist.objects.adjust_counters(pk_set, 1, instance.duration)
+        for playlist_id, position in sender.objects.filter(music=instance, playlist_id__in=pk_set) \
+                .values_list('playlist_id', 'position'):
+            Playlist.objects.record_changes(playlist_id, [(ADD, instance.pk, position)])
+    elif action in ('pre_remove', 'pre_clear'):
+        entries = sender.objects.filter(music=instance)
+        if action == 'pre_remove':
+            entries = entries.filter(playlist_id__in=pk_set)
+        instance._left_playlist_ids = list(entries.values_list('playlist_id', flat=True))
+    elif action in ('post_remove', 'post_clear'):
+        playlist_ids = instance.__dict__.pop('_left_playlist_ids', [])
+        Playlist.objects.adjust_counters(playlist_ids, -1, -instance.duration)
+        for playlist_id in playlist_ids:
+            Playlist.objects.record_changes(playlist_id, [(REMOVE, instance.pk, '')])
+
+m2m_changed.connect(sync_playlist_membership, sender=Playlist.music_tracks.through, dispatch_uid='playlist_membership')
+
+
+# Tag similarity index: stamp retagged tracks so every process re-reads them
+
+def stamp_retagged_tracks(sender, instance, action, pk_set, **kwargs):
+    now = timezone.now()
+    if isinstance(instance, Music):
+        if action not in ('post_add', 'post_remove', 'post_clear'):
+            return
+        # Keep the instance in step so a later full save does not write back an older stamp
+        instance.tags_updated_at = now
+        music_ids = [instance.pk]
+    elif action == 'pre_clear':
+        instance._retagged_music_ids = list(instance.music_tracks.values_list('id', flat=True))
+        return
+    elif action == 'post_clear':
+        music_ids = instance.__dict__.pop('_retagged_music_ids', [])
+    elif action in ('post_add', 'post_remove'):
+        music_ids = pk_set
+    else:
+        return
+    Music.objects.filter(pk__in=music_ids).update(tags_updated_at=now)
+    # Again after commit, so a process syncing before the commit re-reads the rows
+    bump_tag_index_version()
+    transaction.on_commit(bump_tag_index_version)
+
+m2m_changed.connect(stamp_retagged_tracks, sender=Music.tags.through, dispatch_uid='tag_index_stamp')
+
+@receiver(post_delete, sender='music.Music')
+@receiver(post_delete, sender='music.Tag')
+def rebuild_tag_index(sender, instance, **kwargs):
+    bump_tag_index_generation()
+    transaction.on_commit(bump_tag_index_generation)
+
+
+# Denormalized Artist.followers_count and the new-release fan-out
+
+def sync_artist_followers(sender, instance, action, pk_set, **kwargs):
+    if isinstance(instance, Artist):
+        # Reverse side: several profiles follow or unfollow one artist
+        if action == 'post_add':
+            Artist.objects.adjust_followers([instance.pk], len(pk_set))
+        elif action in ('pre_remove', 'pre_clear'):
+            # For removals ``pk_set`` holds every ID passed, followed or not
+            follows = sender.objects.filter(artist=instance)
+            if action == 'pre_remove':
+                follows = follows.filter(userprofile_id__in=pk_set)
+            instance._lost_followers = follows.count()
+        elif action in ('post_remove', 'post_clear'):
+            Artist.objects.adjust_followers([instance.pk], -instance.__dict__.pop('_lost_followers', 0))
+        return
+
+    if action == 'post_add':
+        Artist.objects.adjust_followers(pk_set, 1)
+    elif action in ('pre_remove', 'pre_clear'):
+        follows = sender.objects.filter(userprofile=instance)
+        if action == 'pre_remove':
+            follows = follows.filter(artist_id__in=pk_set)
+        instance._unfollowed_artist_ids = list(follows.values_list('artist_id', flat=True))
+    elif action in ('post_remove', 'post_clear'):
+        Artist.objects.adjust_followers(instance.__dict__.pop('_unfollowed_artist_ids', []), -1)
+
+m2m_changed.connect(sync_artist_followers, sender=UserProfile.favorite_artists.through, dispatch_uid='artist_followers')
+
+@receiver(pre_delete, sender='accounts.UserProfile')
+def remember_followed_artists(sender, instance, **kwargs):
+    # The cascade removes the follows without sending m2m_changed
+    instance._followed_artist_ids = list(instance.favorite_artists.values_list('id', flat=True))
+
+@receiver(post_delete, sender='accounts.UserProfile')
+def release_followed_artists(sender, instance, **kwargs):
+    Artist.objects.adjust_followers(instance.__dict__.pop('_followed_artist_ids', []), -1)
+
+def queue_release_fan_out(sender, instance, action, pk_set, **kwargs):
+    if action != 'post_add' or not pk_set:
+        return
+    if isinstance(instance, Music):
+        releases = [(instance.pk, sorted(pk_set))]
+    else:
+        releases = [(music_id, [instance.pk]) for music_id in sorted(pk_set)]
+    for music_id, artist_ids in releases:
+        transaction.on_commit(lambda music_id=music_id, artist_ids=artist_ids: fan_out_release.delay(music_id, artist_ids))
+
+m2m_changed.connect(queue_release_fan_out, sender=Music.artist.through, dispatch_uid='release_fan_out')
+
+
+# Denormalized Album.track_count / total_duration / total_plays
+
+@receiver(post_save, sender='music.Music')
+def sync_album_counters(sender, instance, created, **kwargs):
+    if created:
+        if instance.album_id:
+            Album.objects.adjust_counters([instance.album_id], 1, instance.duration, instance.play_count)
+        return
+    previous = instance.__dict__.get('_previous_state') or {}
+    previous_album_id = previous.get('album_id', instance.album_id)
+    previous_duration = previous.get('duration', instance.duration)
+    if previous_album_id != instance.album_id:
+        if previous_album_id:
+            Album.objects.adjust_counters([previous_album_id], -1, -previous_duration, -instance.play_count)
+        if instance.album_id:
+            Album.objects.adjust_counters([instance.album_id], 1, instance.duration, instance.play_count)
+    elif instance.album_id:
+        Album.objects.adjust_counters([instance.album_id], 0, instance.duration - previous_duration, 0)
+
+@receiver(post_delete, sender='music.Music')
+def sync_deleted_music_album(sender, instance, **kwargs):
+    if instance.album_id:
+        Album.objects.adjust_counters([instance.album_id], -1, -instance.duration, -instance.play_count)
+
+
+# Artist summaries: flag the ones a catalog change touches for rebuilding
+
+@receiver(post_save, sender='music.Music')
+def mark_moved_track_summaries(sender, instance, created, update_fields=None, **kwargs):
+    # New tracks count once they get artists; play count saves wait for the history flush
+    if not created and (update_fields is None or 'album' in update_fields):
+        mark_stale(music_ids=[instance.pk])
+
+@receiver(pre_delete, sender='music.Music')
+def mark_deleted_track_summaries(sender, instance, **kwargs):
+    mark_stale(music_ids=[instance.pk])
+
+@receiver(post_save, sender='music.Album')
+@receiver(pre_delete, sender='music.Album')
+def mark_album_summaries(sender, instance, **kwargs):
+    mark_stale(album_ids=[instance.pk])
+
+def mark_credited_summaries(sender, instance, action, pk_set, **kwargs):
+    if isinstance(instance, Artist):
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            mark_stale(artist_ids=[instance.pk])
+    elif action == 'pre_clear':
+        instance._credited_artist_ids = list(instance.artist.values_list('id', flat=True))
+    elif action == 'post_clear':
+        mark_stale(artist_ids=instance.__dict__.pop('_credited_artist_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        mark_stale(artist_ids=pk_set)
+
+for through in (Music.artist.through, Album.artist.through):
+    m2m_changed.connect(mark_credited_summaries, sender=through, dispatch_uid=f'artist_summary_{through._meta.label}')
+
@@ -0,0 +1,38 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class ArtistSummary(models.Model):
+    """
+    Precomputed overview of one artist's catalog.
+
+    Maintained by ``music.artist_summaries``: flushed plays and catalog
+    changes only mark the row stale, and stale rows are rebuilt in batches,
+    so an artist page reads one row instead of aggregating every track.
+    """
+    artist = models.OneToOneField(
+        'music.Artist',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='summary',
+        verbose_name=_('artist')
+    )
+    # Most played tracks over the last ARTIST_SUMMARY_WINDOW_DAYS, best first
+    top_track_ids = models.JSONField(_('top track IDs'), default=list)
+    # [[album_id, track_count], ...], newest release first
+    albums = models.JSONField(_('albums'), default=list)
+    track_count = models.PositiveIntegerField(_('track count'), default=0)
+    total_plays = models.PositiveBigIntegerField(_('total plays'), default=0)
+    stale = models.BooleanField(_('stale'), default=False, db_index=True)
+    # Bumped by every mark; a rebuild records the count it started from, so a
+    # mark landing while it runs leaves the row stale
+    marks = models.PositiveBigIntegerField(_('marks'), default=0)
+    marks_built = models.PositiveBigIntegerField(_('marks built'), default=0)
+    refreshed_at = models.DateTimeField(_('refreshed at'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('artist summary')
+        verbose_name_plural = _('artist summaries')
+
+    def __str__(self):
+        return f"Summary of {self.artist_id}"
@@ -0,0 +1,187 @@
+"""
+In-memory tag incidence matrix used to find tracks with similar tags.
+
+Every track is a row of packed bits, bit ``c`` set when it carries the tag
+of column ``c``, and rows are sorted by track ID. Tags get consecutive
+columns as they are first seen, so the row width follows the number of tags
+in use rather than the highest tag ID ever issued. Similarity between a seed
+(tags with strengths in (0, 1], e.g. the share of seed tracks carrying each
+tag) and a track's tag set X is the IDF-weighted Jaccard index
+
+    sum(w_t * min(s_t, x_t)) / sum(w_t * max(s_t, x_t))
+
+which only needs the bit columns of the seed's tags and each track's total
+tag weight, so the whole catalog is scored in one vectorized pass.
+
+Each process holds its own copy, kept fresh through a version and a
+generation stored in the shared cache (``CACHES`` must be shared between
+processes for this to work). ``Music.tags_updated_at`` is stamped by the
+receivers in ``signals.py`` whenever a track's tags change and the version
+is bumped after commit; a process that sees a new version re-reads just the
+tracks stamped since its last sync. Deleting tracks or tags bumps the
+generation instead, which makes every process rebuild from scratch and so
+also drops the columns of deleted tags.
+"""
+
+import threading
+import time
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from .models import Music
+
+VERSION_KEY = 'tag_index_version'
+GENERATION_KEY = 'tag_index_generation'
+# Rows unpacked at a time when recomputing per-track weights
+ROW_CHUNK = 65536
+
+_lock = threading.Lock()
+_current = None
+
+
+def bump_tag_index_version():
+    """Tell every process to re-read tracks whose tags changed"""
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def bump_tag_index_generation():
+    """Tell every process to rebuild its index, after deletions"""
+    cache.set(GENERATION_KEY, time.time_ns(), None)
+
+
+def _set_bits(bits, rows, columns):
+    np.bitwise_or.at(bits, (rows, columns >> 3), (0x80 >> (columns & 7)).astype(np.uint8))
+
+
+def _tag_pairs(music_ids=None):
+    """(music IDs, tag IDs) of the incidence rows, optionally for some tracks only"""
+    rows = Music.tags.through.objects.all()
+    if music_ids is not None:
+        rows = rows.filter(music_id__in=music_ids)
+    pairs = np.array(list(rows.values_list('music_id', 'tag_id')), dtype=np.int64).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+class TagIndex:
+    """Immutable snapshot of the incidence matrix; syncing returns a new one"""
+
+    def __init__(self, track_ids, tag_ids, bits, generation, version, synced_at):
+        self.track_ids = track_ids
+        # Tag ID of each bit column, and the reverse mapping
+        self.tag_ids = tag_ids
+        self.columns = {int(tag_id): column for column, tag_id in enumerate(tag_ids)}
+        self.bits = bits
+        self.generation = generation
+        self.version = version
+        self.synced_at = synced_at
+
+        # Tag frequencies and the IDF weights derived from them, per column
+        counts = np.zeros(bits.shape[1] * 8, dtype=np.int64)
+        for start in range(0, len(bits), ROW_CHUNK):
+            counts += np.unpackbits(bits[start:start + ROW_CHUNK], axis=1).sum(axis=0, dtype=np.int64)
+        self.tag_weights = np.where(counts > 0, np.log1p(len(track_ids) / np.maximum(counts, 1)), 0.0)
+        self.track_weights = np.concatenate([
+            np.unpackbits(bits[start:start + ROW_CHUNK], axis=1) @ self.tag_weights
+            for start in range(0, len(bits), ROW_CHUNK)
+        ] or [np.empty(0)])
+
+    @classmethod
+    def build(cls, generation, version):
+        synced_at = timezone.now()
+        music_ids, tag_ids = _tag_pairs()
+        # Untagged tracks can never match, so only tagged ones get a row
+        track_ids = np.unique(music_ids)
+        column_tag_ids, columns = np.unique(tag_ids, return_inverse=True)
+        bits = np.zeros((len(track_ids), max(len(column_tag_ids) + 7, 8) // 8), dtype=np.uint8)
+        _set_bits(bits, np.searchsorted(track_ids, music_ids), columns.reshape(-1))
+        return cls(track_ids, column_tag_ids, bits, generation, version, synced_at)
+
+    def synced(self, version):
+        """A copy with the tracks whose tags changed since the last sync re-read"""
+        synced_at = timezone.now()
+        since = self.synced_at - timedelta(seconds=settings.TAG_INDEX_SYNC_SLACK)
+        changed = np.array(sorted(
+            Music.objects.filter(tags_updated_at__gt=since).values_list('id', flat=True)
+        ), dtype=np.int64)
+        music_ids, tag_ids = _tag_pairs(changed.tolist())
+
+        # np.insert copies, so readers of this snapshot are never disturbed
+        new = np.setdiff1d(changed, self.track_ids)
+        insert_at = np.searchsorted(self.track_ids, new)
+        track_ids = np.insert(self.track_ids, insert_at, new)
+        bits = np.insert(self.bits, insert_at, 0, axis=0)
+        # Tags seen for the first time get the next free columns
+        column_tag_ids = np.concatenate([self.tag_ids, np.setdiff1d(tag_ids, self.tag_ids)])
+        if len(column_tag_ids) > bits.shape[1] * 8:
+            bits = np.pad(bits, ((0, 0), (0, (len(column_tag_ids) + 7) // 8 - bits.shape[1])))
+        columns = {int(tag_id): column for column, tag_id in enumerate(column_tag_ids)}
+
+        bits[np.searchsorted(track_ids, changed)] = 0
+        _set_bits(bits, np.searchsorted(track_ids, music_ids),
+                  np.array([columns[tag_id] for tag_id in tag_ids.tolist()], dtype=np.int64))
+        return TagIndex(track_ids, column_tag_ids, bits, self.generation, version, synced_at)
+
+    def tag_profile(self, music_ids):
+        """{tag_id: share of the given tracks carrying it}"""
+        music_ids = np.asarray(music_ids, dtype=np.int64)
+        positions = np.searchsorted(self.track_ids, music_ids[np.isin(music_ids, self.track_ids)])
+        if not len(positions):
+            return {}
+        shares = np.unpackbits(self.bits[positions], axis=1).mean(axis=0)
+        return {int(self.tag_ids[column]): float(shares[column]) for column in np.flatnonzero(shares)}
+
+    def similar(self, profile, limit, exclude_ids=()):
+        """
+        IDs of the ``limit`` tracks most similar to a tag profile, best first.
+
+        Only tracks sharing at least one tag count; ties go to newer tracks.
+        """
+        tags = [(self.columns[tag_id], share) for tag_id, share in profile.items() if tag_id in self.columns]
+        if not tags or not len(self.track_ids):
+            return []
+        shared = np.zeros(len(self.track_ids))
+        seed_weight = 0.0
+        for column, share in tags:
+            weight = self.tag_weights[column] * share
+            carried = (self.bits[:, column >> 3] >> (7 - (column & 7))) & 1
+            shared += weight * carried
+            seed_weight += weight
+        union = self.track_weights + seed_weight - shared
+        scores = np.divide(shared, union, out=np.zeros_like(shared), where=union > 0)
+
+        excluded = np.asarray(list(exclude_ids), dtype=np.int64)
+        scores[np.isin(self.track_ids, excluded)] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            # Keep everything tied with the limit-th score so the cut is exact
+            threshold = np.partition(scores[candidates], len(candidates) - limit)[len(candidates) - limit]
+            candidates = candidates[scores[candidates] >= threshold]
+        order = np.lexsort((-self.track_ids[candidates], -scores[candidates]))[:limit]
+        return self.track_ids[candidates[order]].tolist()
+
+
+def tag_index():
+    """This process's index, synced with the shared version first"""
+    global _current
+    versions = cache.get_many([GENERATION_KEY, VERSION_KEY])
+    if GENERATION_KEY not in versions:
+        bump_tag_index_generation()
+        versions = cache.get_many([GENERATION_KEY, VERSION_KEY])
+    generation, version = versions.get(GENERATION_KEY), versions.get(VERSION_KEY)
+
+    with _lock:
+        index = _current
+        if index is None or index.generation != generation:
+            index = TagIndex.build(generation, version)
+        elif index.version != version:
+            index = index.synced(version)
+        _current = index
+    return index
+
+
+def similar_by_tags(music_ids, limit, exclude_ids=()):
+    """Tracks whose tags best match those of the given tracks, which are left out"""
+    index = tag_index()
+    return index.similar(index.tag_profile(music_ids), limit, set(exclude_ids) | set(music_ids))
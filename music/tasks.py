@@ -0,0 +1,93 @@
+from celery import shared_task
+from django.contrib.auth import get_user_model
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .artist_summaries import refresh_stale_summaries
+from .fingerprint import fingerprint_track
+from .images import update_image_derivatives
+from .listening_history import flush_history, flush_pending_histories
+from .models import Music, Playlist, ReleaseNotice
+from .previews import generate_blob_preview
+from .recommender import build_neighbours
+from .taste import record_taste_events
+
+
+@shared_task
+def fingerprint_music(music_id):
+    """Compute the acoustic fingerprint of a track and flag likely duplicates"""
+    music = Music.objects.filter(pk=music_id).first()
+    if music is None:
+        return 0
+    return len(fingerprint_track(music))
+
+
+@shared_task
+def generate_image_derivatives(model_label, pk):
+    """Render the resized WebP/JPEG versions of an uploaded image"""
+    return update_image_derivatives(model_label, pk) is not None
+
+
+@shared_task
+def generate_music_preview(music_id):
+    """Cut the preview clip for a track's audio file"""
+    music = Music.objects.select_related('audio_blob').filter(pk=music_id).first()
+    if music is None or music.audio_blob is None:
+        return None
+    return generate_blob_preview(music.audio_blob)
+
+
+@shared_task
+def refresh_playlist_popularity():
+    """Re-rank public playlists; scheduled by Celery beat"""
+    return Playlist.objects.refresh_popularity()
+
+
+@shared_task
+def flush_listening_history(user_id):
+    """Write a user's pending plays to RecentlyPlayed"""
+    return flush_history(user_id)
+
+
+@shared_task
+def flush_pending_listening_history():
+    """Write the pending plays that have waited too long; scheduled by Celery beat"""
+    return flush_pending_histories()
+
+
+@shared_task
+def build_recommendations():
+    """Rebuild the item-item neighbour lists; scheduled by Celery beat"""
+    return build_neighbours()
+
+
+@shared_task
+def update_taste_profile(user_id, events):
+    """
+    Fold ``[(music_id, weight, ISO 8601 moment)]`` favorite events into a taste profile.
+
+    Added favorites have a positive weight, removed ones a negative weight
+    dated at the favorite's ``created_at`` so they unlearn exactly what was
+    learned, however long ago that was.
+    """
+    # Deleting a user cascades to their favorites, which queues this one last time
+    if not get_user_model().objects.filter(pk=user_id).exists():
+        return False
+    record_taste_events(user_id, [(music_id, weight, parse_datetime(moment)) for music_id, weight, moment in events])
+    return True
+
+
+@shared_task
+def fan_out_release(music_id, artist_ids):
+    """Tell the followers of a track's artists about it, if the track is new"""
+    cutoff = timezone.now() - timedelta(days=settings.RELEASE_NOTICE_MAX_AGE_DAYS)
+    if not Music.objects.filter(pk=music_id, created_at__gte=cutoff).exists():
+        return 0
+    return ReleaseNotice.objects.fan_out(music_id, artist_ids)
+
+
+@shared_task
+def refresh_artist_summaries():
+    """Rebuild the artist summaries marked stale; scheduled by Celery beat"""
+    return refresh_stale_summaries()
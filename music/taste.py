@@ -0,0 +1,122 @@
+"""
+Per-user taste profiles: decayed affinities for tags, artists and languages.
+
+Every track has one unit of weight in each family, spread evenly over its
+tags and over its artists, so a heavily tagged track does not outweigh a
+sparsely tagged one. Each event (a flushed play, a favorite added or
+removed) first decays the stored weights to the present, halving them every
+TASTE_HALF_LIFE_DAYS, then adds the event's features; only the
+TASTE_MAX_FEATURES strongest features are kept.
+
+Candidates are ranked by the dot product of their features with the
+unit-length taste vector, which needs the candidates' features and one
+profile row but never the user's history.
+"""
+
+from collections import Counter
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import Music, TasteProfile
+
+# Feature keys carry their family in the high bits: kind << KIND_SHIFT | id
+TAG, ARTIST, LANGUAGE = 1, 2, 3
+KIND_SHIFT = 48
+LANGUAGES = Music.Language.values
+
+
+def _decay(seconds):
+    return 0.5 ** (max(seconds, 0) / (settings.TASTE_HALF_LIFE_DAYS * 86400))
+
+
+def _unpack(blob):
+    """(sorted feature keys, weights) of a stored vector"""
+    blob = bytes(blob or b'')
+    size = len(blob) // 12
+    return np.frombuffer(blob[:size * 8], dtype=np.int64), np.frombuffer(blob[size * 8:], dtype=np.float32).astype(float)
+
+
+def _pack(keys, weights):
+    return keys.astype(np.int64).tobytes() + weights.astype(np.float32).tobytes()
+
+
+def track_features(music_ids):
+    """(row, feature key, weight) arrays for the tracks, rows indexing ``music_ids``"""
+    row_of = {music_id: row for row, music_id in enumerate(music_ids)}
+    languages = Music.objects.filter(pk__in=music_ids).values_list('id', 'language')
+    families = (
+        (TAG, Music.tags.through.objects.filter(music_id__in=music_ids).values_list('music_id', 'tag_id')),
+        (ARTIST, Music.artist.through.objects.filter(music_id__in=music_ids).values_list('music_id', 'artist_id')),
+        (LANGUAGE, [(music_id, LANGUAGES.index(language)) for music_id, language in languages
+                    if language in LANGUAGES]),
+    )
+    rows, keys, weights = [], [], []
+    for kind, pairs in families:
+        pairs = list(pairs)
+        counts = Counter(music_id for music_id, _value in pairs)
+        for music_id, value in pairs:
+            rows.append(row_of[music_id])
+            keys.append(kind << KIND_SHIFT | value)
+            weights.append(1 / counts[music_id])
+    return np.array(rows, dtype=np.int64), np.array(keys, dtype=np.int64), np.array(weights, dtype=float)
+
+
+def record_taste_events(user_id, events):
+    """
+    Fold ``[(music_id, weight, moment)]`` events into the user's profile.
+
+    Negative weights unlearn, e.g. for a removed favorite. Features of tracks
+    that no longer exist are simply missing.
+    """
+    if not events:
+        return
+    now = timezone.now()
+    music_ids = list({music_id for music_id, _weight, _moment in events})
+    row_of = {music_id: row for row, music_id in enumerate(music_ids)}
+    event_weights = np.zeros(len(music_ids))
+    for music_id, weight, moment in events:
+        event_weights[row_of[music_id]] += weight * _decay((now - moment).total_seconds())
+    rows, keys, weights = track_features(music_ids)
+
+    with transaction.atomic():
+        profile, _created = TasteProfile.objects.select_for_update().get_or_create(user_id=user_id)
+        stored_keys, stored_weights = _unpack(profile.vector)
+        stored_weights = stored_weights * _decay((now - profile.decayed_at).total_seconds())
+
+        keys, inverse = np.unique(np.r_[stored_keys, keys], return_inverse=True)
+        weights = np.bincount(inverse, weights=np.r_[stored_weights, weights * event_weights[rows]])
+        keep = weights >= settings.TASTE_MIN_WEIGHT
+        keys, weights = keys[keep], weights[keep]
+        if len(keys) > settings.TASTE_MAX_FEATURES:
+            strongest = np.sort(np.argsort(-weights, kind='stable')[:settings.TASTE_MAX_FEATURES])
+            keys, weights = keys[strongest], weights[strongest]
+
+        profile.vector = _pack(keys, weights)
+        profile.decayed_at = max(now, profile.decayed_at)
+        profile.save()
+
+
+def taste_vector(user_id):
+    """(sorted feature keys, weights scaled to unit length); empty for users without a profile"""
+    keys, weights = _unpack(TasteProfile.objects.filter(user_id=user_id).values_list('vector', flat=True).first())
+    norm = np.linalg.norm(weights)
+    return keys, (weights / norm if norm else weights)
+
+
+def taste_scores(user_id, music_ids):
+    """The user's affinity for each track, in the order given"""
+    scores = np.zeros(len(music_ids))
+    keys, weights = taste_vector(user_id)
+    if not len(keys) or not len(music_ids):
+        return scores
+    rows, feature_keys, feature_weights = track_features(list(music_ids))
+    at = np.minimum(np.searchsorted(keys, feature_keys), len(keys) - 1)
+    matched = keys[at] == feature_keys
+    return np.bincount(rows[matched], weights=feature_weights[matched] * weights[at[matched]], minlength=len(music_ids))
+
+
+def rank_by_taste(user_id, music_ids):
+    """The tracks the user has any affinity for, strongest first; ties keep the given order"""
+    scores = taste_scores(user_id, music_ids)
+    return [music_ids[row] for row in np.argsort(-scores, kind='stable') if scores[row] > 0]
@@ -0,0 +1,93 @@
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from music.models import Album, Music
+from music.play_queue import queue_context, resolve_neighbours
+
+
+class AlbumCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.album = Album.objects.create(title='Counted')
+        self.other = Album.objects.create(title='Other')
+
+    def assertCounters(self, album, tracks, duration, plays):
+        album.refresh_from_db()
+        self.assertEqual((album.track_count, album.total_duration, album.total_plays), (tracks, duration, plays))
+
+    def test_counters_follow_track_changes(self):
+        first = Music.objects.create(title='One', album=self.album, duration=100)
+        second = Music.objects.create(title='Two', album=self.album, duration=50)
+        self.assertCounters(self.album, 2, 150, 0)
+
+        first.increment_play_count()
+        first.increment_play_count()
+        self.assertCounters(self.album, 2, 150, 2)
+
+        first.duration = 120
+        first.save(update_fields=['duration'])
+        self.assertCounters(self.album, 2, 170, 2)
+
+        first.album = self.other
+        first.save()
+        self.assertCounters(self.album, 1, 50, 0)
+        self.assertCounters(self.other, 1, 120, 2)
+
+        second.delete()
+        self.assertCounters(self.album, 0, 0, 0)
+
+    def test_reconcile_repairs_drift(self):
+        Music.objects.create(title='One', album=self.album, duration=30, play_count=4)
+        Album.objects.filter(pk=self.album.pk).update(track_count=9, total_duration=0, total_plays=1)
+        out = StringIO()
+        call_command('reconcile_album_counters', stdout=out)
+        self.assertIn('1 album(s) corrected', out.getvalue())
+        self.assertCounters(self.album, 1, 30, 4)
+
+
+class AlbumTrackOrderTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='listener@example.com', password='password123')
+        self.client.force_authenticate(user=self.user)
+        self.album = Album.objects.create(title='Double Album')
+        # Uploaded out of order; the unnumbered bonus track plays last on its disc
+        self.bonus = Music.objects.create(title='Bonus', album=self.album, disc_number=1)
+        self.second = Music.objects.create(title='Side B', album=self.album, disc_number=2, track_number=1)
+        self.opener = Music.objects.create(title='Opener', album=self.album, disc_number=1, track_number=1)
+        self.closer = Music.objects.create(title='Closer', album=self.album, disc_number=1, track_number=2)
+        self.order = [self.opener.id, self.closer.id, self.bonus.id, self.second.id]
+
+    def test_tracks_endpoint_is_ordered_and_paginated(self):
+        url = reverse('album-tracks', kwargs={'pk': self.album.id})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data['data']
+        self.assertEqual(data['count'], 4)
+        self.assertEqual([track['id'] for track in data['results']], self.order)
+        self.assertEqual(data['results'][0]['track_number'], 1)
+
+        response = self.client.get(reverse('album-detail', kwargs={'pk': self.album.id}))
+        self.assertEqual(response.data['track_count'], 4)
+
+    def test_neighbours_follow_track_numbers(self):
+        context = queue_context({'album_id': str(self.album.id)})
+        self.assertEqual(resolve_neighbours(self.closer, context), (self.bonus.id, self.opener.id))
+        # Without an explicit context the track's own album is used the same way
+        self.assertEqual(resolve_neighbours(self.bonus), (self.second.id, self.closer.id))
+
+        # Renumbering reorders the cached queue
+        self.bonus.track_number = 3
+        self.bonus.save()
+        self.second.disc_number, self.second.track_number = 1, 4
+        self.second.save()
+        self.assertEqual(resolve_neighbours(self.second, context)[1], self.bonus.id)
+        self.opener.track_number = 5
+        self.opener.save(update_fields=['track_number'])
+        self.assertEqual(resolve_neighbours(self.opener, context)[1], self.second.id)
+        self.assertEqual(resolve_neighbours(self.closer, context)[0], self.bonus.id)
@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from music.ann import build_index, current_index, measure_recall
+from music.models import Music, Tag
+
+
+class AnnIndexTests(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        override = override_settings(ANN_INDEX_DIR=self.directory, ANN_LISTS=4, ANN_PROBES=2)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = User.objects.create_user(email='similar@example.com', password='password123')
+        self.client.force_authenticate(user=self.user)
+        self.groups = []
+        for group in range(4):
+            tags = [Tag.objects.create(name=f'group{group}-{i}') for i in range(3)]
+            tracks = []
+            for number in range(30):
+                track = Music.objects.create(title=f'Track {group}.{number}')
+                track.tags.set(tags[:1 + number % 3])
+                tracks.append(track)
+            self.groups.append(tracks)
+
+    def test_similar_endpoint_stays_within_the_tag_group(self):
+        url = reverse('music-similar', kwargs={'pk': self.groups[1][0].id})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data'], [])
+
+        build_index()
+        response = self.client.get(url, {'limit': 10})
+        ids = [track['id'] for track in response.data['data']]
+        self.assertEqual(len(ids), 10)
+        self.assertNotIn(self.groups[1][0].id, ids)
+        self.assertTrue(set(ids) <= {track.id for track in self.groups[1]})
+
+        response = self.client.get(url, {'limit': 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_repoints_workers_and_prunes_old_builds(self):
+        build_index()
+        first = current_index()
+        self.assertIs(current_index(), first)
+
+        new = Music.objects.create(title='New')
+        new.tags.set(self.groups[2][0].tags.all())
+        build_index()
+        build_index()
+        rebuilt = current_index()
+        self.assertIsNot(rebuilt, first)
+        self.assertIsNotNone(rebuilt.vector_of(new.id))
+        self.assertEqual(len([name for name in os.listdir(self.directory) if name.startswith('build-')]), 2)
+
+    def test_recall_against_brute_force(self):
+        build_index()
+        index = current_index()
+        recall, _ann, _exact = measure_recall(index, 40, 10, probes=4)
+        self.assertEqual(recall, 1.0)
+        recall, _ann, _exact = measure_recall(index, 40, 10)
+        self.assertGreaterEqual(recall, 0.9)
+
+        out = StringIO()
+        call_command('build_ann_index', '--benchmark', '20', stdout=out)
+        self.assertIn('recall@10', out.getvalue())
@@ -0,0 +1,91 @@
+from io import StringIO
+from datetime import timedelta
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User, UserProfile
+from music.models import Artist, Music, ReleaseNotice
+from music.tasks import fan_out_release
+
+
+class ArtistFollowerTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.artists = [Artist.objects.create(name=name) for name in ('Alpha', 'Beta', 'Gamma')]
+        self.profiles = []
+        for number in range(4):
+            user = User.objects.create_user(email=f'fan{number}@example.com', password='password123')
+            self.profiles.append(UserProfile.objects.get_or_create(user=user)[0])
+
+    def _counts(self):
+        return list(Artist.objects.order_by('name').values_list('followers_count', flat=True))
+
+    def test_counts_follow_both_sides_of_the_relation(self):
+        alpha, beta, gamma = self.artists
+        self.profiles[0].favorite_artists.add(alpha, beta)
+        self.profiles[0].favorite_artists.add(alpha)
+        beta.favorited_by.add(*self.profiles[1:])
+        self.assertEqual(self._counts(), [1, 4, 0])
+
+        # Removing artists that were never followed changes nothing
+        self.profiles[0].favorite_artists.remove(alpha, gamma)
+        beta.favorited_by.remove(self.profiles[1])
+        self.assertEqual(self._counts(), [0, 3, 0])
+
+        self.profiles[2].favorite_artists.clear()
+        beta.favorited_by.clear()
+        self.assertEqual(self._counts(), [0, 0, 0])
+
+        self.profiles[3].favorite_artists.set([alpha, gamma])
+        self.profiles[3].user.delete()
+        self.assertEqual(self._counts(), [0, 0, 0])
+
+    def test_popular_artists_and_reconciliation(self):
+        alpha, beta, gamma = self.artists
+        for profile in self.profiles[:3]:
+            profile.favorite_artists.add(gamma)
+        self.profiles[0].favorite_artists.add(alpha)
+
+        response = self.client.get(reverse('artist-popular'), {'limit': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(a['name'], a['followers_count']) for a in response.data['data']],
+                         [('Gamma', 3), ('Alpha', 1)])
+
+        Artist.objects.filter(pk=beta.pk).update(followers_count=9)
+        out = StringIO()
+        call_command('reconcile_artist_followers', stdout=out)
+        self.assertIn('1 artist(s) corrected', out.getvalue())
+        self.assertEqual(self._counts(), [1, 0, 3])
+
+    @override_settings(RELEASE_FANOUT_CHUNK_SIZE=2)
+    def test_new_tracks_are_fanned_out_in_chunks(self):
+        alpha, beta, gamma = self.artists
+        for profile in self.profiles:
+            profile.favorite_artists.add(alpha)
+        self.profiles[0].favorite_artists.add(beta)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            track = Music.objects.create(title='Single')
+            track.artist.add(alpha, beta)
+        self.assertEqual(ReleaseNotice.objects.filter(music=track).count(), 4)
+
+        # One query per chunk of follows and one insert per chunk
+        with self.assertNumQueries(1 + 3 * 2):
+            self.assertEqual(fan_out_release(track.id, [alpha.id, beta.id]), 5)
+        self.assertEqual(ReleaseNotice.objects.filter(music=track).count(), 4)
+
+        old = Music.objects.create(title='Old')
+        Music.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=30))
+        with self.captureOnCommitCallbacks(execute=True):
+            gamma.music_tracks.add(old)
+            alpha.music_tracks.add(old)
+        self.assertFalse(ReleaseNotice.objects.filter(music=old).exists())
+
+        self.client.force_authenticate(user=self.profiles[0].user)
+        response = self.client.get(reverse('artist-releases'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([t['id'] for t in response.data['data']], [track.id])
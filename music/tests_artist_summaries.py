@@ -0,0 +1,105 @@
+from datetime import date, timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from music.artist_summaries import artist_summary, mark_stale, refresh_stale_summaries
+from music.listening_history import record_play
+from music.models import Album, Artist, ArtistSummary, Music, RecentlyPlayed
+from music.tasks import flush_listening_history
+
+
+@override_settings(ARTIST_SUMMARY_TOP_TRACKS=2)
+class ArtistSummaryTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.artist = Artist.objects.create(name='Band')
+        self.old_album = Album.objects.create(title='Debut', release_date=date(2020, 1, 1))
+        self.new_album = Album.objects.create(title='Second', release_date=date(2024, 1, 1))
+        for album in (self.old_album, self.new_album):
+            album.artist.add(self.artist)
+        self.tracks = []
+        for number, album in enumerate([self.old_album, self.old_album, self.new_album, None]):
+            track = Music.objects.create(title=f'Track {number}', album=album, play_count=10 * number)
+            track.artist.add(self.artist)
+            self.tracks.append(track)
+        self.ids = [track.id for track in self.tracks]
+        self.listeners = [User.objects.create_user(email=f'fan{n}@example.com', password='password123') for n in range(3)]
+
+    def _summary(self):
+        return ArtistSummary.objects.get(artist=self.artist)
+
+    def test_summary_ranks_recent_plays_before_lifetime_plays(self):
+        for listener in self.listeners[:2]:
+            RecentlyPlayed.objects.create(user=listener, music=self.tracks[0])
+        RecentlyPlayed.objects.create(
+            user=self.listeners[2], music=self.tracks[1], played_at=timezone.now() - timedelta(days=90)
+        )
+
+        summary = artist_summary(self.artist.id)
+        self.assertEqual(summary.top_track_ids, [self.ids[0], self.ids[3]])
+        self.assertEqual(summary.albums, [[self.new_album.id, 1], [self.old_album.id, 2]])
+        self.assertEqual((summary.track_count, summary.total_plays), (4, 60))
+
+        response = self.client.get(reverse('artist-summary', kwargs={'pk': self.artist.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data['data']
+        self.assertEqual([track['id'] for track in data['top_tracks']], [self.ids[0], self.ids[3]])
+        self.assertEqual([(a['title'], a['track_count']) for a in data['albums']], [('Second', 1), ('Debut', 2)])
+
+        response = self.client.get(reverse('artist-albums', kwargs={'pk': self.artist.id}))
+        self.assertEqual([a['id'] for a in response.data['data']], [self.new_album.id, self.old_album.id])
+
+    @override_settings(LISTENING_HISTORY_FLUSH_SIZE=1)
+    def test_flushed_plays_and_catalog_changes_mark_it_stale(self):
+        artist_summary(self.artist.id)
+        record_play(self.listeners[0].id, self.ids[1])
+        flush_listening_history(self.listeners[0].id)
+        self.assertTrue(self._summary().stale)
+        self.assertEqual(refresh_stale_summaries(), 1)
+        summary = self._summary()
+        self.assertFalse(summary.stale)
+        self.assertEqual(summary.top_track_ids, [self.ids[1], self.ids[3]])
+
+        self.tracks[2].album = self.old_album
+        self.tracks[2].save()
+        self.assertTrue(self._summary().stale)
+        refresh_stale_summaries()
+        self.assertEqual(self._summary().albums, [[self.new_album.id, 0], [self.old_album.id, 3]])
+
+        self.tracks[3].delete()
+        self.new_album.artist.clear()
+        refresh_stale_summaries()
+        summary = self._summary()
+        self.assertEqual((summary.track_count, summary.albums), (3, [[self.old_album.id, 3]]))
+
+        # Other artists' summaries are left alone
+        other = Artist.objects.create(name='Other')
+        artist_summary(other.id)
+        self.tracks[0].save(update_fields=['play_count'])
+        self.assertFalse(ArtistSummary.objects.filter(stale=True).exists())
+
+    def test_a_mark_made_during_a_rebuild_is_kept(self):
+        artist_summary(self.artist.id)
+        mark_stale(artist_ids=[self.artist.id])
+        upsert = ArtistSummary.objects.bulk_create
+
+        def marked_meanwhile(*args, **kwargs):
+            mark_stale(music_ids=[self.ids[0]])
+            return upsert(*args, **kwargs)
+
+        with mock.patch.object(ArtistSummary.objects, 'bulk_create', marked_meanwhile):
+            refresh_stale_summaries()
+        self.assertTrue(self._summary().stale)
+        self.assertEqual(refresh_stale_summaries(), 1)
+        self.assertFalse(self._summary().stale)
+
+    def test_artist_music_is_paginated_by_popularity(self):
+        response = self.client.get(reverse('artist-music', kwargs={'pk': self.artist.id}), {'page_size': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['count'], 4)
+        self.assertEqual([t['id'] for t in response.data['data']['results']], self.ids[:0:-1])
@@ -1,7 +1,12 @@
+from types import SimpleNamespace
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.urls import reverse
+from django.core.cache import cache
+from django.test import override_settings
 from accounts.models import User
+from music.checks import check_shared_cache
+from music.favorites import bump_favorites_version, favorite_ids, is_favorite
 from music.models import Music, Artist, Favorite
 
 class FavoriteToggleTests(APITestCase):
@@ -55,3 +60,88 @@ class FavoriteToggleTests(APITestCase):
         response = self.client.post(self.url)
         
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class FavoriteWriteTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='writes@example.com', password='password123')
+        self.client.force_authenticate(user=self.user)
+        self.music = Music.objects.create(title='Test Song')
+
+    def test_add_and_remove_report_their_outcome(self):
+        with self.assertNumQueries(1):
+            favorite = Favorite.objects.add(self.user, self.music)
+        self.assertEqual((favorite.user_id, favorite.music_id), (self.user.id, self.music.id))
+        # A parallel request losing the race hits the unique constraint, not a duplicate row
+        with self.assertNumQueries(1):
+            self.assertIsNone(Favorite.objects.add(self.user, self.music))
+        self.assertEqual(Favorite.objects.count(), 1)
+
+        # The delete, then the tombstone for offline syncs
+        with self.assertNumQueries(2):
+            self.assertTrue(Favorite.objects.remove(self.user, self.music.id))
+        with self.assertNumQueries(1):
+            self.assertFalse(Favorite.objects.remove(self.user, self.music.id))
+
+    def test_favorites_endpoints(self):
+        url = reverse('favorite-list')
+        response = self.client.post(url, {'music_id': self.music.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['data']['music']['id'], self.music.id)
+
+        response = self.client.post(url, {'music_id': self.music.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        remove_url = reverse('favorite-remove')
+        response = self.client.delete(remove_url, {'music_id': self.music.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.delete(remove_url, {'music_id': self.music.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_toggle_flips_the_favorite(self):
+        url = reverse('music-favorite', kwargs={'pk': self.music.id})
+        self.client.post(url)
+        self.assertTrue(Favorite.objects.filter(user=self.user, music=self.music).exists())
+        self.client.post(url)
+        self.assertFalse(Favorite.objects.exists())
+
+
+class FavoriteMembershipTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='member@example.com', password='password123')
+        self.client.force_authenticate(user=self.user)
+        self.tracks = [Music.objects.create(title=f'Song {i}') for i in range(3)]
+
+    def test_array_follows_favorite_changes(self):
+        Favorite.objects.create(user=self.user, music=self.tracks[2])
+        Favorite.objects.create(user=self.user, music=self.tracks[0])
+        self.assertEqual(list(favorite_ids(self.user.id)), [self.tracks[0].id, self.tracks[2].id])
+
+        Favorite.objects.remove(self.user, self.tracks[0].id)
+        self.assertEqual(list(favorite_ids(self.user.id)), [self.tracks[2].id])
+
+        # Cascades send post_delete too
+        self.tracks[2].delete()
+        self.assertEqual(list(favorite_ids(self.user.id)), [])
+
+    def test_warm_checks_do_not_query(self):
+        Favorite.objects.bulk_create([Favorite(user=self.user, music=track) for track in self.tracks[:2]])
+        bump_favorites_version(self.user.id)
+        favorite_ids(self.user.id)
+
+        request = SimpleNamespace(user=self.user)
+        with self.assertNumQueries(0):
+            checks = [is_favorite(request, track.id) for track in self.tracks]
+        self.assertEqual(checks, [True, True, False])
+
+    def test_toggle_is_visible_to_the_next_request(self):
+        url = reverse('music-detail', kwargs={'pk': self.tracks[0].id})
+        self.assertFalse(self.client.get(url).data['is_favorite'])
+        self.client.post(reverse('music-favorite', kwargs={'pk': self.tracks[0].id}))
+        self.assertTrue(self.client.get(url).data['is_favorite'])
+
+    def test_deploy_check_flags_a_process_local_cache(self):
+        self.assertEqual([message.id for message in check_shared_cache(None)], ['music.W001'])
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}):
+            self.assertEqual(check_shared_cache(None), [])
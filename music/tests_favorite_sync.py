@@ -0,0 +1,87 @@
+from datetime import timedelta
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from music.models import Favorite, FavoriteRemoval, Music
+
+
+class FavoriteSyncTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='offline@example.com', password='password123')
+        self.client.force_authenticate(user=self.user)
+        self.tracks = [Music.objects.create(title=f'Song {i}') for i in range(4)]
+        self.ids = [track.id for track in self.tracks]
+        self.url = reverse('favorite-sync')
+
+    def _op(self, index, action, minutes_ago):
+        return {
+            'music_id': self.ids[index], 'action': action,
+            'timestamp': (timezone.now() - timedelta(minutes=minutes_ago)).isoformat(),
+        }
+
+    def _sync(self, *operations):
+        response = self.client.post(self.url, {'operations': list(operations)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['data']
+
+    def test_latest_operation_per_track_wins(self):
+        data = self._sync(
+            self._op(0, 'add', 30), self._op(0, 'remove', 20),
+            self._op(1, 'remove', 30), self._op(1, 'add', 20),
+            self._op(2, 'add', 10),
+        )
+        self.assertEqual(data['favorite_ids'], [self.ids[1], self.ids[2]])
+        self.assertEqual(data['added'], [self.ids[1], self.ids[2]])
+        # The favorite keeps the time the user made it
+        favorite = Favorite.objects.get(music_id=self.ids[2])
+        self.assertLess(favorite.created_at, timezone.now() - timedelta(minutes=9))
+
+    def test_older_offline_operations_lose_to_newer_server_state(self):
+        # Removed online a minute ago; an add queued ten minutes ago must not revive it
+        Favorite.objects.create(user=self.user, music=self.tracks[0], created_at=timezone.now() - timedelta(hours=1))
+        Favorite.objects.remove(self.user, self.ids[0])
+        # Favorited online just now; an older queued remove must not drop it
+        Favorite.objects.add(self.user, self.tracks[1])
+
+        data = self._sync(self._op(0, 'add', 10), self._op(1, 'remove', 10), self._op(2, 'remove', 5))
+        self.assertEqual(data['favorite_ids'], [self.ids[1]])
+        self.assertEqual((data['added'], data['removed']), ([], []))
+        # Removing a track that was never favorited still records the time
+        self.assertTrue(FavoriteRemoval.objects.filter(music_id=self.ids[2]).exists())
+
+        data = self._sync(self._op(0, 'add', 0), self._op(1, 'remove', 0))
+        self.assertEqual(data['favorite_ids'], [self.ids[0]])
+
+    def test_unknown_tracks_are_skipped_and_batch_is_capped(self):
+        data = self._sync(self._op(0, 'add', 1), {**self._op(0, 'add', 1), 'music_id': 999999})
+        self.assertEqual(data['favorite_ids'], [self.ids[0]])
+
+        with self.settings(FAVORITES_SYNC_MAX_OPERATIONS=1):
+            response = self.client.post(self.url, {'operations': [self._op(1, 'add', 1), self._op(2, 'add', 1)]},
+                                        format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_version_token_returns_deltas(self):
+        Favorite.objects.add(self.user, self.tracks[0])
+        Favorite.objects.add(self.user, self.tracks[1])
+        version = self._sync(self._op(2, 'add', 1))['version']
+
+        self._sync(self._op(3, 'add', 0), self._op(0, 'remove', 0))
+        response = self.client.get(reverse('favorite-changes'), {'since': version})
+        data = response.data['data']
+        # The token predates the sync that returned it, so its own add is repeated (harmlessly)
+        self.assertEqual(data['added'], [self.ids[2], self.ids[3]])
+        self.assertEqual(data['removed'], [self.ids[0]])
+        self.assertGreater(data['version'], version)
+
+        response = self.client.get(reverse('favorite-changes'), {'since': data['version']})
+        self.assertEqual((response.data['data']['added'], response.data['data']['removed']), ([], []))
+
+    def test_is_favorite_reflects_synced_adds(self):
+        self._sync(self._op(0, 'add', 1))
+        response = self.client.get(reverse('music-detail', kwargs={'pk': self.ids[0]}))
+        self.assertTrue(response.data['is_favorite'])
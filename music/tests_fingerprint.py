@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import wave
+import numpy as np
+from django.core.files import File
+from django.test import TestCase, override_settings
+from music.fingerprint import compute_fingerprint, find_matches, index_fingerprint, fingerprint_track
+from music.audio import decode_pcm
+from music.models import Music, DuplicateCandidate
+
+TEST_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def melody(seed, seconds=20, rate=44100):
+    """Random sequence of chords with a little noise, reproducible per seed"""
+    rng = np.random.default_rng(seed)
+    notes = []
+    for _ in range(seconds * 4):
+        t = np.arange(rate // 4) / rate
+        chord = sum(np.sin(2 * np.pi * f * t) for f in rng.uniform(200, 3000, size=3))
+        notes.append(chord * np.hanning(len(t)))
+    signal = np.concatenate(notes)
+    return signal / np.abs(signal).max() * 0.8
+
+
+def write_wav(path, signal, rate, noise=0.0, seed=0):
+    if noise:
+        signal = signal + np.random.default_rng(seed).normal(0, noise, len(signal))
+    pcm = (np.clip(signal, -1, 1) * 32767).astype(np.int16)
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class FingerprintTests(TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+        shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+
+    def _track(self, title, signal, rate, noise=0.0):
+        path = os.path.join(self.workdir, f'{title}.wav')
+        write_wav(path, signal, rate, noise=noise)
+        with open(path, 'rb') as audio:
+            return Music.objects.create(title=title, audio_file=File(audio, name=f'{title}.wav'))
+
+    def test_reencoded_track_matches_original(self):
+        signal = melody(1)
+        original = self._track('original', signal, 44100)
+        samples = decode_pcm(original.audio_file.path, 11025)
+        index_fingerprint(original, *compute_fingerprint(samples))
+
+        # Same song at a different sample rate with added noise
+        copy_path = os.path.join(self.workdir, 'copy.wav')
+        resampled = np.interp(np.arange(0, len(signal), 2), np.arange(len(signal)), signal)
+        write_wav(copy_path, resampled, 22050, noise=0.01)
+        matches = find_matches(*compute_fingerprint(decode_pcm(copy_path, 11025)))
+
+        self.assertEqual(matches[0][0], original.id)
+        self.assertGreater(matches[0][2], 0.05)
+
+    def test_fingerprint_track_flags_duplicates_only(self):
+        original = self._track('original', melody(1), 44100)
+        other = self._track('other', melody(2), 44100)
+        fingerprint_track(original)
+        fingerprint_track(other)
+        self.assertFalse(DuplicateCandidate.objects.exists())
+
+        copy = self._track('copy', melody(1), 44100, noise=0.01)
+        flagged = fingerprint_track(copy)
+
+        self.assertEqual([candidate.duplicate_of_id for candidate in flagged], [original.id])
+        self.assertEqual(flagged[0].status, DuplicateCandidate.Status.PENDING)
@@ -0,0 +1,65 @@
+import shutil
+import tempfile
+from io import BytesIO
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from music.models import Artist
+
+TEST_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def png_upload(name='portrait.png', size=(1200, 800)):
+    buffer = BytesIO()
+    Image.new('RGBA', size, (200, 30, 30, 255)).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class ImageDerivativeTests(TestCase):
+    def tearDown(self):
+        shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+
+    def _artist_with_image(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            artist = Artist.objects.create(name='Pictured Artist', image=png_upload())
+        artist.refresh_from_db()
+        return artist
+
+    def test_derivatives_generated_after_upload(self):
+        artist = self._artist_with_image()
+
+        derivatives = artist.image_derivatives
+        self.assertEqual(derivatives['source'], artist.image.name)
+        for size_name, max_pixels in {'small': 160, 'medium': 480, 'large': 960}.items():
+            for image_format, pil_format in (('webp', 'WEBP'), ('jpeg', 'JPEG')):
+                with artist.image.storage.open(derivatives[size_name][image_format]) as stored:
+                    image = Image.open(stored)
+                    self.assertEqual(image.format, pil_format)
+                    self.assertEqual(max(image.size), max_pixels)
+
+    def test_list_serializer_returns_derivative_url(self):
+        artist = self._artist_with_image()
+        client = APIClient()
+
+        response = client.get(reverse('artist-list'))
+        self.assertTrue(response.data['data']['results'][0]['image'].endswith(
+            artist.image_derivatives['medium']['webp']
+        ))
+
+        response = client.get(reverse('artist-list'), {'image_format': 'jpeg'})
+        self.assertTrue(response.data['data']['results'][0]['image'].endswith('.jpg'))
+
+    def test_replacing_image_regenerates_derivatives(self):
+        artist = self._artist_with_image()
+        old_small = artist.image_derivatives['small']['webp']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            artist.image = png_upload('new.png', size=(300, 300))
+            artist.save()
+        artist.refresh_from_db()
+
+        self.assertEqual(artist.image_derivatives['source'], artist.image.name)
+        self.assertFalse(artist.image.storage.exists(old_small))
@@ -0,0 +1,97 @@
+from unittest import mock
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User, UserProfile
+from music.listening_history import flush_history, recent_music_ids, record_play
+from music.models import Music, RecentlyPlayed
+from music.tasks import flush_pending_listening_history
+
+
+@override_settings(LISTENING_HISTORY_SIZE=3, LISTENING_HISTORY_FLUSH_SIZE=2)
+class ListeningHistoryTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='listener@example.com', password='password123')
+        UserProfile.objects.get_or_create(user=self.user)
+        self.client.force_authenticate(user=self.user)
+        self.tracks = [Music.objects.create(title=f'Track {i}') for i in range(4)]
+        self.ids = [track.id for track in self.tracks]
+
+    def _play(self, track):
+        response = self.client.get(reverse('music-playback', kwargs={'pk': track.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_history_is_capped_and_deduplicated(self):
+        for index in (0, 1, 2, 0, 3):
+            record_play(self.user.id, self.ids[index])
+        self.assertEqual(recent_music_ids(self.user.id), [self.ids[3], self.ids[0], self.ids[2]])
+
+    def test_plays_are_flushed_in_batches(self):
+        self._play(self.tracks[0])
+        self.assertFalse(RecentlyPlayed.objects.exists())
+
+        self._play(self.tracks[1])
+        self.assertEqual(
+            set(RecentlyPlayed.objects.values_list('music_id', flat=True)), {self.ids[0], self.ids[1]}
+        )
+
+        # A replay of a flushed track updates its row on the next flush
+        first_played = RecentlyPlayed.objects.get(music=self.tracks[0]).played_at
+        self._play(self.tracks[0])
+        self._play(self.tracks[2])
+        self.assertEqual(RecentlyPlayed.objects.count(), 3)
+        self.assertGreater(RecentlyPlayed.objects.get(music=self.tracks[0]).played_at, first_played)
+
+    def test_playback_only_appends_until_flush(self):
+        self._play(self.tracks[0])
+        # The first read seeds the history from RecentlyPlayed
+        recent_music_ids(self.user.id)
+        # After that plays and reads stay in the cache until the flush
+        with self.assertNumQueries(0):
+            self.assertTrue(record_play(self.user.id, self.ids[1]))
+            self.assertEqual(recent_music_ids(self.user.id), [self.ids[1], self.ids[0]])
+        self.assertFalse(RecentlyPlayed.objects.exists())
+        self.assertEqual(flush_history(self.user.id), 2)
+        self.assertEqual(flush_history(self.user.id), 0)
+
+    def test_sweep_flushes_plays_that_waited_too_long(self):
+        record_play(self.user.id, self.ids[0])
+        self.assertEqual(flush_pending_listening_history.delay().get(), 0)
+
+        with override_settings(LISTENING_HISTORY_FLUSH_INTERVAL=0):
+            self.assertEqual(flush_pending_listening_history.delay().get(), 1)
+            self.assertEqual(flush_pending_listening_history.delay().get(), 0)
+        self.assertEqual(list(RecentlyPlayed.objects.values_list('music_id', flat=True)), [self.ids[0]])
+        self.assertEqual(recent_music_ids(self.user.id), [self.ids[0]])
+
+    def test_list_reads_history_and_survives_eviction(self):
+        for track in self.tracks[:2]:
+            self._play(track)
+        response = self.client.get(reverse('recently-played-list'))
+        self.assertEqual([entry['music']['id'] for entry in response.data['data']], [self.ids[1], self.ids[0]])
+
+        cache.clear()
+        response = self.client.get(reverse('recently-played-list'))
+        self.assertEqual([entry['music']['id'] for entry in response.data['data']], [self.ids[1], self.ids[0]])
+
+    def test_deleted_tracks_are_skipped(self):
+        record_play(self.user.id, self.ids[0])
+        record_play(self.user.id, self.ids[1])
+        self.tracks[0].delete()
+
+        self.assertEqual(flush_history(self.user.id), 1)
+        self.assertEqual(list(RecentlyPlayed.objects.values_list('music_id', flat=True)), [self.ids[1]])
+        response = self.client.get(reverse('recently-played-list'))
+        self.assertEqual([entry['music']['id'] for entry in response.data['data']], [self.ids[1]])
+
+    def test_a_failed_flush_keeps_the_plays(self):
+        record_play(self.user.id, self.ids[0])
+        with mock.patch.object(RecentlyPlayed.objects, 'bulk_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                flush_history(self.user.id)
+        record_play(self.user.id, self.ids[1])
+        self.assertEqual(flush_history(self.user.id), 2)
+        self.assertEqual(set(RecentlyPlayed.objects.values_list('music_id', flat=True)), {self.ids[0], self.ids[1]})
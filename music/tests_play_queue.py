@@ -0,0 +1,79 @@
+from django.core.cache import cache
+from django.test import TestCase
+from accounts.models import User
+from music.models import Album, Artist, Music, Playlist, Tag
+from music.play_queue import _version_key, queue_context, resolve_neighbours
+
+
+class PlayQueueIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='queue@example.com', password='password123')
+        self.album = Album.objects.create(title='Queue Album')
+        self.artist = Artist.objects.create(name='Queue Artist')
+        self.tracks = [Music.objects.create(title=f'Track {i}', album=self.album) for i in range(4)]
+        self.loose = Music.objects.create(title='Loose track')
+
+    def test_album_context_and_wrap_around(self):
+        first, second, _, last = self.tracks
+        self.assertEqual(resolve_neighbours(second), (self.tracks[2].id, first.id))
+        # Past the end of the album the catalog takes over, wrapping at the start
+        self.assertEqual(resolve_neighbours(last)[0], self.loose.id)
+        self.assertEqual(resolve_neighbours(first)[1], self.loose.id)
+
+    def test_playlist_context_requires_membership(self):
+        playlist = Playlist.objects.create(name='Mix', user=self.user)
+        playlist.music_tracks.add(self.tracks[0], self.loose)
+        context = queue_context({'playlist_id': str(playlist.id)})
+
+        self.assertEqual(resolve_neighbours(self.tracks[0], context), (self.loose.id, self.loose.id))
+        # Not in the playlist: fall back to the album order
+        self.assertEqual(resolve_neighbours(self.tracks[1], context)[0], self.tracks[2].id)
+
+        playlist.music_tracks.add(self.tracks[3])
+        self.assertEqual(resolve_neighbours(self.tracks[3], context)[1], self.loose.id)
+        playlist.music_tracks.clear()
+        self.assertEqual(resolve_neighbours(self.tracks[0], context)[0], self.tracks[1].id)
+
+    def test_warm_lookup_runs_no_queries(self):
+        tag = Tag.objects.create(name='calm')
+        self.tracks[1].tags.add(tag)
+        self.loose.tags.add(tag)
+        context = queue_context({'tag': 'calm'})
+        resolve_neighbours(self.tracks[1], context)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_neighbours(self.tracks[1], context)[0], self.loose.id)
+
+    def test_changes_invalidate_contexts(self):
+        for track in self.tracks[:2]:
+            track.artist.add(self.artist)
+        context = queue_context({'artist_id': str(self.artist.id)})
+        self.assertEqual(resolve_neighbours(self.tracks[0], context)[0], self.tracks[1].id)
+
+        self.tracks[1].delete()
+        self.assertEqual(resolve_neighbours(self.tracks[0], context)[0], self.tracks[2].id)
+
+        self.tracks[2].album = None
+        self.tracks[2].save()
+        self.assertEqual(resolve_neighbours(self.tracks[0])[0], self.tracks[3].id)
+
+    def test_versions_are_bumped_again_on_commit(self):
+        context = ('artist', self.artist.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tracks[0].artist.add(self.artist)
+            # A reader arriving before the commit caches under this version
+            before_commit = cache.get(_version_key(context))
+            self.assertIsNotNone(before_commit)
+        self.assertNotEqual(cache.get(_version_key(context)), before_commit)
+
+    def test_play_count_updates_keep_cache_warm(self):
+        resolve_neighbours(self.tracks[1])
+        self.tracks[1].increment_play_count()
+        with self.assertNumQueries(0):
+            resolve_neighbours(self.tracks[1])
+
+    def test_catalog_fallback_reads_the_primary_key_index(self):
+        # Next wraps around to the first track, which takes a second read
+        with self.assertNumQueries(3):
+            self.assertEqual(resolve_neighbours(self.loose), (self.tracks[0].id, self.tracks[3].id))
@@ -1,8 +1,10 @@
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.urls import reverse
+from django.core.cache import cache
 from django.utils import translation
 from accounts.models import User, UserProfile
+from music.listening_history import flush_history, recent_music_ids
 from music.models import Music, Artist, Favorite, RecentlyPlayed
 
 class MusicPlaybackTests(APITestCase):
@@ -10,6 +12,7 @@ class MusicPlaybackTests(APITestCase):
         self.user = User.objects.create_user(email='playback_test@example.com', password='password123')
         UserProfile.objects.get_or_create(user=self.user)
         self.client.force_authenticate(user=self.user)
+        cache.clear()
         
         self.artist = Artist.objects.create(name='Original Artist')
         # Simulate modeltranslation fields if they were there, for now we test default
@@ -49,6 +52,9 @@ class MusicPlaybackTests(APITestCase):
         url = reverse('music-playback', kwargs={'pk': self.music2.id})
         self.client.get(url)
         
+        self.assertEqual(recent_music_ids(self.user.id), [self.music2.id])
+
+        flush_history(self.user.id)
         self.assertTrue(RecentlyPlayed.objects.filter(user=self.user, music=self.music2).exists())
 
     def test_playback_is_favorite(self):
@@ -0,0 +1,68 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from music.models import Music, Playlist, PlaylistTrack
+
+
+class PlaylistBulkUpdateTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='bulk@example.com', password='password123')
+        self.client.force_authenticate(user=self.user)
+        self.playlist = Playlist.objects.create(name='Imported', user=self.user)
+        self.tracks = [Music.objects.create(title=f'Track {i}') for i in range(6)]
+        self.ids = [track.id for track in self.tracks]
+        self.url = reverse('playlist-bulk-tracks', kwargs={'pk': self.playlist.id})
+
+    def _order(self):
+        return list(self.playlist.playlist_tracks.values_list('music_id', flat=True))
+
+    def test_add_remove_and_move_in_one_request(self):
+        a, b, c, d, e, f = self.ids
+        self.client.post(self.url, {'add': [{'music_id': m} for m in (a, b, c, d)]}, format='json')
+        self.assertEqual(self._order(), [a, b, c, d])
+
+        response = self.client.post(self.url, {
+            'remove': [b],
+            'move': [{'music_id': d, 'before_id': a}],
+            'add': [{'music_id': e, 'after_id': a}, {'music_id': f, 'after_id': e}, {'music_id': c}],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._order(), [d, a, e, f, c])
+        data = response.data['data']
+        self.assertEqual(data['removed'], [b])
+        self.assertEqual([item['music_id'] for item in data['added']], [e, f])
+        self.assertEqual(data['track_count'], 5)
+
+    def test_import_uses_a_constant_number_of_queries(self):
+        operations = {'add': [{'music_id': m} for m in self.ids]}
+        with self.assertNumQueries(15):
+            self.client.post(self.url, operations, format='json')
+        self.assertEqual(self._order(), self.ids)
+
+    def test_unknown_music_ids_rejected_before_any_change(self):
+        response = self.client.post(self.url, {
+            'add': [{'music_id': self.ids[0]}, {'music_id': 999999}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(PlaylistTrack.objects.exists())
+
+    def test_invalid_operation_rolls_back_whole_batch(self):
+        self.client.post(self.url, {'add': [{'music_id': self.ids[0]}]}, format='json')
+        response = self.client.post(self.url, {
+            'remove': [self.ids[0]],
+            'add': [{'music_id': self.ids[1], 'after_id': self.ids[2]}],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors']['operation']['music_id'], self.ids[1])
+        self.assertEqual(self._order(), [self.ids[0]])
+
+    def test_only_owner_can_bulk_update(self):
+        other = User.objects.create_user(email='other@example.com', password='password123')
+        self.playlist.user = other
+        self.playlist.is_public = True
+        self.playlist.save()
+        response = self.client.post(self.url, {'add': [{'music_id': self.ids[0]}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
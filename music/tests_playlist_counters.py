@@ -0,0 +1,174 @@
+from io import StringIO
+from types import SimpleNamespace
+from django.contrib.admin import site
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from music.admin import PlaylistAdmin, PlaylistTrackInline
+from music.models import Music, Playlist, PlaylistChange, PlaylistTrack
+from music.play_queue import load_contexts
+
+
+class PlaylistCounterTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='counters@example.com', password='password123')
+        self.client.force_authenticate(user=self.user)
+        self.playlist = Playlist.objects.create(name='Road trip', user=self.user)
+        self.tracks = [Music.objects.create(title=f'Track {i}', duration=100 * (i + 1)) for i in range(4)]
+
+    def _counters(self, playlist=None):
+        playlist = playlist or self.playlist
+        playlist.refresh_from_db(fields=['track_count', 'total_duration'])
+        return playlist.track_count, playlist.total_duration
+
+    def test_single_track_endpoints_keep_counters(self):
+        add_url = reverse('playlist-add-track', kwargs={'pk': self.playlist.id})
+        remove_url = reverse('playlist-remove-track', kwargs={'pk': self.playlist.id})
+
+        self.client.post(add_url, {'music_id': self.tracks[0].id}, format='json')
+        response = self.client.post(add_url, {'music_id': self.tracks[1].id}, format='json')
+        self.assertEqual(response.data['data']['track_count'], 2)
+        self.assertEqual(response.data['data']['total_duration'], 300)
+
+        # Adding a track twice does not count it twice
+        self.client.post(add_url, {'music_id': self.tracks[1].id}, format='json')
+        self.assertEqual(self._counters(), (2, 300))
+
+        response = self.client.post(remove_url, {'music_id': self.tracks[0].id}, format='json')
+        self.assertEqual(response.data['data']['track_count'], 1)
+        self.assertEqual(self._counters(), (1, 200))
+
+    def test_saved_entries_count_their_track(self):
+        # Without the track loaded its duration is read inside the counter UPDATE
+        PlaylistTrack.objects.create(playlist=self.playlist, music_id=self.tracks[0].id, position='a')
+        PlaylistTrack.objects.create(playlist=self.playlist, music=self.tracks[1], position='b')
+        self.assertEqual(self._counters(), (2, 300))
+
+    def test_bulk_endpoint_keeps_counters(self):
+        url = reverse('playlist-bulk-tracks', kwargs={'pk': self.playlist.id})
+        self.client.post(url, {'add': [{'music_id': t.id} for t in self.tracks]}, format='json')
+        self.assertEqual(self._counters(), (4, 1000))
+
+        response = self.client.post(url, {'remove': [self.tracks[3].id, self.tracks[3].id]}, format='json')
+        self.assertEqual(response.data['data']['total_duration'], 600)
+        self.assertEqual(self._counters(), (3, 600))
+
+    def test_m2m_changes_from_either_side(self):
+        other = Playlist.objects.create(name='Gym', user=self.user)
+        self.playlist.music_tracks.add(self.tracks[0], self.tracks[1])
+        self.assertEqual(self._counters(), (2, 300))
+
+        # Removing a track that is not in the playlist changes nothing
+        self.playlist.music_tracks.remove(self.tracks[1], self.tracks[2])
+        self.assertEqual(self._counters(), (1, 100))
+
+        self.tracks[2].playlists.add(self.playlist, other)
+        self.assertEqual(self._counters(), (2, 400))
+        self.assertEqual(self._counters(other), (1, 300))
+
+        self.tracks[2].playlists.clear()
+        self.assertEqual(self._counters(), (1, 100))
+        self.assertEqual(self._counters(other), (0, 0))
+
+        self.playlist.music_tracks.clear()
+        self.assertEqual(self._counters(), (0, 0))
+
+    def test_track_duration_change_and_deletion(self):
+        self.playlist.music_tracks.add(*self.tracks[:2])
+        track = self.tracks[0]
+        track.duration = 150
+        track.save()
+        self.assertEqual(self._counters(), (2, 350))
+
+        # Saves that leave the duration alone do not touch the counters
+        track.play_count = 5
+        track.save(update_fields=['play_count'])
+        self.assertEqual(self._counters(), (2, 350))
+
+        track.delete()
+        self.assertEqual(self._counters(), (1, 200))
+
+    def test_listing_reads_stored_counters(self):
+        self.playlist.music_tracks.add(*self.tracks)
+        response = self.client.get(reverse('playlist-my-playlists'))
+        playlist = response.data['data'][0]
+        self.assertEqual(playlist['track_count'], 4)
+        self.assertEqual(playlist['total_duration'], 1000)
+
+    def test_reconcile_fixes_drifted_counters(self):
+        self.playlist.music_tracks.add(*self.tracks[:3])
+        PlaylistTrack.objects.filter(music=self.tracks[0]).delete()
+        Playlist.objects.filter(pk=self.playlist.pk).update(track_count=7)
+
+        out = StringIO()
+        call_command('reconcile_playlist_counters', stdout=out)
+
+        self.assertIn('1 playlist(s) corrected', out.getvalue())
+        self.assertEqual(self._counters(), (2, 500))
+        self.assertEqual(Playlist.objects.reconcile_counters(), 0)
+
+
+class PlaylistAdminTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin_user = User.objects.create_superuser(email='admin@example.com', password='password123')
+        self.playlist = Playlist.objects.create(name='Curated', user=self.admin_user)
+        self.tracks = [Music.objects.create(title=f'Track {i}', duration=60) for i in range(2)]
+        self.playlist.music_tracks.add(*self.tracks)
+
+    def _save_inline(self, changes, extra=()):
+        """Submit the inline with ``{row index: field data}`` changes and new rows' music IDs"""
+        request = RequestFactory().post('/')
+        request.user = self.admin_user
+        FormSet = PlaylistTrackInline(Playlist, site).get_formset(request, self.playlist)
+        prefix = FormSet.get_default_prefix()
+        entries = list(PlaylistTrack.objects.filter(playlist=self.playlist).order_by('position'))
+        data = {f'{prefix}-TOTAL_FORMS': str(len(entries) + len(extra)), f'{prefix}-INITIAL_FORMS': str(len(entries))}
+        for index, entry in enumerate(entries):
+            data.update({
+                f'{prefix}-{index}-id': str(entry.pk),
+                f'{prefix}-{index}-playlist': str(self.playlist.pk),
+                f'{prefix}-{index}-music': str(entry.music_id),
+            })
+            data.update({f'{prefix}-{index}-{field}': value for field, value in changes.get(index, {}).items()})
+        for index, music_id in enumerate(extra, len(entries)):
+            data.update({f'{prefix}-{index}-playlist': str(self.playlist.pk), f'{prefix}-{index}-music': str(music_id)})
+        formset = FormSet(data, instance=self.playlist, prefix=prefix)
+        self.assertTrue(formset.is_valid(), formset.errors)
+        PlaylistAdmin(Playlist, site).save_formset(request, SimpleNamespace(instance=self.playlist), formset, change=True)
+        self.playlist.refresh_from_db()
+
+    def _changes(self):
+        return list(PlaylistChange.objects.filter(playlist=self.playlist).values_list('operation', 'music_id'))
+
+    def test_inline_deletions_keep_counters_log_and_queue(self):
+        context = ('playlist', self.playlist.pk)
+        self.assertEqual(list(load_contexts([context])[context][0]), [track.id for track in self.tracks])
+        revision = Playlist.objects.get(pk=self.playlist.pk).revision
+
+        self._save_inline({1: {'DELETE': 'on'}})
+
+        self.assertEqual((self.playlist.track_count, self.playlist.total_duration), (1, 60))
+        self.assertGreater(self.playlist.revision, revision)
+        self.assertEqual(self._changes()[-1:], [(PlaylistChange.Operation.REMOVE, self.tracks[1].id)])
+        self.assertEqual(list(load_contexts([context])[context][0]), [self.tracks[0].id])
+
+    def test_inline_track_changes_replace_the_entry_in_place(self):
+        context = ('playlist', self.playlist.pk)
+        load_contexts([context])
+        replacement = Music.objects.create(title='Replacement', duration=30)
+        appended = Music.objects.create(title='Appended', duration=10)
+
+        self._save_inline({0: {'music': str(replacement.id)}}, extra=[appended.id])
+
+        self.assertEqual((self.playlist.track_count, self.playlist.total_duration), (3, 100))
+        self.assertEqual(self._changes()[-3:], [
+            (PlaylistChange.Operation.REMOVE, self.tracks[0].id),
+            (PlaylistChange.Operation.ADD, replacement.id),
+            (PlaylistChange.Operation.ADD, appended.id),
+        ])
+        self.assertEqual(list(load_contexts([context])[context][0]), [replacement.id, self.tracks[1].id, appended.id])
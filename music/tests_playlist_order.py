@@ -0,0 +1,82 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from music.models import Music, Playlist, PlaylistTrack
+from music.positions import key_between
+
+
+class PositionKeyTests(APITestCase):
+    def test_keys_sort_between_bounds(self):
+        keys = [key_between(None, None)]
+        for i in range(300):
+            # Keep inserting at the front, the middle and the end
+            index = (0, len(keys) // 2, len(keys))[i % 3]
+            before = keys[index - 1] if index else None
+            after = keys[index] if index < len(keys) else None
+            keys.insert(index, key_between(before, after))
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(set(keys)), len(keys))
+        self.assertLess(max(len(key) for key in keys), 40)
+
+
+class PlaylistOrderTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='order@example.com', password='password123')
+        self.client.force_authenticate(user=self.user)
+        self.playlist = Playlist.objects.create(name='Ordered', user=self.user)
+        self.tracks = [Music.objects.create(title=f'Track {i}') for i in range(4)]
+
+    def _post(self, action, **data):
+        url = reverse(f'playlist-{action}', kwargs={'pk': self.playlist.id})
+        return self.client.post(url, data, format='json')
+
+    def _order(self):
+        return list(self.playlist.playlist_tracks.values_list('music_id', flat=True))
+
+    def test_insert_appends_or_places_next_to_anchor(self):
+        first, second, third, fourth = [track.id for track in self.tracks]
+        self._post('add-track', music_id=first)
+        self._post('add-track', music_id=second)
+        self._post('add-track', music_id=third, after_id=first)
+        response = self._post('add-track', music_id=fourth, before_id=first)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._order(), [fourth, first, third, second])
+
+    def test_move_writes_only_the_moved_row(self):
+        for track in self.tracks:
+            self._post('add-track', music_id=track.id)
+        positions = dict(PlaylistTrack.objects.values_list('music_id', 'position'))
+        moved = self.tracks[3].id
+
+        response = self._post('move-track', music_id=moved, after_id=self.tracks[0].id)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._order(), [self.tracks[0].id, moved, self.tracks[1].id, self.tracks[2].id])
+        changed = {
+            music_id for music_id, position in PlaylistTrack.objects.values_list('music_id', 'position')
+            if positions[music_id] != position
+        }
+        self.assertEqual(changed, {moved})
+
+    def test_move_errors(self):
+        self._post('add-track', music_id=self.tracks[0].id)
+        response = self._post('move-track', music_id=self.tracks[1].id)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self._post('move-track', music_id=self.tracks[0].id, after_id=self.tracks[2].id)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_remove_and_plain_add_keep_order(self):
+        self.playlist.music_tracks.add(self.tracks[2])
+        self.playlist.music_tracks.add(self.tracks[0])
+        self._post('remove-track', music_id=self.tracks[2].id)
+        self._post('add-track', music_id=self.tracks[1].id)
+
+        self.assertEqual(self._order(), [self.tracks[0].id, self.tracks[1].id])
+
+    def test_renumber_keeps_order(self):
+        for track in self.tracks:
+            self._post('add-track', music_id=track.id)
+        PlaylistTrack.objects.renumber(self.playlist.id)
+        self.assertEqual(self._order(), [track.id for track in self.tracks])
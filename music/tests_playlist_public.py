@@ -0,0 +1,62 @@
+from datetime import timedelta
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from music.models import Music, Playlist
+
+
+class PublicPlaylistBrowseTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='browser@example.com', password='password123')
+        self.owner = User.objects.create_user(
+            email='curator@example.com', password='password123', first_name='Cara', last_name='Tor'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.hit = Music.objects.create(title='Hit', play_count=1000)
+        self.deep_cut = Music.objects.create(title='Deep cut', play_count=10)
+
+        self.popular = Playlist.objects.create(name='Hits', user=self.owner, is_public=True)
+        self.popular.music_tracks.add(self.hit, self.deep_cut)
+        self.niche = Playlist.objects.create(name='Niche', user=self.owner, is_public=True)
+        self.niche.music_tracks.add(self.deep_cut)
+        self.private = Playlist.objects.create(name='Secret', user=self.owner)
+        self.private.music_tracks.add(self.hit)
+        self.url = reverse('playlist-public')
+
+    def _names(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [playlist['name'] for playlist in response.data['data']['results']]
+
+    def test_ranked_by_precomputed_popularity(self):
+        self.assertEqual(Playlist.objects.refresh_popularity(), 2)
+        self.popular.refresh_from_db()
+        self.assertAlmostEqual(self.popular.popularity, 1010, places=0)
+
+        response = self.client.get(self.url)
+        self.assertEqual(self._names(response), ['Hits', 'Niche'])
+        summary = response.data['data']['results'][0]
+        self.assertEqual(summary['owner_name'], 'Cara Tor')
+        self.assertEqual(summary['track_count'], 2)
+        self.assertNotIn('user_email', summary)
+
+    def test_stale_playlists_decay(self):
+        Playlist.objects.filter(pk=self.popular.pk).update(updated_at=timezone.now() - timedelta(days=300))
+        Playlist.objects.refresh_popularity()
+        self.assertEqual(self._names(self.client.get(self.url)), ['Niche', 'Hits'])
+
+    def test_recent_ordering_follows_track_changes(self):
+        Playlist.objects.filter(pk=self.niche.pk).update(updated_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(self._names(self.client.get(self.url, {'ordering': 'recent'})), ['Hits', 'Niche'])
+
+        self.niche.music_tracks.add(self.hit)
+        self.assertEqual(self._names(self.client.get(self.url, {'ordering': 'recent'})), ['Niche', 'Hits'])
+
+    def test_listing_uses_a_fixed_number_of_queries(self):
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+    def test_unknown_ordering_rejected(self):
+        response = self.client.get(self.url, {'ordering': 'random'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
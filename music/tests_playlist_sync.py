@@ -0,0 +1,97 @@
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from music.models import Music, Playlist, PlaylistChange, PlaylistTrack
+
+
+class PlaylistSyncTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='sync@example.com', password='password123')
+        self.client.force_authenticate(user=self.user)
+        self.playlist = Playlist.objects.create(name='Commute', user=self.user)
+        self.tracks = [Music.objects.create(title=f'Track {i}') for i in range(4)]
+        self.ids = [track.id for track in self.tracks]
+        self.url = reverse('playlist-sync', kwargs={'pk': self.playlist.id})
+
+    def _sync(self, since=None):
+        response = self.client.get(self.url, {} if since is None else {'since': since})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['data']
+
+    def _operations(self, data):
+        return [(change['operation'], change['music_id']) for change in data['changes']]
+
+    def test_every_kind_of_change_is_logged_in_order(self):
+        a, b, c, d = self.ids
+        self.client.post(reverse('playlist-add-track', kwargs={'pk': self.playlist.id}), {'music_id': a}, format='json')
+        self.client.post(reverse('playlist-bulk-tracks', kwargs={'pk': self.playlist.id}), {
+            'add': [{'music_id': b}, {'music_id': c, 'before_id': a}],
+        }, format='json')
+        self.client.post(reverse('playlist-move-track', kwargs={'pk': self.playlist.id}),
+                         {'music_id': b, 'before_id': c}, format='json')
+        self.client.post(reverse('playlist-remove-track', kwargs={'pk': self.playlist.id}), {'music_id': a}, format='json')
+        self.playlist.music_tracks.add(self.tracks[3])
+
+        data = self._sync(since=0)
+        self.assertEqual(data['mode'], 'changes')
+        self.assertEqual(self._operations(data), [
+            ('add', a), ('add', b), ('add', c), ('move', b), ('remove', a), ('add', d),
+        ])
+        self.assertEqual([change['revision'] for change in data['changes']], list(range(1, 7)))
+        self.assertEqual(data['revision'], 6)
+
+        # Replaying the positions reproduces the server order
+        positions = {}
+        for change in data['changes']:
+            if change['operation'] == 'remove':
+                positions.pop(change['music_id'])
+            else:
+                positions[change['music_id']] = change['position']
+        self.assertEqual(sorted(positions, key=positions.get),
+                         list(self.playlist.playlist_tracks.values_list('music_id', flat=True)))
+
+    def test_only_newer_changes_are_returned(self):
+        self.playlist.music_tracks.add(*self.tracks[:2])
+        revision = self._sync(since=0)['revision']
+        self.assertEqual(self._sync(since=revision)['changes'], [])
+
+        self.tracks[0].delete()
+        data = self._sync(since=revision)
+        self.assertEqual(self._operations(data), [('remove', self.ids[0])])
+        self.assertEqual(data['track_count'], 1)
+
+    def test_missing_or_unknown_revision_gets_a_snapshot(self):
+        self.playlist.music_tracks.add(*self.tracks[:2])
+        for since in (None, 99):
+            data = self._sync(since=since)
+            self.assertEqual(data['mode'], 'snapshot')
+            self.assertEqual([track['music_id'] for track in data['tracks']], self.ids[:2])
+            self.assertEqual(data['revision'], 2)
+
+        response = self.client.get(self.url, {'since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(PLAYLIST_CHANGE_LOG_LENGTH=2)
+    def test_compacted_log_falls_back_to_snapshot(self):
+        for track in self.tracks:
+            self.playlist.music_tracks.add(track)
+        self.playlist.music_tracks.remove(self.tracks[0])
+
+        self.playlist.refresh_from_db()
+        self.assertEqual((self.playlist.revision, self.playlist.compacted_revision), (5, 3))
+        self.assertEqual(list(PlaylistChange.objects.values_list('revision', flat=True)), [4, 5])
+
+        self.assertEqual(self._sync(since=1)['mode'], 'snapshot')
+        self.assertEqual(self._operations(self._sync(since=3)), [('add', self.ids[3]), ('remove', self.ids[0])])
+
+    def test_renumbering_resets_the_log(self):
+        self.playlist.music_tracks.add(*self.tracks)
+        PlaylistTrack.objects.renumber(self.playlist.id)
+
+        data = self._sync(since=4)
+        self.assertEqual(data['mode'], 'snapshot')
+        self.assertEqual(data['revision'], 5)
+        self.assertEqual(self._sync(since=5)['changes'], [])
+        self.assertFalse(PlaylistChange.objects.exists())
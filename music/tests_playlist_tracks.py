@@ -0,0 +1,61 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from music.models import Artist, Favorite, Music, Playlist, PlaylistTrack
+
+
+class PlaylistTrackListingTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='tracks@example.com', password='password123')
+        self.client.force_authenticate(user=self.user)
+        self.playlist = Playlist.objects.create(name='Long list', user=self.user)
+        artist = Artist.objects.create(name='Listed Artist')
+        self.tracks = []
+        for i in range(7):
+            music = Music.objects.create(title=f'Track {i}')
+            music.artist.add(artist)
+            PlaylistTrack.objects.insert(self.playlist, music)
+            self.tracks.append(music)
+        Favorite.objects.create(user=self.user, music=self.tracks[1])
+        self.url = reverse('playlist-tracks', kwargs={'pk': self.playlist.id})
+
+    def test_tracks_are_paged_in_playlist_order(self):
+        seen = []
+        url = f'{self.url}?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = response.data['data']
+            seen.extend(entry['music']['id'] for entry in data['results'])
+            url = data['next']
+        self.assertEqual(seen, [track.id for track in self.tracks])
+
+    def test_page_queries_do_not_grow_with_page_size(self):
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url)
+        results = response.data['data']['results']
+        self.assertEqual(len(results), 7)
+        self.assertEqual(results[0]['music']['artist_names'], ['Listed Artist'])
+        self.assertEqual([entry['music']['is_favorite'] for entry in results[:3]], [False, True, False])
+
+        # Favorites come from the cached membership array once it is warm
+        with self.assertNumQueries(4):
+            self.client.get(self.url)
+
+    def test_summary_and_mutations_do_not_embed_tracks(self):
+        response = self.client.get(reverse('playlist-detail', kwargs={'pk': self.playlist.id}))
+        self.assertNotIn('music_tracks', response.data)
+        self.assertEqual(response.data['track_count'], 7)
+
+        extra = Music.objects.create(title='Extra')
+        response = self.client.post(
+            reverse('playlist-add-track', kwargs={'pk': self.playlist.id}),
+            {'music_id': extra.id, 'after_id': self.tracks[0].id},
+            format='json'
+        )
+        delta = response.data['data']
+        self.assertEqual(delta['change'], 'added')
+        self.assertEqual(delta['music_id'], extra.id)
+        self.assertEqual(delta['track_count'], 8)
+        self.assertEqual(delta['position'], PlaylistTrack.objects.get(music=extra).position)
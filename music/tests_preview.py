@@ -0,0 +1,134 @@
+import os
+import shutil
+import tempfile
+import wave
+from django.core.files import File
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from music.models import Music
+from music.previews import cut_preview
+from music.tasks import generate_music_preview
+
+TEST_MEDIA_ROOT = tempfile.mkdtemp()
+
+# MPEG1 Layer III, 128 kbps, 44.1 kHz, no padding: 417 byte frames of 1152 samples
+MP3_HEADER = b'\xff\xfb\x90\x00'
+MP3_FRAME_SIZE = 417
+MP3_FRAME_SECONDS = 1152 / 44100
+
+
+def mp3_bytes(seconds):
+    """ID3 tag, Xing header frame and numbered audio frames"""
+    tag = b'ID3\x03\x00\x00\x00\x00\x00\x10' + b'\x00' * 16
+    xing = MP3_HEADER + b'\x00' * 32 + b'Xing' + b'\x00' * (MP3_FRAME_SIZE - 40)
+    frames = [
+        MP3_HEADER + index.to_bytes(4, 'big') + b'\x55' * (MP3_FRAME_SIZE - 8)
+        for index in range(int(seconds / MP3_FRAME_SECONDS))
+    ]
+    return tag + xing + b''.join(frames)
+
+
+def write_wav(path, seconds, rate=8000):
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b''.join((i % 30000).to_bytes(2, 'little') for i in range(seconds * rate)))
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, PREVIEW_OFFSET_SECONDS=30, PREVIEW_LENGTH_SECONDS=30)
+class PreviewClipTests(TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+        shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+
+    def test_mp3_preview_is_sliced_on_frame_boundaries(self):
+        source = os.path.join(self.workdir, 'track.mp3')
+        with open(source, 'wb') as mp3:
+            mp3.write(mp3_bytes(90))
+        clip = os.path.join(self.workdir, 'clip.mp3')
+        cut_preview(source, clip, 30, 30)
+
+        with open(clip, 'rb') as preview:
+            data = preview.read()
+        self.assertEqual(len(data) % MP3_FRAME_SIZE, 0)
+        frames = [data[i:i + MP3_FRAME_SIZE] for i in range(0, len(data), MP3_FRAME_SIZE)]
+        self.assertTrue(all(frame.startswith(MP3_HEADER) for frame in frames))
+        first_index = int.from_bytes(frames[0][4:8], 'big')
+        self.assertEqual(first_index, int(30 / MP3_FRAME_SECONDS))
+        self.assertAlmostEqual(len(frames) * MP3_FRAME_SECONDS, 30, delta=MP3_FRAME_SECONDS)
+
+    def test_wav_preview_copies_samples(self):
+        source = os.path.join(self.workdir, 'track.wav')
+        write_wav(source, 60)
+        clip = os.path.join(self.workdir, 'clip.wav')
+        cut_preview(source, clip, 30, 30)
+
+        with wave.open(source, 'rb') as original, wave.open(clip, 'rb') as preview:
+            self.assertEqual(preview.getnframes(), 30 * 8000)
+            original.setpos(30 * 8000)
+            self.assertEqual(preview.readframes(100), original.readframes(100))
+
+    def test_short_track_preview_starts_earlier(self):
+        source = os.path.join(self.workdir, 'short.wav')
+        write_wav(source, 40)
+        clip = os.path.join(self.workdir, 'clip.wav')
+        cut_preview(source, clip, 30, 30)
+
+        with wave.open(source, 'rb') as original, wave.open(clip, 'rb') as preview:
+            self.assertEqual(preview.getnframes(), 30 * 8000)
+            original.setpos(10 * 8000)
+            self.assertEqual(preview.readframes(100), original.readframes(100))
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, PREVIEW_OFFSET_SECONDS=30, PREVIEW_LENGTH_SECONDS=30)
+class PreviewStreamTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.workdir = tempfile.mkdtemp()
+        path = os.path.join(self.workdir, 'track.mp3')
+        with open(path, 'wb') as mp3:
+            mp3.write(mp3_bytes(90))
+        with open(path, 'rb') as audio:
+            self.music = Music.objects.create(title='Previewed', audio_file=File(audio, name='track.mp3'))
+        self.url = reverse('music-preview', args=[self.music.id])
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+        shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+
+    def test_preview_stored_next_to_original(self):
+        name = generate_music_preview(self.music.id)
+        self.music.audio_blob.refresh_from_db()
+        self.assertEqual(name, self.music.audio_file.name.replace('.mp3', '_preview.mp3'))
+        self.assertEqual(self.music.audio_blob.preview_file.name, name)
+
+    def test_missing_preview_returns_404(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 404)
+
+    def test_range_requests(self):
+        generate_music_preview(self.music.id)
+        self.music.audio_blob.refresh_from_db()
+        preview_size = self.music.audio_blob.preview_file.size
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(len(b''.join(response.streaming_content)), preview_size)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{preview_size}')
+        self.assertEqual(len(b''.join(response.streaming_content)), 100)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(response['Content-Range'], f'bytes {preview_size - 10}-{preview_size - 1}/{preview_size}')
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={preview_size}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{preview_size}')
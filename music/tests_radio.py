@@ -0,0 +1,123 @@
+import shutil
+import tempfile
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from music.ann import build_index
+from music.listening_history import record_play
+from music.models import Artist, Music, RecentlyPlayed, Tag
+from music.play_queue import resolve_neighbours
+from music.recommender import build_neighbours
+
+
+@override_settings(RADIO_ARTIST_SPACING=2, RADIO_SEED_TRACKS=2)
+class RadioTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='radio@example.com', password='password123')
+        self.client.force_authenticate(user=self.user)
+        self.artists = [Artist.objects.create(name=f'Artist {i}') for i in range(3)]
+        self.rock = Tag.objects.create(name='rock')
+        self.tracks = []
+        for number in range(9):
+            track = Music.objects.create(title=f'Track {number}')
+            track.artist.add(self.artists[number % 3])
+            track.tags.add(self.rock)
+            self.tracks.append(track)
+        self.ids = [track.id for track in self.tracks]
+
+        # Everyone listened to the whole catalog, so every track neighbours every other
+        for number in range(2):
+            listener = User.objects.create_user(email=f'listener{number}@example.com', password='password123')
+            for track in self.tracks:
+                RecentlyPlayed.objects.create(user=listener, music=track)
+        build_neighbours()
+
+    def _start(self, **data):
+        return self.client.post(reverse('radio-list'), data, format='json')
+
+    def _artist_of(self, music_id):
+        return self.ids.index(music_id) % 3
+
+    def test_track_station_never_repeats_and_spaces_artists(self):
+        response = self._start(track_id=self.ids[0], size=4)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        session = response.data['data']['session']
+        played = response.data['data']['track_ids']
+
+        response = self.client.get(reverse('radio-detail', kwargs={'pk': session}), {'size': 4})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        played += response.data['data']['track_ids']
+
+        self.assertEqual(sorted(played), sorted(self.ids[1:]))
+        artists = [0] + [self._artist_of(music_id) for music_id in played]
+        for at in range(1, len(artists)):
+            self.assertNotIn(artists[at], artists[max(at - 2, 0):at])
+
+        # The catalog is used up, and with it the station
+        response = self.client.get(reverse('radio-detail', kwargs={'pk': session}))
+        self.assertEqual(response.data['data']['track_ids'], [])
+
+    def test_artist_and_tag_seeds(self):
+        response = self._start(artist_id=self.artists[1].id, size=3)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        first = response.data['data']['track_ids']
+        self.assertEqual(len(first), 3)
+        self.assertEqual(self._artist_of(first[0]), 1)
+
+        response = self._start(tag='rock', size=9)
+        self.assertEqual(sorted(response.data['data']['track_ids']), self.ids)
+
+    def test_invalid_seeds_and_sessions(self):
+        self.assertEqual(self._start().status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._start(track_id=self.ids[0], tag='rock').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._start(tag='jazz').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self._start(track_id=0).status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.get(reverse('radio-detail', kwargs={'pk': 'expired'}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        # Sessions belong to the user who started them
+        session = self._start(track_id=self.ids[0]).data['data']['session']
+        other = User.objects.create_user(email='other@example.com', password='password123')
+        self.client.force_authenticate(user=other)
+        response = self.client.get(reverse('radio-detail', kwargs={'pk': session}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_playback_continues_with_a_similar_track(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        last = self.tracks[-1]
+        with override_settings(ANN_INDEX_DIR=directory, ANN_LISTS=1):
+            self.assertEqual(resolve_neighbours(last)[0], self.ids[0])
+            build_index()
+            next_id, previous_id = resolve_neighbours(last)
+        self.assertIn(next_id, self.ids[:-1])
+        self.assertEqual(previous_id, self.ids[-2])
+
+        # Following the radio never bounces back to a track just played
+        played = [last.id]
+        with override_settings(ANN_INDEX_DIR=directory):
+            for _ in range(len(self.ids) - 1):
+                record_play(self.user.id, played[-1])
+                next_id = resolve_neighbours(Music.objects.get(pk=played[-1]), user_id=self.user.id)[0]
+                self.assertNotIn(next_id, played)
+                played.append(next_id)
+        self.assertCountEqual(played, self.ids)
+
+    def test_radio_fallback_reads_the_history_from_the_cache(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with override_settings(ANN_INDEX_DIR=directory, ANN_LISTS=1):
+            build_index()
+            # The first read seeds the history from RecentlyPlayed
+            resolve_neighbours(self.tracks[0], user_id=self.user.id)
+            record_play(self.user.id, self.ids[0])
+            record_play(self.user.id, self.ids[-1])
+            # Only the catalog fallback for "previous" reads the database
+            with self.assertNumQueries(1):
+                next_id, _previous_id = resolve_neighbours(self.tracks[-1], user_id=self.user.id)
+        self.assertNotIn(next_id, (self.ids[0], self.ids[-1]))
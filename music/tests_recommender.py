@@ -0,0 +1,125 @@
+import random
+import numpy as np
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User, UserProfile
+from music.listening_history import record_play
+from music.models import Favorite, Music, Playlist, RecentlyPlayed, TrackNeighbours
+from music.recommender import build_neighbours, recommend_for_user
+from rhythm_backend import celery_app
+
+
+class RecommenderTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='seeker@example.com', password='password123')
+        UserProfile.objects.get_or_create(user=self.user)
+        self.client.force_authenticate(user=self.user)
+        self.tracks = [Music.objects.create(title=f'Track {i}') for i in range(5)]
+        self.ids = [track.id for track in self.tracks]
+
+    def _listener(self, email, *indexes):
+        listener = User.objects.create_user(email=email, password='password123')
+        for index in indexes:
+            RecentlyPlayed.objects.create(user=listener, music=self.tracks[index])
+        return listener
+
+    def _neighbours(self, index):
+        row = TrackNeighbours.objects.get(music=self.tracks[index])
+        return (
+            np.frombuffer(row.neighbour_ids, dtype=np.int64).tolist(),
+            np.frombuffer(row.scores, dtype=np.float32).tolist()
+        )
+
+    def test_neighbours_are_ranked_by_cosine_similarity(self):
+        self._listener('one@example.com', 0, 1, 2)
+        self._listener('two@example.com', 0, 1)
+        playlist = Playlist.objects.create(user=self.user, name='Mix')
+        playlist.music_tracks.add(self.tracks[1], self.tracks[3])
+
+        self.assertEqual(build_neighbours(), 4)
+        ids, scores = self._neighbours(0)
+        self.assertEqual(ids, [self.ids[1], self.ids[2]])
+        self.assertAlmostEqual(scores[0], 2 / 6 ** 0.5, places=5)
+        self.assertAlmostEqual(scores[1], 1 / 2 ** 0.5, places=5)
+        self.assertEqual(self._neighbours(3)[0], [self.ids[1]])
+        self.assertFalse(TrackNeighbours.objects.filter(music=self.tracks[4]).exists())
+
+    def test_chunked_build_matches_dense_computation(self):
+        rng = random.Random(7)
+        baskets = [rng.sample(range(5), rng.randint(1, 5)) for _ in range(8)]
+        for number, basket in enumerate(baskets):
+            self._listener(f'random{number}@example.com', *basket)
+
+        dense = np.zeros((5, 5))
+        for basket in baskets:
+            for i in basket:
+                for j in basket:
+                    dense[i, j] += 1
+        similarity = dense / np.sqrt(np.outer(dense.diagonal(), dense.diagonal()))
+
+        with override_settings(RECOMMENDER_PAIR_CHUNK=3):
+            build_neighbours()
+        for index in range(5):
+            if not TrackNeighbours.objects.filter(music=self.tracks[index]).exists():
+                continue
+            ids, scores = self._neighbours(index)
+            for music_id, score in zip(ids, scores):
+                self.assertAlmostEqual(score, similarity[index, self.ids.index(music_id)], places=5)
+            self.assertEqual(scores, sorted(scores, reverse=True))
+
+    @override_settings(RECOMMENDER_MAX_BASKET=2)
+    def test_large_baskets_keep_their_heaviest_tracks(self):
+        listener = self._listener('heavy@example.com', 0, 1, 2)
+        Favorite.objects.create(user=listener, music=self.tracks[0])
+        Favorite.objects.create(user=listener, music=self.tracks[2])
+        build_neighbours()
+        self.assertEqual(self._neighbours(0)[0], [self.ids[2]])
+        self.assertFalse(TrackNeighbours.objects.filter(music=self.tracks[1]).exists())
+
+    def test_recommendations_merge_recent_neighbours_without_querying_the_catalog(self):
+        self._listener('one@example.com', 0, 1, 2)
+        self._listener('two@example.com', 0, 1)
+        self._listener('three@example.com', 3, 4)
+        build_neighbours()
+
+        self.assertEqual(recommend_for_user(self.user.id, 10), [])
+        record_play(self.user.id, self.ids[0])
+        recommend_for_user(self.user.id, 10)
+        # The neighbour rows and the (empty) taste profile
+        with self.assertNumQueries(2):
+            self.assertEqual(recommend_for_user(self.user.id, 10), [self.ids[1], self.ids[2]])
+
+        # Favorites and recent plays are not recommended back
+        Favorite.objects.create(user=self.user, music=self.tracks[1])
+        self.assertEqual(recommend_for_user(self.user.id, 10), [self.ids[2]])
+
+    def test_favorites_seed_users_without_history(self):
+        self._listener('one@example.com', 0, 1)
+        build_neighbours()
+        Favorite.objects.create(user=self.user, music=self.tracks[1])
+        self.assertEqual(recommend_for_user(self.user.id, 10), [self.ids[0]])
+
+    def test_home_section_keeps_recommendation_order(self):
+        self._listener('one@example.com', 0, 1, 2)
+        self._listener('two@example.com', 0, 1)
+        build_neighbours()
+        record_play(self.user.id, self.ids[0])
+
+        response = self.client.get(reverse('home-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        section = next(s for s in response.data['data']['sections'] if s['slug'] == 'recommended_for_you')
+        self.assertEqual(section['items'], [self.ids[1], self.ids[2]])
+
+        response = self.client.get(reverse('home-section', kwargs={'slug': 'recommended_for_you'}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([track['id'] for track in response.data['data']['results']], [self.ids[1], self.ids[2]])
+
+    def test_rebuilds_are_scheduled_by_celery_beat(self):
+        schedule = celery_app.conf.beat_schedule
+        tasks = {entry['task'] for entry in schedule.values()}
+        self.assertLessEqual({'music.tasks.build_recommendations', 'music.tasks.refresh_playlist_popularity'}, tasks)
+        self.assertLessEqual(tasks, set(celery_app.tasks))
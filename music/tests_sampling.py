@@ -0,0 +1,123 @@
+from collections import Counter
+import numpy as np
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from music.favorites import favorite_ids
+from music.listening_history import record_play
+from music.models import Artist, Favorite, Music, Playlist
+from music.sampling import sample, sample_catalog, shuffled, shuffled_neighbour
+
+
+class SamplingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tracks = [Music.objects.create(title=f'Track {i}') for i in range(40)]
+        self.ids = [track.id for track in self.tracks]
+
+    def test_shuffle_is_reproducible_and_stable_when_tracks_change(self):
+        order = shuffled(self.ids, 7).tolist()
+        self.assertEqual(sorted(order), self.ids)
+        self.assertEqual(shuffled(self.ids, 7).tolist(), order)
+        self.assertNotEqual(shuffled(self.ids, 8).tolist(), order)
+        # Dropping a track leaves the others in place
+        self.assertEqual(shuffled(self.ids[1:], 7).tolist(), [i for i in order if i != self.ids[0]])
+
+        for at in range(1, len(order) - 1):
+            self.assertEqual(shuffled_neighbour(self.ids, order[at], 7, 1), order[at + 1])
+            self.assertEqual(shuffled_neighbour(self.ids, order[at], 7, -1), order[at - 1])
+        self.assertIsNone(shuffled_neighbour(self.ids, order[-1], 7, 1))
+        self.assertIsNone(shuffled_neighbour(self.ids, order[0], 7, -1))
+
+    def test_weighted_samples_favour_heavy_ids(self):
+        rng = np.random.default_rng(0)
+        counts = Counter()
+        for _round in range(2000):
+            counts.update(sample([1, 2, 3], 1, rng, weights=[1, 3, 0]))
+        self.assertEqual(counts[3], 0)
+        self.assertAlmostEqual(counts[2] / counts[1], 3, delta=0.5)
+        self.assertEqual(sample([1, 2, 3], 5, rng, weights=[1, 3, 0])[2], 3)
+        self.assertEqual(sorted(sample([1, 2, 3], 5, rng)), [1, 2, 3])
+
+    def test_catalog_samples_skip_gaps_and_exclusions(self):
+        Music.objects.filter(id__in=self.ids[5:35]).delete()
+        present = self.ids[:5] + self.ids[35:]
+        rng = np.random.default_rng(1)
+        picked = sample_catalog(6, rng, exclude_ids=self.ids[:2])
+        self.assertEqual(len(picked), 6)
+        self.assertEqual(len(set(picked)), 6)
+        self.assertTrue(set(picked) <= set(present[2:]))
+        # More than remains: everything that is left, once
+        self.assertEqual(sorted(sample_catalog(20, rng, exclude_ids=self.ids[:2])), present[2:])
+
+        counts = Counter()
+        for _round in range(300):
+            counts.update(sample_catalog(1, rng))
+        self.assertEqual(set(counts), set(present))
+        self.assertGreater(min(counts.values()), 10)
+
+    @override_settings(SAMPLING_RANGE_ATTEMPTS=1, SAMPLING_MAX_OVERSAMPLE=1)
+    def test_sparse_ranges_fall_back_to_index_reads(self):
+        Music.objects.filter(id__in=self.ids[1:39]).delete()
+        self.assertEqual(sorted(sample_catalog(2, np.random.default_rng(2))), [self.ids[0], self.ids[39]])
+
+
+class ShuffleEndpointTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='shuffler@example.com', password='password123')
+        self.client.force_authenticate(user=self.user)
+        self.artist = Artist.objects.create(name='Band')
+        self.tracks = [Music.objects.create(title=f'Track {i}', play_count=i) for i in range(12)]
+        self.ids = [track.id for track in self.tracks]
+        for track in self.tracks[:8]:
+            track.artist.add(self.artist)
+
+    def test_pages_line_up_with_next_and_previous(self):
+        url = reverse('music-shuffle')
+        response = self.client.get(url, {'artist_id': self.artist.id, 'limit': 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data['data']
+        seed, order = data['seed'], data['track_ids']
+        self.assertEqual((data['count'], data['next_offset']), (8, 5))
+
+        response = self.client.get(url, {'artist_id': self.artist.id, 'seed': seed, 'offset': 5, 'limit': 5})
+        self.assertIsNone(response.data['data']['next_offset'])
+        order += response.data['data']['track_ids']
+        self.assertEqual(sorted(order), self.ids[:8])
+
+        response = self.client.get(
+            reverse('music-playback', kwargs={'pk': order[3]}),
+            {'artist_id': self.artist.id, 'shuffle': seed}
+        )
+        self.assertEqual(response.data['data']['next_song_id'], order[4])
+        self.assertEqual(response.data['data']['previous_song_id'], order[2])
+
+    def test_private_playlists_cannot_be_shuffled_by_others(self):
+        owner = User.objects.create_user(email='owner@example.com', password='password123')
+        playlist = Playlist.objects.create(user=owner, name='Mine', is_public=False)
+        playlist.music_tracks.add(*self.tracks[:3])
+        response = self.client.get(reverse('music-shuffle'), {'playlist_id': playlist.id})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(user=owner)
+        response = self.client.get(reverse('music-shuffle'), {'playlist_id': playlist.id, 'seed': 3})
+        self.assertEqual(sorted(response.data['data']['track_ids']), self.ids[:3])
+
+    def test_surprise_skips_recent_plays_and_favorites(self):
+        record_play(self.user.id, self.ids[0])
+        Favorite.objects.create(user=self.user, music=self.tracks[1])
+        self.assertIn(self.ids[1], favorite_ids(self.user.id))
+        for weighted in ('false', 'true'):
+            response = self.client.get(reverse('music-surprise'), {'limit': 20, 'weighted': weighted})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            picked = [track['id'] for track in response.data['data']['tracks']]
+            self.assertEqual(sorted(picked), self.ids[2:])
+
+        seed = response.data['data']['seed']
+        first = self.client.get(reverse('music-surprise'), {'limit': 3, 'seed': seed}).data['data']['tracks']
+        again = self.client.get(reverse('music-surprise'), {'limit': 3, 'seed': seed}).data['data']['tracks']
+        self.assertEqual(first, again)
@@ -0,0 +1,107 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from accounts.models import User
+from music.models import Music, AudioBlob
+
+TEST_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(
+    MEDIA_ROOT=TEST_MEDIA_ROOT,
+    CHUNKED_UPLOAD_TEMP_DIR=os.path.join(TEST_MEDIA_ROOT, 'partial'),
+    CHUNKED_UPLOAD_PROOF_SIZE=100
+)
+class ContentAddressedStorageTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='dedupe@example.com', password='password123', role=User.Role.ADMIN
+        )
+        self.client.force_authenticate(user=self.user)
+        self.content = b'ID3' + b'\x00\x01\x02' * 500
+
+    def tearDown(self):
+        shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+
+    def _upload(self, title, filename='song.mp3'):
+        response = self.client.post(
+            reverse('music-list'),
+            {'title': title, 'audio_file': SimpleUploadedFile(filename, self.content)},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Music.objects.get(title=title)
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self._upload('First Title')
+        second = self._upload('Second Title', filename='copy.mp3')
+
+        blob = AudioBlob.objects.get()
+        self.assertEqual(blob.sha256, hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(first.audio_file.name, second.audio_file.name)
+        self.assertEqual(len(os.listdir(os.path.dirname(blob.file.path))), 1)
+
+    def test_blob_deleted_with_last_reference(self):
+        first = self._upload('First Title')
+        second = self._upload('Second Title')
+        path = AudioBlob.objects.get().file.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(AudioBlob.objects.get().ref_count, 1)
+        self.assertTrue(os.path.exists(path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(AudioBlob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_chunked_upload_of_known_file_skips_transfer(self):
+        self._upload('Original')
+        checksum = hashlib.sha256(self.content).hexdigest()
+
+        response = self.client.post(
+            reverse('upload-list'),
+            {'filename': 'again.mp3', 'total_size': len(self.content), 'checksum': checksum},
+            format='json'
+        )
+        self.assertTrue(response.data['data']['deduplicated'])
+        self.assertEqual(response.data['data']['offset'], len(self.content))
+
+        session = response.data['data']
+        url = reverse('upload-complete', kwargs={'pk': session['id']})
+
+        # Knowing the hash is not enough to claim the stored file
+        response = self.client.post(url, {'checksum': checksum, 'title': 'Re-upload'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url, {'checksum': checksum, 'proof': checksum, 'title': 'Re-upload'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(AudioBlob.objects.get().ref_count, 1)
+
+        start = session['proof_offset']
+        proof = hashlib.sha256(self.content[start:start + session['proof_length']]).hexdigest()
+        response = self.client.post(url, {'checksum': checksum, 'proof': proof, 'title': 'Re-upload'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(AudioBlob.objects.get().ref_count, 2)
+
+    def test_chunked_upload_completes_only_from_received_bytes(self):
+        self._upload('Original')
+        checksum = hashlib.sha256(self.content).hexdigest()
+        # Without the checksum up front the session is not deduplicated
+        response = self.client.post(
+            reverse('upload-list'),
+            {'filename': 'again.mp3', 'total_size': len(self.content)},
+            format='json'
+        )
+        url = reverse('upload-complete', kwargs={'pk': response.data['data']['id']})
+        response = self.client.post(url, {'checksum': checksum, 'title': 'Claimed'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors']['offset'], 0)
+        self.assertFalse(Music.objects.filter(title='Claimed').exists())
@@ -0,0 +1,100 @@
+import numpy as np
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User, UserProfile
+from music.listening_history import record_play
+from music.models import Artist, Music, Tag
+from music.tag_index import TagIndex, similar_by_tags, tag_index
+
+
+class TagIndexTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='moods@example.com', password='password123')
+        UserProfile.objects.get_or_create(user=self.user)
+        self.client.force_authenticate(user=self.user)
+        self.calm, self.sad, self.happy = (Tag.objects.create(name=name) for name in ('calm', 'sad', 'happy'))
+        self.tracks = [Music.objects.create(title=f'Track {i}') for i in range(4)]
+        self.ids = [track.id for track in self.tracks]
+        self.tracks[0].tags.set([self.calm, self.sad])
+        self.tracks[1].tags.set([self.calm, self.sad])
+        self.tracks[2].tags.set([self.calm, self.happy])
+        self.tracks[3].tags.set([self.happy])
+
+    def test_scores_are_idf_weighted_jaccard(self):
+        index = tag_index()
+        weights = {tag.id: np.log1p(4 / count) for tag, count in ((self.calm, 3), (self.sad, 2), (self.happy, 2))}
+        self.assertAlmostEqual(index.tag_weights[index.columns[self.sad.id]], weights[self.sad.id])
+
+        # Track 2 shares "calm" with track 0 out of the union {calm, sad, happy}
+        profile = index.tag_profile([self.ids[0]])
+        self.assertEqual(profile, {self.calm.id: 1.0, self.sad.id: 1.0})
+        self.assertEqual(index.similar(profile, 10, exclude_ids=[self.ids[0]]), [self.ids[1], self.ids[2]])
+        self.assertEqual(similar_by_tags([self.ids[0]], 1), [self.ids[1]])
+
+    def test_retagging_syncs_without_a_rebuild(self):
+        built = tag_index()
+        self.assertEqual(similar_by_tags([self.ids[3]], 10), [self.ids[2]])
+
+        late = Tag.objects.create(name='late')
+        self.tracks[3].tags.add(late)
+        self.tracks[1].tags.add(late)
+        new = Music.objects.create(title='New')
+        new.tags.add(self.happy)
+
+        synced = tag_index()
+        self.assertIsNot(synced, built)
+        self.assertEqual(synced.generation, built.generation)
+        self.assertEqual(similar_by_tags([self.ids[3]], 10), [new.id, self.ids[2], self.ids[1]])
+        # The snapshot handed out earlier is left untouched
+        self.assertNotIn(new.id, built.track_ids)
+
+        self.tracks[3].tags.clear()
+        self.assertEqual(similar_by_tags([self.ids[1]], 10), [self.ids[0], self.ids[2]])
+
+    def test_columns_are_dense_whatever_the_tag_ids(self):
+        tag_index()
+        far = Tag.objects.create(id=100_000, name='far')
+        self.tracks[2].tags.add(far)
+        synced = tag_index()
+        self.assertEqual(synced.bits.shape[1], 1)
+        self.assertEqual(synced.tag_profile([self.ids[2]]), {self.calm.id: 1.0, self.happy.id: 1.0, far.id: 1.0})
+        self.assertEqual(TagIndex.build(synced.generation, synced.version).bits.shape[1], 1)
+
+    def test_deletions_rebuild_the_index(self):
+        built = tag_index()
+        self.tracks[1].delete()
+        rebuilt = tag_index()
+        self.assertNotEqual(rebuilt.generation, built.generation)
+        self.assertEqual(similar_by_tags([self.ids[0]], 10), [self.ids[2]])
+
+    def test_top_k_is_exact_at_catalog_scale(self):
+        rng = np.random.default_rng(3)
+        track_count, tag_count = 200_000, 120
+        dense = rng.random((track_count, tag_count)) < 0.04
+        index = TagIndex(np.arange(1, track_count + 1), np.arange(tag_count), np.packbits(dense, axis=1), 1, 1, None)
+        profile = {5: 1.0, 17: 0.5, 90: 0.25}
+
+        seed = np.zeros(tag_count)
+        seed[list(profile)] = list(profile.values())
+        shared = np.minimum(dense, seed) @ index.tag_weights[:tag_count]
+        union = np.maximum(dense, seed) @ index.tag_weights[:tag_count]
+        scores = shared / union
+        expected = np.lexsort((-index.track_ids, -scores))[:25]
+        self.assertEqual(index.similar(profile, 25), index.track_ids[expected].tolist())
+
+    def test_related_by_tags_skips_the_same_artist(self):
+        artist = Artist.objects.create(name='Shared')
+        self.tracks[0].artist.add(artist)
+        self.tracks[1].artist.add(artist)
+        response = self.client.get(reverse('music-detail', kwargs={'pk': self.ids[0]}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([track['id'] for track in response.data['related_by_tags']], [self.ids[2]])
+
+    def test_mood_section_ranks_by_tag_similarity(self):
+        record_play(self.user.id, self.ids[0])
+        response = self.client.get(reverse('home-section', kwargs={'slug': 'recommended_mood'}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([track['id'] for track in response.data['data']['results']], [self.ids[1], self.ids[2]])
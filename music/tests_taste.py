@@ -0,0 +1,98 @@
+from datetime import timedelta
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User, UserProfile
+from music.models import Artist, Favorite, Music, Tag, TasteProfile
+from music.taste import ARTIST, KIND_SHIFT, LANGUAGE, LANGUAGES, TAG, rank_by_taste, record_taste_events, taste_vector
+
+
+class TasteProfileTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='taste@example.com', password='password123')
+        UserProfile.objects.get_or_create(user=self.user)
+        self.client.force_authenticate(user=self.user)
+        self.rock, self.calm = Tag.objects.create(name='rock'), Tag.objects.create(name='calm')
+        self.artist = Artist.objects.create(name='Band')
+        self.loud = Music.objects.create(title='Loud', language=Music.Language.ENGLISH)
+        self.loud.tags.set([self.rock, self.calm])
+        self.loud.artist.add(self.artist)
+        self.quiet = Music.objects.create(title='Quiet', language=Music.Language.ARABIC)
+        self.quiet.tags.add(self.calm)
+
+    def _weights(self):
+        keys, weights = taste_vector(self.user.id)
+        return dict(zip(keys.tolist(), weights.tolist()))
+
+    def test_track_features_are_spread_per_family(self):
+        record_taste_events(self.user.id, [(self.loud.id, 1.0, timezone.now())])
+        keys, weights = taste_vector(self.user.id)
+        raw = dict(zip(keys.tolist(), (weights / weights.max()).tolist()))
+        self.assertEqual(raw, {
+            TAG << KIND_SHIFT | self.rock.id: 0.5,
+            TAG << KIND_SHIFT | self.calm.id: 0.5,
+            ARTIST << KIND_SHIFT | self.artist.id: 1.0,
+            LANGUAGE << KIND_SHIFT | LANGUAGES.index(Music.Language.ENGLISH): 1.0,
+        })
+
+    def test_old_affinities_decay_and_removals_unlearn(self):
+        record_taste_events(self.user.id, [(self.loud.id, 1.0, timezone.now())])
+        TasteProfile.objects.filter(user=self.user).update(decayed_at=timezone.now() - timedelta(days=30))
+        record_taste_events(self.user.id, [(self.quiet.id, 1.0, timezone.now())])
+
+        profile = TasteProfile.objects.get(user=self.user)
+        self.assertEqual(len(bytes(profile.vector)), 5 * 12)
+        weights = self._weights()
+        arabic = LANGUAGE << KIND_SHIFT | LANGUAGES.index(Music.Language.ARABIC)
+        english = LANGUAGE << KIND_SHIFT | LANGUAGES.index(Music.Language.ENGLISH)
+        self.assertAlmostEqual(weights[english] / weights[arabic], 0.5, places=3)
+
+        record_taste_events(self.user.id, [(self.loud.id, -0.5, timezone.now())])
+        self.assertNotIn(english, self._weights())
+
+    @override_settings(TASTE_MAX_FEATURES=2)
+    def test_only_the_strongest_features_are_kept(self):
+        record_taste_events(self.user.id, [(self.loud.id, 1.0, timezone.now())])
+        self.assertEqual(len(self._weights()), 2)
+
+    @override_settings(LISTENING_HISTORY_FLUSH_SIZE=1)
+    def test_plays_and_favorites_feed_the_profile(self):
+        self.client.get(reverse('music-playback', kwargs={'pk': self.quiet.id}))
+        self.assertEqual(rank_by_taste(self.user.id, [self.loud.id, self.quiet.id]), [self.quiet.id, self.loud.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('music-favorite', kwargs={'pk': self.loud.id}))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(rank_by_taste(self.user.id, [self.quiet.id, self.loud.id]), [self.loud.id, self.quiet.id])
+
+    def test_removing_an_old_favorite_unlearns_its_decayed_weight(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(user=self.user, music=self.loud, created_at=timezone.now() - timedelta(days=60))
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.get(user=self.user, music=self.loud).delete()
+        self.assertEqual(self._weights(), {})
+
+    def test_synced_favorites_are_dated_by_the_client(self):
+        old, recent = timezone.now() - timedelta(days=60), timezone.now()
+        response = self.client.post(reverse('favorite-sync'), {'operations': [
+            {'music_id': self.loud.id, 'action': 'add', 'timestamp': old.isoformat()},
+            {'music_id': self.quiet.id, 'action': 'add', 'timestamp': recent.isoformat()},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        weights = self._weights()
+        arabic = LANGUAGE << KIND_SHIFT | LANGUAGES.index(Music.Language.ARABIC)
+        english = LANGUAGE << KIND_SHIFT | LANGUAGES.index(Music.Language.ENGLISH)
+        self.assertAlmostEqual(weights[english] / weights[arabic], 0.25, places=3)
+
+    def test_cold_start_recommendations_follow_taste(self):
+        record_taste_events(self.user.id, [(self.quiet.id, 1.0, timezone.now())])
+        response = self.client.get(reverse('home-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        slugs = [section['slug'] for section in response.data['data']['sections']]
+        self.assertEqual(slugs.index('recommended_for_you'), 0)
+        section = response.data['data']['sections'][0]
+        self.assertEqual(section['items'], [self.quiet.id, self.loud.id])
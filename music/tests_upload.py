@@ -0,0 +1,137 @@
+import fcntl
+import hashlib
+import os
+import shutil
+import tempfile
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.test import override_settings
+from django.urls import reverse
+from accounts.models import User
+from music.models import Music, UploadSession
+
+TEST_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(
+    MEDIA_ROOT=TEST_MEDIA_ROOT,
+    CHUNKED_UPLOAD_TEMP_DIR=os.path.join(TEST_MEDIA_ROOT, 'partial'),
+    CHUNKED_UPLOAD_READ_SIZE=4
+)
+class ChunkedUploadTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='uploader@example.com', password='password123', role=User.Role.ADMIN
+        )
+        self.client.force_authenticate(user=self.user)
+        self.content = b'ID3' + bytes(range(256)) * 4
+
+    def tearDown(self):
+        shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+
+    def _open_session(self):
+        response = self.client.post(
+            reverse('upload-list'),
+            {'filename': 'song.mp3', 'total_size': len(self.content)},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['data']['id']
+
+    def _put_chunk(self, session_id, start, end):
+        return self.client.generic(
+            'PUT',
+            reverse('upload-detail', kwargs={'pk': session_id}),
+            self.content[start:end + 1],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(self.content)}'
+        )
+
+    def test_chunked_upload_creates_music_on_complete(self):
+        session_id = self._open_session()
+        middle = len(self.content) // 2
+
+        response = self._put_chunk(session_id, 0, middle - 1)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['offset'], middle)
+        self.assertFalse(Music.objects.exists())
+
+        response = self._put_chunk(session_id, middle, len(self.content) - 1)
+        self.assertEqual(response.data['data']['offset'], len(self.content))
+
+        response = self.client.post(
+            reverse('upload-complete', kwargs={'pk': session_id}),
+            {'checksum': hashlib.sha256(self.content).hexdigest(), 'title': 'Chunked Song', 'duration': 10},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        music = Music.objects.get(title='Chunked Song')
+        self.assertEqual(music.uploaded_by, self.user)
+        with music.audio_file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+
+        session = UploadSession.objects.get(pk=session_id)
+        self.assertEqual(session.status, UploadSession.Status.COMPLETED)
+        self.assertFalse(os.path.exists(session.staging_path))
+
+    def test_out_of_order_chunk_reports_resume_offset(self):
+        session_id = self._open_session()
+        self._put_chunk(session_id, 0, 99)
+
+        response = self._put_chunk(session_id, 200, 299)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['errors']['offset'], 100)
+
+        response = self.client.get(reverse('upload-detail', kwargs={'pk': session_id}))
+        self.assertEqual(response.data['data']['offset'], 100)
+
+    def test_chunk_is_refused_while_another_is_being_written(self):
+        session_id = self._open_session()
+        session = UploadSession.objects.get(pk=session_id)
+        with open(session.staging_path, 'ab') as staged:
+            fcntl.flock(staged, fcntl.LOCK_EX)
+            response = self._put_chunk(session_id, 0, 99)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['errors']['offset'], 0)
+
+        self.assertEqual(self._put_chunk(session_id, 0, 99).status_code, status.HTTP_200_OK)
+
+    def test_completed_session_cannot_be_completed_again(self):
+        session_id = self._open_session()
+        self._put_chunk(session_id, 0, len(self.content) - 1)
+        data = {'checksum': hashlib.sha256(self.content).hexdigest(), 'title': 'Once', 'duration': 10}
+        url = reverse('upload-complete', kwargs={'pk': session_id})
+        self.assertEqual(self.client.post(url, data, format='json').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.post(url, data, format='json').status_code, status.HTTP_410_GONE)
+        self.assertEqual(Music.objects.count(), 1)
+
+    def test_checksum_mismatch_rejects_upload(self):
+        session_id = self._open_session()
+        self._put_chunk(session_id, 0, len(self.content) - 1)
+
+        response = self.client.post(
+            reverse('upload-complete', kwargs={'pk': session_id}),
+            {'checksum': '0' * 64, 'title': 'Broken Song'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Music.objects.exists())
+
+    def test_disallowed_extension_rejected(self):
+        response = self.client.post(
+            reverse('upload-list'),
+            {'filename': 'script.exe', 'total_size': 10},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_customer_cannot_open_session(self):
+        customer = User.objects.create_user(email='listener@example.com', password='password123')
+        self.client.force_authenticate(user=customer)
+        response = self.client.post(
+            reverse('upload-list'),
+            {'filename': 'song.mp3', 'total_size': 10},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
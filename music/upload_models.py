@@ -0,0 +1,97 @@
+import os
+import uuid
+from django.db import models
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+def default_upload_expiry():
+    """Expiry timestamp for a freshly created upload session"""
+    return timezone.now() + settings.CHUNKED_UPLOAD_SESSION_TTL
+
+
+class UploadSession(models.Model):
+    """Resumable chunked upload of an audio file by a broadcaster"""
+
+    class Status(models.TextChoices):
+        ACTIVE = 'ACTIVE', _('Active')
+        COMPLETED = 'COMPLETED', _('Completed')
+        ABORTED = 'ABORTED', _('Aborted')
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions',
+        verbose_name=_('user')
+    )
+    filename = models.CharField(_('filename'), max_length=255)
+    total_size = models.PositiveBigIntegerField(
+        _('total size'),
+        help_text=_('Declared size of the complete file in bytes')
+    )
+    received_bytes = models.PositiveBigIntegerField(_('received bytes'), default=0)
+    checksum = models.CharField(
+        _('checksum'),
+        max_length=64,
+        blank=True,
+        help_text=_('SHA-256 of the complete file, if declared up front')
+    )
+    deduplicated = models.BooleanField(
+        _('deduplicated'),
+        default=False,
+        help_text=_('The file was already stored, so no chunks need to be sent')
+    )
+    # Byte range of the stored file a deduplicated session must hash to prove it has the file
+    proof_offset = models.PositiveBigIntegerField(_('proof offset'), null=True, blank=True)
+    proof_length = models.PositiveIntegerField(_('proof length'), null=True, blank=True)
+    status = models.CharField(
+        _('status'),
+        max_length=20,
+        choices=Status.choices,
+        default=Status.ACTIVE
+    )
+    music = models.ForeignKey(
+        'music.Music',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='upload_sessions',
+        verbose_name=_('music')
+    )
+    expires_at = models.DateTimeField(_('expires at'), default=default_upload_expiry)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('upload session')
+        verbose_name_plural = _('upload sessions')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'status']),
+            models.Index(fields=['status', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.received_bytes}/{self.total_size})"
+
+    @property
+    def staging_path(self):
+        """Path of the partial file the chunks are appended to"""
+        return os.path.join(str(settings.CHUNKED_UPLOAD_TEMP_DIR), f'{self.id}.part')
+
+    @property
+    def is_active(self):
+        return self.status == self.Status.ACTIVE and self.expires_at > timezone.now()
+
+    @property
+    def is_fully_received(self):
+        return self.received_bytes == self.total_size
+
+    def discard_staging_file(self):
+        """Remove the partial file from disk if it exists"""
+        try:
+            os.remove(self.staging_path)
+        except FileNotFoundError:
+            pass
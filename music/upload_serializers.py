@@ -0,0 +1,70 @@
+import os
+from django.conf import settings
+from rest_framework import serializers
+from .upload_models import UploadSession
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Serializer for reporting upload session progress"""
+    offset = serializers.IntegerField(source='received_bytes', read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'total_size', 'offset', 'checksum', 'deduplicated',
+                  'proof_offset', 'proof_length', 'status', 'music', 'expires_at', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+
+class UploadSessionCreateSerializer(serializers.ModelSerializer):
+    """Serializer for opening a new upload session"""
+    checksum = serializers.RegexField(
+        r'^[0-9a-fA-F]{64}$',
+        required=False,
+        allow_blank=True,
+        help_text="Optional hex encoded SHA-256, lets already stored files skip the upload"
+    )
+
+    class Meta:
+        model = UploadSession
+        fields = ['filename', 'total_size', 'checksum']
+
+    def validate_checksum(self, value):
+        return value.lower()
+
+    def validate_filename(self, value):
+        """Only accept the audio extensions allowed on Music.audio_file"""
+        filename = os.path.basename(value)
+        extension = os.path.splitext(filename)[1].lstrip('.').lower()
+        if extension not in settings.ALLOWED_AUDIO_EXTENSIONS:
+            raise serializers.ValidationError(
+                f"File extension '{extension}' is not allowed."
+            )
+        return filename
+
+    def validate_total_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("File size must be greater than zero.")
+        if value > settings.MAX_AUDIO_FILE_SIZE:
+            raise serializers.ValidationError(
+                f"Audio file size cannot exceed {settings.MAX_AUDIO_FILE_SIZE // (1024 * 1024)} MB"
+            )
+        return value
+
+
+class UploadCompleteSerializer(serializers.Serializer):
+    """Serializer for the checksum sent when finalizing an upload"""
+    checksum = serializers.RegexField(
+        r'^[0-9a-fA-F]{64}$',
+        help_text="Hex encoded SHA-256 of the complete file"
+    )
+    proof = serializers.RegexField(
+        r'^[0-9a-fA-F]{64}$',
+        required=False,
+        help_text="Hex encoded SHA-256 of the session's proof byte range, required for deduplicated sessions"
+    )
+
+    def validate_checksum(self, value):
+        return value.lower()
+
+    def validate_proof(self, value):
+        return value.lower()
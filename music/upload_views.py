@@ -0,0 +1,327 @@
+import fcntl
+import hashlib
+import hmac
+import os
+import re
+import secrets
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import viewsets, status, mixins
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from accounts.permissions import IsVerifiedBroadcaster
+from api.response import success_response, error_response
+from api.messages import *
+from .blob_models import AudioBlob
+from .upload_models import UploadSession
+from .upload_serializers import (
+    UploadSessionSerializer,
+    UploadSessionCreateSerializer,
+    UploadCompleteSerializer
+)
+from .serializers import MusicSerializer, MusicUploadSerializer
+
+
+CONTENT_RANGE_PATTERN = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+def staged_size(session):
+    """Number of bytes currently staged on disk for the session"""
+    try:
+        return os.path.getsize(session.staging_path)
+    except FileNotFoundError:
+        return 0
+
+
+def file_sha256(path):
+    """Hash a file in fixed-size blocks so memory use does not depend on file size"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(settings.CHUNKED_UPLOAD_READ_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def range_sha256(file, offset, length):
+    """Hash ``length`` bytes of an open file starting at ``offset``"""
+    digest = hashlib.sha256()
+    file.seek(offset)
+    remaining = length
+    while remaining:
+        block = file.read(min(settings.CHUNKED_UPLOAD_READ_SIZE, remaining))
+        if not block:
+            break
+        digest.update(block)
+        remaining -= len(block)
+    return digest.hexdigest()
+
+
+def append_request_body(request, path, start, length):
+    """
+    Stream up to ``length`` bytes of the raw request body onto the end of ``path``.
+
+    The file is locked while it is written, so only one chunk is appended at
+    a time. Returns the number of bytes written, or None when the file is
+    busy or does not end at ``start``.
+    """
+    stream = request.stream
+    written = 0
+    read_size = settings.CHUNKED_UPLOAD_READ_SIZE
+    with open(path, 'ab') as destination:
+        try:
+            fcntl.flock(destination, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return None
+        if os.fstat(destination.fileno()).st_size != start:
+            return None
+        while stream is not None and written < length:
+            data = stream.read(min(read_size, length - written))
+            if not data:
+                break
+            destination.write(data)
+            written += len(data)
+    return written
+
+
+class UploadSessionViewSet(mixins.CreateModelMixin,
+                           mixins.RetrieveModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    ViewSet for resumable chunked audio uploads.
+
+    A broadcaster opens a session, PUTs byte ranges of the file in order and
+    finalizes it with the SHA-256 of the whole file and the track metadata.
+    Chunks are streamed straight to disk and the Music row is only created
+    on completion.
+
+    A file whose declared SHA-256 and size are already stored need not be
+    sent, but the hash alone proves nothing, since it is part of every
+    blob's public path. The session instead names a random byte range of
+    the stored file, and completing it requires the SHA-256 of that range.
+    """
+    permission_classes = [IsAuthenticated, IsVerifiedBroadcaster]
+    serializer_class = UploadSessionSerializer
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(user=self.request.user)
+
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return UploadSessionCreateSerializer
+        return UploadSessionSerializer
+
+    def create(self, request, *args, **kwargs):
+        """Open a new upload session"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        checksum = serializer.validated_data.get('checksum')
+        if checksum and AudioBlob.objects.filter(sha256=checksum, size=serializer.validated_data['total_size']).exists():
+            # Identical audio is already stored; the client only proves it has it
+            total_size = serializer.validated_data['total_size']
+            proof_length = min(settings.CHUNKED_UPLOAD_PROOF_SIZE, total_size)
+            session = serializer.save(
+                user=request.user,
+                received_bytes=total_size,
+                deduplicated=True,
+                proof_offset=secrets.randbelow(total_size - proof_length + 1),
+                proof_length=proof_length
+            )
+        else:
+            session = serializer.save(user=request.user)
+            os.makedirs(os.path.dirname(session.staging_path), exist_ok=True)
+            open(session.staging_path, 'wb').close()
+
+        return Response(
+            success_response(
+                message=SUCCESS_CREATED,
+                data=UploadSessionSerializer(session).data
+            ),
+            status=status.HTTP_201_CREATED
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """Get session progress, used by clients to find the offset to resume from"""
+        session = self.get_object()
+        if session.is_active and not session.deduplicated and session.received_bytes != staged_size(session):
+            session.received_bytes = staged_size(session)
+            session.save(update_fields=['received_bytes', 'updated_at'])
+        return Response(success_response(data=UploadSessionSerializer(session).data))
+
+    def update(self, request, pk=None):
+        """Append a chunk described by the Content-Range header"""
+        match = CONTENT_RANGE_PATTERN.match(request.headers.get('Content-Range', ''))
+        if not match:
+            return Response(
+                error_response(message=UPLOAD_INVALID_CONTENT_RANGE),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        start, end, total = (int(value) for value in match.groups())
+        length = end - start + 1
+
+        # The row is only locked to check the session; the bytes are written
+        # outside the transaction, under a lock on the staged file
+        with transaction.atomic():
+            session = self.get_object()
+            session = UploadSession.objects.select_for_update().get(pk=session.pk)
+
+            if not session.is_active:
+                return Response(
+                    error_response(message=UPLOAD_SESSION_CLOSED),
+                    status=status.HTTP_410_GONE
+                )
+            if session.deduplicated:
+                return Response(
+                    error_response(
+                        message=UPLOAD_OFFSET_MISMATCH,
+                        errors={'offset': session.received_bytes}
+                    ),
+                    status=status.HTTP_409_CONFLICT
+                )
+            if total != session.total_size or end < start or end >= session.total_size:
+                return Response(
+                    error_response(message=UPLOAD_INVALID_CONTENT_RANGE),
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if length > settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE:
+                return Response(
+                    error_response(message=UPLOAD_CHUNK_TOO_LARGE),
+                    status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                )
+
+        written = append_request_body(request, session.staging_path, start, length)
+
+        # The staged file is the source of truth, so a chunk cut off by a
+        # dropped connection is resumed from whatever actually reached disk.
+        session.received_bytes = staged_size(session)
+        UploadSession.objects.filter(pk=session.pk).update(
+            received_bytes=session.received_bytes, updated_at=timezone.now()
+        )
+        if written is None:
+            return Response(
+                error_response(
+                    message=UPLOAD_OFFSET_MISMATCH,
+                    errors={'offset': session.received_bytes}
+                ),
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(success_response(data=UploadSessionSerializer(session).data))
+
+    def destroy(self, request, pk=None):
+        """Abort an upload and discard the staged bytes"""
+        session = self.get_object()
+        if session.status == UploadSession.Status.ACTIVE:
+            session.status = UploadSession.Status.ABORTED
+            session.save(update_fields=['status', 'updated_at'])
+        session.discard_staging_file()
+        return Response(success_response(message=SUCCESS_DELETED))
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """Verify the checksum and create the Music row from the staged file"""
+        session = self.get_object()
+        if not session.is_active:
+            return Response(
+                error_response(message=UPLOAD_SESSION_CLOSED),
+                status=status.HTTP_410_GONE
+            )
+
+        complete_serializer = UploadCompleteSerializer(data=request.data)
+        complete_serializer.is_valid(raise_exception=True)
+
+        checksum = complete_serializer.validated_data['checksum']
+        if session.checksum and session.checksum != checksum:
+            return Response(
+                error_response(message=UPLOAD_CHECKSUM_MISMATCH),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if session.deduplicated:
+            blob = AudioBlob.objects.filter(sha256=checksum, size=session.total_size).first()
+            if blob is None:
+                # The stored copy was deleted meanwhile; the file has to be sent after all
+                session.deduplicated = False
+                session.received_bytes = 0
+                session.proof_offset = session.proof_length = None
+                session.save(update_fields=['deduplicated', 'received_bytes', 'proof_offset', 'proof_length', 'updated_at'])
+                os.makedirs(os.path.dirname(session.staging_path), exist_ok=True)
+                open(session.staging_path, 'wb').close()
+                return Response(
+                    error_response(message=UPLOAD_INCOMPLETE, errors={'offset': 0}),
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            source = blob.file.open('rb')
+            proof = range_sha256(source, session.proof_offset, session.proof_length)
+            if not hmac.compare_digest(proof, complete_serializer.validated_data.get('proof', '')):
+                source.close()
+                return Response(
+                    error_response(message=UPLOAD_PROOF_MISMATCH),
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            source.seek(0)
+        else:
+            # Bytes are only ever taken from the client; storing them reuses
+            # an identical blob by hash without writing the file again
+            session.received_bytes = staged_size(session)
+            if not session.is_fully_received:
+                session.save(update_fields=['received_bytes', 'updated_at'])
+                return Response(
+                    error_response(
+                        message=UPLOAD_INCOMPLETE,
+                        errors={'offset': session.received_bytes}
+                    ),
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            if file_sha256(session.staging_path) != checksum:
+                # There is no telling which chunk was corrupted, so start over
+                session.discard_staging_file()
+                session.received_bytes = 0
+                session.save(update_fields=['received_bytes', 'updated_at'])
+                return Response(
+                    error_response(message=UPLOAD_CHECKSUM_MISMATCH),
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            source = open(session.staging_path, 'rb')
+
+        with source:
+            audio_file = File(source, name=session.filename)
+            audio_file.sha256 = checksum
+            data = request.data.copy()
+            data.pop('checksum', None)
+            data.pop('proof', None)
+            data['audio_file'] = audio_file
+            serializer = MusicUploadSerializer(data=data, context={'request': request})
+            serializer.is_valid(raise_exception=True)
+
+            with transaction.atomic():
+                # A parallel complete of the same session waits here, then finds it closed
+                locked = UploadSession.objects.select_for_update().get(pk=session.pk)
+                if not locked.is_active:
+                    return Response(
+                        error_response(message=UPLOAD_SESSION_CLOSED),
+                        status=status.HTTP_410_GONE
+                    )
+                music = serializer.save(uploaded_by=request.user)
+                locked.music = music
+                locked.received_bytes = session.received_bytes
+                locked.status = UploadSession.Status.COMPLETED
+                locked.save(update_fields=['music', 'status', 'received_bytes', 'updated_at'])
+
+        session.discard_staging_file()
+
+        # Update broadcaster stats
+        if hasattr(request.user, 'broadcaster_profile'):
+            broadcaster = request.user.broadcaster_profile
+            broadcaster.total_uploads += 1
+            broadcaster.save(update_fields=['total_uploads'])
+
+        return Response(
+            success_response(
+                message=SUCCESS_MUSIC_UPLOADED,
+                data=MusicSerializer(music, context={'request': request}).data
+            ),
+            status=status.HTTP_201_CREATED
+        )
@@ -2,9 +2,10 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import ArtistViewSet, AlbumViewSet, TagViewSet, MusicViewSet
 from .customer_views import (
-    PlaylistViewSet, FavoriteViewSet, RecentlyPlayedViewSet, HomeViewSet
+    PlaylistViewSet, FavoriteViewSet, RecentlyPlayedViewSet, HomeViewSet, RadioViewSet
 )
 from .ads_views import AdvertisementViewSet
+from .upload_views import UploadSessionViewSet
 
 router = DefaultRouter()
 
@@ -14,11 +15,15 @@ router.register(r'albums', AlbumViewSet, basename='album')
 router.register(r'tags', TagViewSet, basename='tag')
 router.register(r'music', MusicViewSet, basename='music')
 
+# Broadcaster uploads
+router.register(r'uploads', UploadSessionViewSet, basename='upload')
+
 # Customer features
 router.register(r'playlists', PlaylistViewSet, basename='playlist')
 router.register(r'favorites', FavoriteViewSet, basename='favorite')
 router.register(r'recently-played', RecentlyPlayedViewSet, basename='recently-played')
 router.register(r'home', HomeViewSet, basename='home')
+router.register(r'radio', RadioViewSet, basename='radio')
 
 # Advertisements
 router.register(r'ads', AdvertisementViewSet, basename='advertisement')
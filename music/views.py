@@ -2,25 +2,35 @@ from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
+import numpy as np
+from django.conf import settings
 from django.db.models import Q, Count, Prefetch
-from django.utils import timezone
 from datetime import timedelta
 from accounts.permissions import IsVerifiedBroadcaster, IsBroadcasterOrAdmin, IsOwnerOrAdmin
 from api.response import success_response, error_response
 from api.messages import *
+from api.streaming import ranged_file_response
+from .ann import current_index
+from .artist_summaries import artist_summary
+from .favorites import favorite_ids
+from .listening_history import recent_music_ids, record_play
+from .play_queue import GLOBAL_CONTEXT, load_contexts, queue_context, sorted_queue_ids
+from .sampling import catalog_weights, new_seed, sample, sample_catalog, shuffled
 from .models import (
     Artist, Album, Tag, Music, Playlist, 
-    RecentlyPlayed, Favorite
+    Favorite, ReleaseNotice
 )
 from .serializers import (
     ArtistSerializer, ArtistListSerializer,
     AlbumSerializer, AlbumListSerializer,
     TagSerializer,
     MusicSerializer, MusicListSerializer, MusicUploadSerializer,
-    MusicPlaybackSerializer,
+    MusicPlaybackSerializer, PopularArtistsQuerySerializer, SimilarMusicQuerySerializer, ShuffleQuerySerializer, SurpriseQuerySerializer,
     PlaylistSerializer, PlaylistCreateSerializer, PlaylistAddTrackSerializer,
     RecentlyPlayedSerializer, FavoriteSerializer
 )
+from .signals import clear_user_home_cache
+from .tasks import flush_listening_history
 
 
 class ArtistViewSet(viewsets.ModelViewSet):
@@ -29,7 +39,7 @@ class ArtistViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'bio', 'name_ar', 'bio_ar', 'name_en', 'bio_en']
-    ordering_fields = ['name', 'created_at']
+    ordering_fields = ['name', 'followers_count', 'created_at']
     ordering = ['name']
     
     def get_serializer_class(self):
@@ -40,23 +50,72 @@ class ArtistViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [IsAuthenticated(), IsBroadcasterOrAdmin()]
+        elif self.action == 'releases':
+            return [IsAuthenticated()]
         return [AllowAny()]
+
+    @action(detail=False, methods=['get'])
+    def popular(self, request):
+        """Most followed artists, read from the denormalized follower counts"""
+        query = PopularArtistsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        artists = Artist.objects.order_by('-followers_count', 'name')[:query.validated_data['limit']]
+        serializer = ArtistListSerializer(artists, many=True, context={'request': request})
+        return Response(success_response(data=serializer.data))
+
+    @action(detail=False, methods=['get'])
+    def releases(self, request):
+        """New tracks by the artists the user follows, newest first"""
+        notices = ReleaseNotice.objects.filter(user=request.user).select_related('music__album') \
+            .prefetch_related('music__artist', 'music__tags')[:settings.RELEASES_PAGE_SIZE]
+        serializer = MusicListSerializer([notice.music for notice in notices], many=True, context={'request': request})
+        return Response(success_response(data=serializer.data))
     
     @action(detail=True, methods=['get'])
     def music(self, request, pk=None):
-        """Get all music by this artist"""
+        """Get the artist's music, most played first (paginated)"""
         artist = self.get_object()
-        music_tracks = Music.objects.filter(artist=artist)
-        serializer = MusicListSerializer(music_tracks, many=True, context={'request': request})
-        return Response(success_response(data=serializer.data))
+        music_tracks = Music.objects.filter(artist=artist).select_related('album') \
+            .prefetch_related('artist', 'tags').order_by('-play_count', 'id')
+        page = self.paginate_queryset(music_tracks)
+        serializer = MusicListSerializer(page, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=True, methods=['get'])
     def albums(self, request, pk=None):
-        """Get all albums by this artist"""
+        """Get the artist's albums with their track counts, newest release first"""
         artist = self.get_object()
-        albums = Album.objects.filter(artist=artist)
-        serializer = AlbumListSerializer(albums, many=True)
-        return Response(success_response(data=serializer.data))
+        summary = artist_summary(artist.pk)
+        return Response(success_response(data=self._summary_albums(summary, request)))
+
+    @action(detail=True, methods=['get'])
+    def summary(self, request, pk=None):
+        """Top tracks, albums and total plays, read from the artist's precomputed summary"""
+        artist = self.get_object()
+        summary = artist_summary(artist.pk)
+        top_tracks = Music.objects.select_related('album').prefetch_related('artist', 'tags') \
+            .in_bulk(summary.top_track_ids)
+        return Response(success_response(data={
+            'artist': ArtistListSerializer(artist, context={'request': request}).data,
+            'track_count': summary.track_count,
+            'total_plays': summary.total_plays,
+            'top_tracks': MusicListSerializer(
+                [top_tracks[music_id] for music_id in summary.top_track_ids if music_id in top_tracks],
+                many=True,
+                context={'request': request}
+            ).data,
+            'albums': self._summary_albums(summary, request),
+        }))
+
+    def _summary_albums(self, summary, request):
+        albums = Album.objects.prefetch_related('artist').in_bulk([album_id for album_id, _count in summary.albums])
+        data = []
+        for album_id, track_count in summary.albums:
+            if album_id in albums:
+                album = AlbumListSerializer(albums[album_id], context={'request': request}).data
+                album['track_count'] = track_count
+                data.append(album)
+        return data
 
 
 class AlbumViewSet(viewsets.ModelViewSet):
@@ -80,11 +139,13 @@ class AlbumViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'])
     def tracks(self, request, pk=None):
-        """Get all tracks in this album"""
+        """Get the album's tracks in disc and track order (paginated)"""
         album = self.get_object()
-        tracks = Music.objects.filter(album=album)
-        serializer = MusicListSerializer(tracks, many=True, context={'request': request})
-        return Response(success_response(data=serializer.data))
+        tracks = Music.objects.filter(album=album).select_related('album') \
+            .prefetch_related('artist', 'tags').order_by(*Music.ALBUM_ORDER)
+        page = self.paginate_queryset(tracks)
+        serializer = MusicListSerializer(page, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data)
 
 
 class TagViewSet(viewsets.ModelViewSet):
@@ -123,7 +184,7 @@ class TagViewSet(viewsets.ModelViewSet):
 
 class MusicViewSet(viewsets.ModelViewSet):
     """ViewSet for Music management"""
-    queryset = Music.objects.prefetch_related('artist', 'tags').select_related('album', 'uploaded_by').all()
+    queryset = Music.objects.prefetch_related('artist', 'tags').select_related('album', 'uploaded_by', 'audio_blob').all()
     permission_classes = [IsAuthenticated()]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['title', 'artist__name', 'album__title']
@@ -144,7 +205,7 @@ class MusicViewSet(viewsets.ModelViewSet):
             return [IsAuthenticated(), IsVerifiedBroadcaster()]
         elif self.action in ['update', 'partial_update', 'destroy']:
             return [IsAuthenticated(), IsBroadcasterOrAdmin()]
-        elif self.action in ['list', 'trending', 'discover', 'search']:
+        elif self.action in ['list', 'trending', 'discover', 'search', 'preview']:
             return [AllowAny()]
         return [IsAuthenticated()]
     
@@ -204,11 +265,9 @@ class MusicViewSet(viewsets.ModelViewSet):
         
         # Track recently played for authenticated users
         if request.user.is_authenticated:
-            RecentlyPlayed.objects.update_or_create(
-                user=request.user,
-                music=music,
-                defaults={'played_at': timezone.now()}
-            )
+            if record_play(request.user.id, music.id):
+                flush_listening_history.delay(request.user.id)
+            clear_user_home_cache(request.user.id)
             
             # Update broadcaster stats
             if music.uploaded_by and hasattr(music.uploaded_by, 'broadcaster_profile'):
@@ -226,11 +285,9 @@ class MusicViewSet(viewsets.ModelViewSet):
         
         # Track recently played for authenticated users
         if request.user.is_authenticated:
-            RecentlyPlayed.objects.update_or_create(
-                user=request.user,
-                music=music,
-                defaults={'played_at': timezone.now()}
-            )
+            if record_play(request.user.id, music.id):
+                flush_listening_history.delay(request.user.id)
+            clear_user_home_cache(request.user.id)
             
             # Update broadcaster stats
             if music.uploaded_by and hasattr(music.uploaded_by, 'broadcaster_profile'):
@@ -244,28 +301,101 @@ class MusicViewSet(viewsets.ModelViewSet):
             data=serializer.data
         ))
 
+    @action(detail=True, methods=['get'])
+    def preview(self, request, pk=None):
+        """Stream the preview clip (supports Range requests, does not count as a play)"""
+        music = self.get_object()
+        blob = music.audio_blob
+        if blob is None or not blob.preview_file:
+            return Response(
+                error_response(message=PREVIEW_NOT_AVAILABLE),
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return ranged_file_response(request, blob.preview_file)
+
+    def _tracks_in_order(self, music_ids):
+        """The tracks with these IDs, in the same order; missing ones are skipped"""
+        tracks = Music.objects.prefetch_related('artist', 'tags').select_related('album').in_bulk(music_ids)
+        return [tracks[music_id] for music_id in music_ids if music_id in tracks]
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """Tracks most like this one, from the nearest-neighbour index"""
+        music = self.get_object()
+        query = SimilarMusicQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        index = current_index()
+        similar_ids = index.similar(music.id, query.validated_data['limit']) if index is not None else []
+        serializer = MusicListSerializer(self._tracks_in_order(similar_ids), many=True, context={'request': request})
+        return Response(success_response(data=serializer.data))
+
+    @action(detail=False, methods=['get'])
+    def shuffle(self, request):
+        """
+        A page of a seeded shuffle of an album, artist, tag, playlist or the whole catalog.
+
+        The same seed always gives the same order, so pages line up across
+        requests; pass it as `shuffle` to playback to get the
+        next/previous track in that order.
+        """
+        query = ShuffleQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        context = queue_context(request.query_params) or GLOBAL_CONTEXT
+        if context[0] == 'playlist' and not Playlist.objects.filter(
+            Q(user=request.user) | Q(is_public=True), id=context[1]
+        ).exists():
+            return Response(
+                error_response(message=NOT_FOUND_PLAYLIST),
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        queue = load_contexts([context])[context]
+        seed = query.validated_data['seed'] if 'seed' in query.validated_data else new_seed()
+        order = shuffled(sorted_queue_ids(context, queue), seed)
+        offset, limit = query.validated_data['offset'], query.validated_data['limit']
+        return Response(success_response(data={
+            'seed': seed,
+            'count': len(order),
+            'track_ids': order[offset:offset + limit].tolist(),
+            'next_offset': offset + limit if offset + limit < len(order) else None,
+        }))
+
+    @action(detail=False, methods=['get'])
+    def surprise(self, request):
+        """Surprise me: random tracks the user has not played recently or favorited"""
+        query = SurpriseQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        seed = query.validated_data['seed'] if 'seed' in query.validated_data else new_seed()
+        rng = np.random.default_rng(seed)
+        limit = query.validated_data['limit']
+        exclude_ids = set(recent_music_ids(request.user.id)) | set(favorite_ids(request.user.id))
+
+        if query.validated_data['weighted']:
+            ids, weights = catalog_weights()
+            keep = ~np.isin(ids, list(exclude_ids))
+            music_ids = sample(ids[keep], limit, rng, weights[keep])
+        else:
+            music_ids = sample_catalog(limit, rng, exclude_ids)
+        serializer = MusicListSerializer(self._tracks_in_order(music_ids), many=True, context={'request': request})
+        return Response(success_response(data={'seed': seed, 'tracks': serializer.data}))
+
     @action(detail=True, methods=['post'])
     def favorite(self, request, pk=None):
         """Toggle favorite status for a music track"""
         music = self.get_object()
-        user = request.user
-        
-        favorite_qs = Favorite.objects.filter(user=user, music=music)
         
-        if favorite_qs.exists():
-            favorite_qs.delete()
+        if not Favorite.objects.toggle(request.user, music):
             return Response({
                 "action": "removed",
                 "is_favorite": False,
                 "message": "Removed from favorites"
             }, status=status.HTTP_200_OK)
-        else:
-            Favorite.objects.create(user=user, music=music)
-            return Response({
-                "action": "added",
-                "is_favorite": True,
-                "message": "Added to favorites"
-            }, status=status.HTTP_201_CREATED)
+        return Response({
+            "action": "added",
+            "is_favorite": True,
+            "message": "Added to favorites"
+        }, status=status.HTTP_201_CREATED)
     
     @action(detail=False, methods=['get'])
     def trending(self, request):
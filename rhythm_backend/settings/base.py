@@ -259,13 +259,161 @@ EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
 # File upload settings
-FILE_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
-DATA_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
+# Keep request bodies small in worker memory; larger multipart uploads spill to
+# temporary files and big audio files go through the chunked upload API.
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(2.5 * 1024 * 1024)  # 2.5MB
+DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
+
+# Hash uploads while they stream in so audio can be stored by content
+FILE_UPLOAD_HANDLERS = [
+    'music.upload_handlers.HashingMemoryFileUploadHandler',
+    'music.upload_handlers.HashingTemporaryFileUploadHandler',
+]
+
+# Chunked (resumable) upload settings
+CHUNKED_UPLOAD_TEMP_DIR = MEDIA_ROOT / 'uploads' / 'partial'
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = 8 * 1024 * 1024  # 8MB per PUT
+CHUNKED_UPLOAD_READ_SIZE = 64 * 1024  # Bytes read from the request stream at a time
+CHUNKED_UPLOAD_SESSION_TTL = timedelta(hours=24)
+CHUNKED_UPLOAD_PROOF_SIZE = 64 * 1024  # Bytes of an already stored file a client hashes to skip the upload
 
 # Audio file settings
 ALLOWED_AUDIO_EXTENSIONS = ['mp3', 'wav', 'flac', 'aac', 'm4a']
 MAX_AUDIO_FILE_SIZE = 50 * 1024 * 1024  # 50MB
 
+# Acoustic fingerprinting settings
+FINGERPRINT_SAMPLE_RATE = 11025
+FINGERPRINT_MIN_MATCHES = 20  # Hashes that must agree on one time offset
+FINGERPRINT_MIN_SCORE = 0.05  # Share of the track's hashes that must match
+
+# Preview clips for non-subscribers and link previews
+PREVIEW_OFFSET_SECONDS = 30  # Moved earlier for tracks too short to fit the clip
+PREVIEW_LENGTH_SECONDS = 30
+STREAMING_BLOCK_SIZE = 64 * 1024  # Bytes per chunk when serving byte ranges
+
+# Cache shared by every web and Celery worker process; versions, listening
+# history and radio sessions written by one process must be seen by the others
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config('CACHE_REDIS_URL', default='redis://localhost:6379/1'),
+    }
+}
+
+# Cached track ID arrays used to resolve next/previous (versioned per context)
+PLAY_QUEUE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Cached favorite ID arrays used for is_favorite checks (versioned per user)
+FAVORITE_IDS_CACHE_TIMEOUT = 60 * 60 * 24
+FAVORITES_SYNC_MAX_OPERATIONS = 500  # Operations accepted by one offline favorites sync
+
+# Per-user listening history: bounded lists in the cache, flushed to RecentlyPlayed in batches
+LISTENING_HISTORY_SIZE = 50  # Distinct tracks returned per user
+LISTENING_HISTORY_BUFFER = 200  # Plays kept per user; replays of a track take a slot each
+LISTENING_HISTORY_FLUSH_SIZE = 10  # Pending plays that trigger a flush
+LISTENING_HISTORY_FLUSH_INTERVAL = 5 * 60  # Seconds the oldest pending play may wait for the sweep
+LISTENING_HISTORY_CACHE_TIMEOUT = 60 * 60 * 24  # Seconds an idle user's history list is kept; pending plays never expire
+
+# Item-item recommendations rebuilt offline by build_recommendations
+RECOMMENDER_NEIGHBOURS = 50  # Neighbours stored per track
+RECOMMENDER_MAX_BASKET = 200  # Heaviest tracks kept per user or playlist
+RECOMMENDER_PAIR_CHUNK = 2_000_000  # Track pairs expanded at a time while building
+RECOMMENDER_PLAY_WEIGHT = 1.0
+RECOMMENDER_FAVORITE_WEIGHT = 2.0
+RECOMMENDER_PLAYLIST_WEIGHT = 1.0
+RECOMMENDER_SEED_TRACKS = 10  # Recent tracks whose neighbours are merged per user
+RECOMMENDER_SEED_DECAY = 0.85  # Weight of each seed relative to the next more recent one
+RECOMMENDER_SECTION_SIZE = 100  # Tracks behind the paginated "Recommended for You" section
+RECOMMENDER_REBUILD_INTERVAL = 60 * 60 * 6  # Seconds between scheduled rebuilds
+
+# Per-user taste profiles over tags, artists and languages
+TASTE_HALF_LIFE_DAYS = 30  # Affinities halve after this long without reinforcement
+TASTE_PLAY_WEIGHT = 1.0
+TASTE_FAVORITE_WEIGHT = 3.0  # Removing a favorite unlearns the same weight
+TASTE_MAX_FEATURES = 256  # Strongest features kept per user
+TASTE_MIN_WEIGHT = 0.01  # Weaker features are dropped
+RECOMMENDER_TASTE_BLEND = 0.5  # Boost of co-listened tracks per unit of taste affinity
+
+# Approximate nearest-neighbour index behind /music/{id}/similar/, rebuilt by build_ann_index
+ANN_INDEX_DIR = BASE_DIR / 'var' / 'ann'
+ANN_TAG_DIMENSIONS = 48  # Tags are randomly projected down to this many dimensions
+ANN_COOCCURRENCE_DIMENSIONS = 32
+ANN_TAG_WEIGHT = 1.0
+ANN_COOCCURRENCE_WEIGHT = 1.0
+ANN_LANGUAGE_WEIGHT = 0.5
+ANN_LISTS = None  # Inverted lists; None uses the square root of the catalog size
+ANN_PROBES = 8  # Lists scanned per query
+ANN_KMEANS_ITERATIONS = 10
+ANN_TRAINING_SAMPLE = 50_000  # Vectors the list centroids are trained on
+
+# In-memory tag similarity index (one per process)
+TAG_INDEX_SYNC_SLACK = 60  # Seconds re-read before the last sync, covering transactions committed late
+
+# Endless radio sessions
+RADIO_SESSION_TIMEOUT = 60 * 60 * 6  # Seconds an idle station is kept
+RADIO_HISTORY_SIZE = 500  # Played tracks remembered per station, never repeated
+RADIO_ARTIST_SPACING = 3  # Tracks that pass before an artist is played again, where possible
+RADIO_SEED_TRACKS = 5  # Latest station tracks whose neighbours make up the next batch
+RADIO_SEED_DECAY = 0.8  # Weight of each seed relative to the next more recent one
+RADIO_CANDIDATES = 100  # Neighbours taken per seed and tracks taken from an artist or tag seed
+RADIO_POOL_WEIGHT = 0.5  # Score of the best-placed track of an artist or tag seed
+RADIO_DEFAULT_BATCH = 20
+RADIO_MAX_BATCH = 100
+
+# Random sampling and seeded shuffles
+SAMPLING_RANGE_ATTEMPTS = 3  # Rounds of primary key range draws before reading from random index points
+SAMPLING_MAX_OVERSAMPLE = 20  # Most IDs drawn per track still missing, for sparse ID ranges
+SAMPLING_MAX_DRAWS = 10_000  # Most IDs looked up per round
+SAMPLING_WEIGHTS_TIMEOUT = 60 * 60  # Seconds the catalog popularity weights are cached
+SHUFFLE_PAGE_SIZE = 50
+SHUFFLE_MAX_PAGE_SIZE = 500
+
+# Artist followers
+RELEASE_FANOUT_CHUNK_SIZE = 1000  # Followers told about a new track per query and insert
+RELEASE_NOTICE_MAX_AGE_DAYS = 7  # Tracks linked to an artist later than this after upload are not announced
+RELEASES_PAGE_SIZE = 50
+
+# Per-artist summaries, rebuilt by refresh_artist_summaries once marked stale
+ARTIST_SUMMARY_TOP_TRACKS = 10
+ARTIST_SUMMARY_WINDOW_DAYS = 30  # Plays this recent rank the top tracks
+ARTIST_SUMMARY_BATCH_SIZE = 500  # Artists rebuilt per round
+ARTIST_SUMMARY_REFRESH_INTERVAL = 60 * 5  # Seconds between scheduled rebuilds of stale summaries
+
+# Playlist settings
+PLAYLIST_BULK_MAX_OPERATIONS = 1000  # Operations accepted by one bulk update
+PLAYLIST_CHANGE_LOG_LENGTH = 500  # Recent changes kept per playlist for incremental sync
+PLAYLIST_POPULARITY_HALF_LIFE_DAYS = 30  # Public playlist scores halve after this long without track changes
+PLAYLIST_POPULARITY_REFRESH_INTERVAL = 60 * 60  # Seconds between scheduled re-rankings
+
+# Periodic tasks run by Celery beat
+CELERY_BEAT_SCHEDULE = {
+    'flush-pending-listening-history': {
+        'task': 'music.tasks.flush_pending_listening_history',
+        'schedule': LISTENING_HISTORY_FLUSH_INTERVAL,
+    },
+    'build-recommendations': {
+        'task': 'music.tasks.build_recommendations',
+        'schedule': RECOMMENDER_REBUILD_INTERVAL,
+    },
+    'refresh-playlist-popularity': {
+        'task': 'music.tasks.refresh_playlist_popularity',
+        'schedule': PLAYLIST_POPULARITY_REFRESH_INTERVAL,
+    },
+    'refresh-artist-summaries': {
+        'task': 'music.tasks.refresh_artist_summaries',
+        'schedule': ARTIST_SUMMARY_REFRESH_INTERVAL,
+    },
+}
+
 # Image file settings
 ALLOWED_IMAGE_EXTENSIONS = ['jpg', 'jpeg', 'png', 'webp']
 MAX_IMAGE_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+
+# Resized image derivatives (longest side in pixels) served in list views
+IMAGE_DERIVATIVE_SIZES = {
+    'small': 160,
+    'medium': 480,
+    'large': 960,
+}
+IMAGE_DERIVATIVE_FORMATS = ['webp', 'jpeg']
+IMAGE_DERIVATIVE_DEFAULT_FORMAT = 'webp'
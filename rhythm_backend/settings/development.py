@@ -3,6 +3,7 @@ Development settings
 """
 
 from .base import *
+from decouple import config
 
 DEBUG = True
 
@@ -41,6 +42,17 @@ LOGGING = {
     },
 }
 
+# Run Celery tasks inline unless a worker is available
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=True, cast=bool)
+
+# A process-local cache is enough while tasks run inline; with a worker the shared one is kept
+if CELERY_TASK_ALWAYS_EAGER:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Disable password validators in development for easier testing
 AUTH_PASSWORD_VALIDATORS = []
 